@@ -3,12 +3,13 @@ import logging
 import sys
 import os
 import re
-import guessit
 from pprint import pformat
 
 from torrent_utils.helpers import getUserInput, get_path_list
 from torrent_utils.config_loader import load_settings, validate_settings
-from torrent_utils.media import Movie, TVShow
+from torrent_utils.media import Movie, TVShow, prefetch
+from torrent_utils.media_cache import cached_guessit, enable_media_cache
+from torrent_utils.tmdb import enable_tmdb_cache
 
 __VERSION = "2.0.2" # Incremented version for the fix
 LOG_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)-8s P%(process)06d.%(module)-12s %(funcName)-16sL%(lineno)04d %(message)s"
@@ -90,22 +91,28 @@ def main():
     # --- END Settings Section ---
 
     pathList = get_path_list(arg.path, BULK_DOWNLOAD_FILE)
+    # torrentmaker.py reads the same cache, so the renamed files are not parsed again there
+    enable_media_cache()
+    enable_tmdb_cache()
 
+    # --- Object-Oriented Approach ---
+    # Creating the files is cheap; MediaInfo, guessit and TMDB are then resolved for all of
+    # them at once, and only the files needing a TMDB choice prompt in the loop below
+    media_files = []
     for path in pathList:
-        # --- Object-Oriented Approach ---
-        guessItOutput = guessit.guessit(os.path.basename(path))
+        guessItOutput = cached_guessit(path)
         is_movie = guessItOutput.get('type') == 'movie'
-        
-        media_file = None
+
         try:
             if is_movie:
-                media_file = Movie(path, tmdb_api, arg.tmdb)
+                media_files.append((path, Movie(path, tmdb_api, arg.tmdb)))
             else:
-                media_file = TVShow(path, tmdb_api, arg.tmdb)
+                media_files.append((path, TVShow(path, tmdb_api, arg.tmdb)))
         except ValueError as e:
             logging.error(e)
-            continue
+    prefetch([media_file for _, media_file in media_files])
 
+    for path, media_file in media_files:
         group = arg.group or media_file.guessit_info.get('release_group', 'NOGRP')
         if isinstance(group, list):
             group = group[0]
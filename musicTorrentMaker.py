@@ -33,6 +33,9 @@ from torrent_utils.helpers import (
     getUserInput as _getUserInput, qbitInject, similarity, get_path_list, ensure_flac_cli,
 )
 from torrent_utils.config_loader import load_settings, validate_settings
+from torrent_utils.hashing import generate_torrent
+from torrent_utils.piece_size import apply_piece_size
+from torrent_utils.http_pool import configure_http
 from torrent_utils.music_upload import (
     MusicUploadMetadata,
     build_ops_payload,
@@ -63,23 +66,41 @@ def tracker_torrent_filename(base_name: str, tracker_source: str | None = None)
     return f"{root} [{tracker_source}]{ext or '.torrent'}"
 
 
-def create_torrent_file(content_path: str, run_dir: str, torrent_file_name: str, announce_url: str | None = None, source: str | None = None, tracker_label: str = "local") -> str:
-    torrent = torf.Torrent()
-    torrent.private = True
-    if source:
-        torrent.source = source
-    if announce_url:
-        torrent.trackers.append(announce_url)
-    torrent.path = content_path
+def create_torrent_file(content_path: str, run_dir: str, torrent_file_name: str, announce_url: str | None = None, source: str | None = None, tracker_label: str = "local", settings=None) -> str:
+    written = create_torrent_files(content_path, run_dir, {
+        tracker_label: (torrent_file_name, announce_url, source, tracker_label),
+    }, settings)
+    return written[tracker_label]
+
+
+def create_torrent_files(content_path: str, run_dir: str, targets: dict, settings=None) -> dict:
+    """Hashes content_path once and writes one .torrent per tracker from the shared piece table.
+
+    targets maps a key to (torrent_file_name, announce_url, source, tracker_label). The source
+    field and announce URL are not part of the piece data, so every tracker's torrent
+    reuses the same pieces. Returns a dict mapping each key to its written file name.
+    """
+    base = torf.Torrent()
+    base.private = True
+    base.path = content_path
+    apply_piece_size(base, settings)
 
-    logging.info(f"Creating {tracker_label} torrent file")
+    labels = ", ".join(target[3] for target in targets.values())
+    logging.info(f"Creating torrent file(s) for: {labels}")
     logging.info("Generating torrent file hash. This will take a long while...")
-    torrent.generate(callback=make_torrent_progress_callback(), interval=0.25)
-    logging.info("Writing torrent file to disk...")
-    torrent_path = os.path.join(run_dir, torrent_file_name)
-    torrent.write(torrent_path)
-    logging.info(f"{tracker_label} torrent file wrote to {torrent_file_name}")
-    return torrent_file_name
+    generate_torrent(base, callback=make_torrent_progress_callback(), interval=0.25)
+
+    written = {}
+    for key, (torrent_file_name, announce_url, source, tracker_label) in targets.items():
+        torrent = base.copy()
+        torrent.source = source
+        if announce_url:
+            torrent.trackers.append(announce_url)
+        logging.info(f"Writing {tracker_label} torrent file to disk...")
+        torrent.write(os.path.join(run_dir, torrent_file_name))
+        logging.info(f"{tracker_label} torrent file wrote to {torrent_file_name}")
+        written[key] = torrent_file_name
+    return written
 
 
 def prepend_description(description: str, prefix: str | None = None) -> str:
@@ -311,6 +332,7 @@ def main():
 
     # --- Load and Validate Settings ---
     settings = load_settings()
+    configure_http(settings)
     
     required_settings = []
     if arg.upload:
@@ -559,19 +581,14 @@ def main():
             logging.info("Hardlinks created at " + destination)
             torrentContentPath = destination
 
-        torrent_files = {}
+        torrent_targets = {}
         if arg.upload:
-            red_torrent_name = tracker_torrent_filename(baseTorrentFileName, "RED")
-            torrent_files["red"] = create_torrent_file(
-                torrentContentPath, runDir, red_torrent_name, red_announce_url, "RED", "REDacted"
-            )
+            torrent_targets["red"] = (tracker_torrent_filename(baseTorrentFileName, "RED"), red_announce_url, "RED", "REDacted")
         if arg.ops:
-            ops_torrent_name = tracker_torrent_filename(baseTorrentFileName, "OPS")
-            torrent_files["ops"] = create_torrent_file(
-                torrentContentPath, runDir, ops_torrent_name, ops_announce_url, "OPS", "Orpheus"
-            )
+            torrent_targets["ops"] = (tracker_torrent_filename(baseTorrentFileName, "OPS"), ops_announce_url, "OPS", "Orpheus")
         if not (arg.upload or arg.ops):
-            torrent_files["local"] = create_torrent_file(torrentContentPath, runDir, baseTorrentFileName)
+            torrent_targets["local"] = (baseTorrentFileName, None, None, "local")
+        torrent_files = create_torrent_files(torrentContentPath, runDir, torrent_targets, settings)
 
         seedbox_copied = False
 
@@ -0,0 +1,17 @@
+"""Fixtures shared by the test modules."""
+import os
+
+import pytest
+
+
+@pytest.fixture
+def make_content(tmp_path):
+    """Returns a factory that writes files of random bytes, E01.mkv, E02.mkv... with the
+    given *sizes*, into a new *name* folder under tmp_path (or under tmp_path/*parent*)."""
+    def make(sizes, name="Show.S01", parent=""):
+        content = tmp_path / parent / name
+        content.mkdir(parents=True)
+        for i, size in enumerate(sizes, 1):
+            (content / f"E{i:02d}.mkv").write_bytes(os.urandom(size))
+        return content
+    return make
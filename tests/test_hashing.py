@@ -0,0 +1,163 @@
+"""Tests for torrent_utils/hashing.py"""
+import os
+
+import pytest
+import torf
+
+
+def _torrent(path, piece_size=16 * 1024):
+    torrent = torf.Torrent(path=str(path), private=True, source="HUNO",
+                           trackers=["https://example.test/announce"], creation_date=1700000000)
+    torrent.piece_size = piece_size
+    return torrent
+
+
+class TestHashPieceRange:
+    def test_matches_torf_across_file_boundaries(self, make_content):
+        from torrent_utils import hashing
+
+        content = make_content([40_000, 1, 70_001, 16 * 1024])
+        reference = _torrent(content)
+        reference.generate()
+
+        layout = hashing.torrent_layout(reference)
+        digests = hashing.hash_piece_range(layout, reference.piece_size, 0, reference.pieces)
+
+        assert b"".join(digests) == reference.metainfo["info"]["pieces"]
+
+    def test_partial_range_returns_only_requested_pieces(self, make_content):
+        from torrent_utils import hashing
+
+        content = make_content([50_000, 30_000])
+        reference = _torrent(content)
+        reference.generate()
+
+        layout = hashing.torrent_layout(reference)
+        digests = hashing.hash_piece_range(layout, reference.piece_size, 2, 4)
+
+        assert digests == list(reference.hashes[2:4])
+
+    def test_small_read_chunks_give_same_digests(self, make_content, monkeypatch):
+        from torrent_utils import hashing
+
+        content = make_content([100_000, 20_000])
+        reference = _torrent(content)
+        reference.generate()
+
+        monkeypatch.setattr(hashing, "READ_CHUNK_SIZE", 1)
+        layout = hashing.torrent_layout(reference)
+        digests = hashing.hash_piece_range(layout, reference.piece_size, 0, reference.pieces)
+
+        assert tuple(digests) == reference.hashes
+
+
+class TestGenerateTorrent:
+    def test_process_pool_output_is_byte_identical_to_torf(self, make_content, monkeypatch):
+        from torrent_utils import hashing
+
+        content = make_content([123_457, 65_536, 7, 99_999])
+        reference = _torrent(content)
+        reference.generate()
+
+        # Force several batches so results from different workers are stitched together
+        monkeypatch.setattr(hashing, "BATCH_SIZE", 3 * 16 * 1024)
+        torrent = _torrent(content)
+        assert hashing.generate_torrent(torrent, workers=2) is True
+
+        assert torrent.dump() == reference.dump()
+
+    def test_single_file_torrent(self, tmp_path):
+        from torrent_utils import hashing
+
+        movie = tmp_path / "Movie.mkv"
+        movie.write_bytes(os.urandom(90_000))
+        reference = _torrent(movie)
+        reference.generate()
+
+        torrent = _torrent(movie)
+        hashing.generate_torrent(torrent, workers=2)
+
+        assert torrent.dump() == reference.dump()
+
+    def test_progress_callback_is_driven_to_completion(self, make_content, monkeypatch):
+        from torrent_utils import hashing
+
+        content = make_content([200_000])
+        monkeypatch.setattr(hashing, "BATCH_SIZE", 4 * 16 * 1024)
+        torrent = _torrent(content)
+        calls = []
+
+        hashing.generate_torrent(torrent, workers=2,
+                                 callback=lambda t, path, done, total: calls.append((t, done, total)))
+
+        assert calls[-1] == (torrent, torrent.pieces, torrent.pieces)
+
+    def test_callback_can_cancel_hashing(self, make_content, monkeypatch):
+        from torrent_utils import hashing
+
+        content = make_content([200_000])
+        monkeypatch.setattr(hashing, "BATCH_SIZE", 16 * 1024)
+        torrent = _torrent(content)
+
+        assert hashing.generate_torrent(torrent, workers=2, callback=lambda *args: "stop") is False
+        assert "pieces" not in torrent.metainfo["info"]
+
+    def test_without_workers_or_posix_reads_uses_torf_generate(self, make_content, monkeypatch):
+        from unittest.mock import patch
+        from torrent_utils import hashing
+
+        content = make_content([1000])
+        torrent = _torrent(content)
+        monkeypatch.setattr(hashing, "POSIX_READS", False)
+
+        with patch.object(torf.Torrent, "generate", return_value=True) as generate:
+            assert hashing.generate_torrent(torrent, workers=None, interval=0.25) is True
+
+        generate.assert_called_once_with(callback=None, interval=0.25)
+
+    @pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="POSIX read path not available")
+    def test_single_worker_uses_posix_reads_with_identical_output(self, make_content):
+        from unittest.mock import patch
+        from torrent_utils import hashing
+
+        content = make_content([40_000, 70_001])
+        reference = _torrent(content)
+        reference.generate()
+        torrent = _torrent(content)
+
+        with patch.object(torf.Torrent, "generate") as generate, \
+                patch("torrent_utils.hashing.os.posix_fadvise", wraps=os.posix_fadvise) as fadvise:
+            assert hashing.generate_torrent(torrent, workers=1) is True
+
+        generate.assert_not_called()
+        advice = {call.args[3] for call in fadvise.call_args_list}
+        assert advice == {os.POSIX_FADV_SEQUENTIAL, os.POSIX_FADV_DONTNEED}
+        assert torrent.dump() == reference.dump()
+
+
+class TestReadChunks:
+    @pytest.mark.parametrize("posix_reads", [True, False])
+    def test_both_backends_read_the_same_bytes(self, tmp_path, monkeypatch, posix_reads):
+        from torrent_utils import hashing
+
+        if posix_reads and not hashing.POSIX_READS:
+            pytest.skip("POSIX read path not available")
+        monkeypatch.setattr(hashing, "POSIX_READS", posix_reads)
+        data = os.urandom(100_000)
+        path = tmp_path / "file.bin"
+        path.write_bytes(data)
+        view = memoryview(bytearray(16 * 1024))
+
+        chunks = [bytes(chunk) for chunk in hashing._read_chunks(str(path), 1000, 90_000, view)]
+
+        assert b"".join(chunks) == data[1000:91_000]
+        assert max(len(chunk) for chunk in chunks) == 16 * 1024
+
+    def test_truncated_file_raises(self, tmp_path):
+        from torrent_utils import hashing
+
+        path = tmp_path / "file.bin"
+        path.write_bytes(b"x" * 100)
+
+        with pytest.raises(OSError, match="Unexpected end of file"):
+            list(hashing._read_chunks(str(path), 0, 200, memoryview(bytearray(64))))
@@ -104,6 +104,17 @@ class TestPromptAlerts:
 
         alert.assert_called_once_with("done")
 
+    def test_torrent_progress_callback_stops_hashing_once_cancelled(self):
+        import threading
+
+        from torrent_utils import helpers
+
+        cancel = threading.Event()
+        callback = helpers.make_torrent_progress_callback(cancel=cancel)
+        assert callback(None, None, 1, 10) is None
+        cancel.set()
+        assert callback(None, None, 2, 10) is not None
+
 
 # ---------------------------------------------------------------------------
 # get_season / get_episode
@@ -202,7 +213,7 @@ class TestUploadToPTPIMG:
         img = tmp_path / "shot.png"
         img.write_bytes(b"\x89PNG\r\n")
         mock_resp = self._mock_response(json_data=[{"code": "abc123", "ext": "png"}])
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = uploadToPTPIMG(str(img), "testapikey")
         assert url == "https://ptpimg.me/abc123.png"
 
@@ -215,7 +226,7 @@ class TestUploadToPTPIMG:
             status_code=403,
             raise_for_status=req.exceptions.HTTPError("403"),
         )
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             assert uploadToPTPIMG(str(img), "badkey") is None
 
     def test_bad_json_returns_none(self, tmp_path):
@@ -224,7 +235,7 @@ class TestUploadToPTPIMG:
         img.write_bytes(b"\x89PNG\r\n")
         # Empty list causes IndexError on response_data[0], which is caught
         mock_resp = self._mock_response(json_data=[])
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             assert uploadToPTPIMG(str(img), "key") is None
 
 
@@ -242,7 +253,7 @@ class TestUploadToImgbb:
         mock_resp.json.return_value = {
             "data": {"url": "https://i.ibb.co/img.png", "url_viewer": "https://ibb.co/img"}
         }
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url, viewer = upload_to_imgbb(str(img), "apikey")
         assert url == "https://i.ibb.co/img.png"
         assert viewer == "https://ibb.co/img"
@@ -254,7 +265,7 @@ class TestUploadToImgbb:
         img.write_bytes(b"\x89PNG\r\n")
         mock_resp = MagicMock()
         mock_resp.raise_for_status.side_effect = req.exceptions.HTTPError("500")
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url, viewer = upload_to_imgbb(str(img), "key")
         assert url is None and viewer is None
 
@@ -271,7 +282,7 @@ class TestUploadToCatbox:
         mock_resp = MagicMock()
         mock_resp.raise_for_status.return_value = None
         mock_resp.text = "https://files.catbox.moe/abc123.png"
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             result = upload_to_catbox(str(img))
         assert "catbox.moe" in result
 
@@ -282,7 +293,7 @@ class TestUploadToCatbox:
         mock_resp = MagicMock()
         mock_resp.raise_for_status.return_value = None
         mock_resp.text = "error: file too large"
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             assert upload_to_catbox(str(img)) is None
 
 
@@ -301,7 +312,7 @@ class TestUploadToOnlyimage:
             "status_code": 200,
             "image": {"url": "https://onlyimage.org/image/abc123.png"}
         }
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_onlyimage(str(img), "apikey")
         assert url == "https://onlyimage.org/image/abc123.png"
 
@@ -312,7 +323,7 @@ class TestUploadToOnlyimage:
         img.write_bytes(b"\x89PNG\r\n")
         mock_resp = MagicMock()
         mock_resp.raise_for_status.side_effect = req.exceptions.HTTPError("401")
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_onlyimage(str(img), "badkey")
         assert url is None
 
@@ -326,7 +337,7 @@ class TestUploadToOnlyimage:
             "status_code": 400,
             "error": {"message": "Invalid API key"}
         }
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_onlyimage(str(img), "badkey")
         assert url is None
 
@@ -338,7 +349,7 @@ class TestUploadToOnlyimage:
         mock_resp = MagicMock()
         mock_resp.raise_for_status.return_value = None
         mock_resp.json.side_effect = json.JSONDecodeError("msg", "doc", 0)
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_onlyimage(str(img), "key")
         assert url is None
 
@@ -358,10 +369,10 @@ class TestUploadToHawkepics:
             "status_code": 200,
             "image": {"url": "https://hawke.pics/image/abc123.png"}
         }
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp) as mock_post:
+        with patch("requests.Session.post", return_value=mock_resp) as mock_post:
             url = upload_to_hawkepics(str(img), "apikey")
         assert url == "https://hawke.pics/image/abc123.png"
-        assert mock_post.call_args.kwargs["headers"] == {"X-API-Key": "apikey"}
+        assert mock_post.call_args.kwargs["headers"]["X-API-Key"] == "apikey"
 
     def test_http_error_returns_none(self, tmp_path):
         from torrent_utils.helpers import upload_to_hawkepics
@@ -370,7 +381,7 @@ class TestUploadToHawkepics:
         img.write_bytes(b"\x89PNG\r\n")
         mock_resp = MagicMock()
         mock_resp.raise_for_status.side_effect = req.exceptions.HTTPError("401")
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_hawkepics(str(img), "badkey")
         assert url is None
 
@@ -384,6 +395,6 @@ class TestUploadToHawkepics:
             "status_code": 400,
             "error": {"message": "Invalid API key"}
         }
-        with patch("torrent_utils.helpers.requests.post", return_value=mock_resp):
+        with patch("requests.Session.post", return_value=mock_resp):
             url = upload_to_hawkepics(str(img), "badkey")
         assert url is None
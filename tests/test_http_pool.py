@@ -0,0 +1,82 @@
+"""Tests for torrent_utils/http_pool.py"""
+import threading
+from unittest.mock import patch
+
+
+class TestSessionRegistry:
+    def test_one_session_per_host(self):
+        from torrent_utils.http_pool import SessionRegistry
+
+        registry = SessionRegistry()
+
+        ptpimg = registry.get("https://ptpimg.me/upload.php")
+        assert registry.get("https://ptpimg.me/other") is ptpimg
+        assert registry.get("https://catbox.moe/user/api.php") is not ptpimg
+
+    def test_session_shared_across_threads(self):
+        from torrent_utils.http_pool import SessionRegistry
+
+        registry = SessionRegistry()
+        sessions = []
+        threads = [threading.Thread(target=lambda: sessions.append(registry.get("https://hawke.pics/api")))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(session) for session in sessions}) == 1
+
+    def test_pool_only_grows_and_retry_policy_applied(self):
+        from torrent_utils.http_pool import SessionRegistry, make_retry
+
+        registry = SessionRegistry(pool_size=5)
+        session = registry.get("https://ptpimg.me")
+
+        registry.configure(pool_size=2)
+        assert session.get_adapter("https://ptpimg.me")._pool_maxsize == 5
+        registry.configure(pool_size=8, retry=make_retry(1, 2.0))
+        adapter = session.get_adapter("https://ptpimg.me")
+        assert adapter._pool_maxsize == 8
+        assert adapter.max_retries.total == 1 and adapter.max_retries.backoff_factor == 2.0
+        assert 429 in adapter.max_retries.status_forcelist
+
+    def test_retry_after_is_capped(self):
+        from unittest.mock import Mock
+
+        from torrent_utils.http_pool import MAX_RETRY_WAIT, make_retry
+
+        retry = make_retry()
+        response = Mock(headers={"Retry-After": "3600"})
+        assert retry.get_retry_after(response) == MAX_RETRY_WAIT
+        assert retry.new(total=1).get_retry_after(response) == MAX_RETRY_WAIT
+        assert retry.get_retry_after(Mock(headers={"Retry-After": "2"})) == 2
+
+    def test_retried_statuses_remembered(self):
+        from types import SimpleNamespace
+
+        from urllib3.util.retry import RequestHistory
+
+        from torrent_utils import http_pool
+
+        retries = SimpleNamespace(history=(RequestHistory("POST", "/upload", None, 429, None),))
+        http_pool._remember_status(SimpleNamespace(status_code=200, raw=SimpleNamespace(retries=retries)))
+        assert (http_pool.last_status(), http_pool.retried_statuses()) == (200, (429,))
+        http_pool.reset_last_status()
+        assert http_pool.retried_statuses() == ()
+
+
+class TestConfigureHttp:
+    def test_settings_parsed(self):
+        from torrent_utils import http_pool
+
+        with patch.object(http_pool, "_registry", http_pool.SessionRegistry()) as registry:
+            http_pool.configure_http({"HTTP_RETRIES": "5", "HTTP_BACKOFF": "1.5"})
+            assert (registry.retry.total, registry.retry.backoff_factor) == (5, 1.5)
+
+    def test_bad_settings_fall_back_to_defaults(self):
+        from torrent_utils import http_pool
+
+        with patch.object(http_pool, "_registry", http_pool.SessionRegistry()) as registry:
+            http_pool.configure_http({"HTTP_RETRIES": "lots", "HTTP_BACKOFF": ""})
+            assert registry.retry.total == http_pool.DEFAULT_RETRIES
@@ -0,0 +1,175 @@
+"""Tests for torrent_utils/image_upload.py"""
+import threading
+import time
+
+
+def _host(key, url=None, delay=0.0, calls=None, release=None):
+    def upload(path):
+        if calls is not None:
+            calls.append(key)
+        if release is not None:
+            release.wait(5)
+        time.sleep(delay)
+        return url
+    return key, key.title(), upload
+
+
+class TestHedgedUpload:
+    def test_without_budget_hosts_run_one_after_another(self):
+        from torrent_utils.image_upload import hedged_upload
+
+        calls = []
+        hosts = [_host("hawkepics", None, 0.05, calls), _host("ptpimg", "https://ptpimg.me/a.png", 0, calls),
+                 _host("catbox", "https://files.catbox.moe/a.png", 0, calls)]
+
+        assert hedged_upload("a.png", hosts, hedge_after=None) == ("ptpimg", "Ptpimg", "https://ptpimg.me/a.png")
+        assert calls == ["hawkepics", "ptpimg"]
+
+    def test_silent_host_is_raced_by_the_next(self):
+        from torrent_utils.image_upload import hedged_upload
+
+        release = threading.Event()
+        hosts = [_host("hawkepics", "https://hawke.pics/a.png", release=release),
+                 _host("ptpimg", "https://ptpimg.me/a.png")]
+
+        started = time.monotonic()
+        try:
+            result = hedged_upload("a.png", hosts, hedge_after=0.05)
+        finally:
+            release.set()
+
+        assert result[0] == "ptpimg"
+        assert time.monotonic() - started < 2
+
+    def test_losing_upload_stops_sending_and_is_not_recorded(self, tmp_path):
+        from torrent_utils.image_upload import HostStats, hedged_upload
+        from torrent_utils.multipart import FilePart, MultipartStream, UploadCancelled
+
+        image = tmp_path / "a.png"
+        image.write_bytes(b"x" * 1024)
+        outcome = []
+        stopped = threading.Event()
+
+        def slow(path):
+            body = MultipartStream({"source": FilePart(path)})
+            try:
+                for _ in range(500):
+                    body.read(1)
+                    time.sleep(0.01)
+            except UploadCancelled:
+                outcome.append("cancelled")
+            finally:
+                stopped.set()
+            return "https://hawke.pics/a.png"
+
+        stats = HostStats()
+        hosts = [("hawkepics", "Hawkepics", slow), _host("ptpimg", "https://ptpimg.me/a.png")]
+        result = hedged_upload(str(image), hosts, hedge_after=0.05, stats=stats)
+
+        assert result[0] == "ptpimg"
+        assert stopped.wait(2) and outcome == ["cancelled"]
+        assert set(stats.records) == {"ptpimg"}
+
+    def test_all_hosts_failing_returns_none(self):
+        from torrent_utils.image_upload import HostStats, hedged_upload
+
+        def broken(path):
+            raise RuntimeError("boom")
+
+        stats = HostStats()
+        hosts = [_host("ptpimg"), ("catbox", "Catbox", broken)]
+
+        assert hedged_upload("a.png", hosts, hedge_after=1, stats=stats) is None
+        assert stats.records["ptpimg"].success_rate == 0 and stats.records["catbox"].samples == 1
+
+
+class TestHostStats:
+    def test_slow_or_failing_hosts_move_to_the_back(self):
+        from torrent_utils.image_upload import HostStats
+
+        stats = HostStats()
+        for _ in range(3):
+            stats.record("hawkepics", 25.0, True)
+            stats.record("ptpimg", 1.0, False)
+            stats.record("imgbb", 1.0, True)
+        hosts = [("hawkepics",), ("ptpimg",), ("imgbb",), ("catbox",)]
+
+        assert stats.order(hosts) == [("imgbb",), ("catbox",), ("hawkepics",), ("ptpimg",)]
+
+    def test_too_few_samples_keep_preference(self):
+        from torrent_utils.image_upload import HostStats
+
+        stats = HostStats()
+        stats.record("hawkepics", 60.0, False)
+
+        assert stats.order([("hawkepics",), ("catbox",)]) == [("hawkepics",), ("catbox",)]
+
+    def test_stats_persist_in_their_store(self, tmp_path):
+        from torrent_utils.image_upload import HostStats
+        from torrent_utils.upload_cache import HostStatsStore
+
+        store = HostStatsStore(str(tmp_path / "host_stats.sqlite3"))
+        HostStats(store).record("catbox", 2.0, True)
+
+        record = HostStats(store).records["catbox"]
+        assert (record.latency, record.success_rate, record.samples) == (2.0, 1.0, 1)
+
+    def test_unusable_store_leaves_stats_in_memory(self, tmp_path):
+        from torrent_utils.image_upload import HostStats
+        from torrent_utils.upload_cache import HostStatsStore
+
+        (tmp_path / "host_stats.sqlite3").mkdir()
+        stats = HostStats(HostStatsStore(str(tmp_path / "host_stats.sqlite3")))
+        stats.record("catbox", 2.0, True)
+
+        assert stats.records["catbox"].samples == 1
+
+
+class TestAdaptiveLimiter:
+    def test_fast_successes_grow_and_throttling_halves(self):
+        from torrent_utils.image_upload import AdaptiveLimiter
+
+        limiter = AdaptiveLimiter(initial=2, maximum=4)
+        for _ in range(6):
+            limiter.feedback("ptpimg", 0.5, True)
+        assert limiter.limit("ptpimg") == 4
+
+        limiter.feedback("ptpimg", 0.5, False, throttled=True)
+        assert limiter.limit("ptpimg") == 2
+        limiter.feedback("ptpimg", 60.0, True)
+        assert limiter.limit("ptpimg") == 1
+
+    def test_slot_waits_for_a_free_upload(self):
+        from torrent_utils.image_upload import AdaptiveLimiter
+
+        limiter = AdaptiveLimiter(initial=1)
+        entered = threading.Event()
+
+        def second():
+            with limiter.slot("catbox"):
+                entered.set()
+
+        with limiter.slot("catbox"):
+            worker = threading.Thread(target=second)
+            worker.start()
+            assert not entered.wait(0.1)
+            with limiter.slot("imgbb"):
+                pass
+        worker.join(2)
+        assert entered.is_set()
+
+    def test_throttled_response_reaches_the_limiter(self):
+        from types import SimpleNamespace
+
+        from torrent_utils.http_pool import _remember_status
+        from torrent_utils.image_upload import AdaptiveLimiter, hedged_upload
+
+        def throttled(path):
+            _remember_status(SimpleNamespace(status_code=429))
+            return None
+
+        limiter = AdaptiveLimiter(initial=4)
+        hosts = [("imgbb", "ImgBB", throttled), _host("catbox", "https://files.catbox.moe/a.png")]
+
+        assert hedged_upload("a.png", hosts, hedge_after=None, limiter=limiter)[0] == "catbox"
+        assert limiter.limit("imgbb") == 2 and limiter.limit("catbox") == 4
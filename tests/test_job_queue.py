@@ -0,0 +1,98 @@
+"""Tests for torrent_utils/job_queue.py"""
+import sys
+import threading
+import time
+
+
+def _store(tmp_path):
+    from torrent_utils.job_queue import JobStore
+    return JobStore(str(tmp_path / "runs" / "jobs.sqlite3"))
+
+
+class TestJobStore:
+    def test_enqueue_is_idempotent_and_keeps_order(self, tmp_path):
+        store = _store(tmp_path)
+        first = store.enqueue(["b", "a"])
+        second = store.enqueue(["a", "b", "c"])
+
+        assert [job.path for job in second] == [str(tmp_path.cwd() / p) for p in ("a", "b", "c")]
+        assert {job.id for job in first} <= {job.id for job in second}
+
+    def test_stage_results_roundtrip(self, tmp_path):
+        store = _store(tmp_path)
+        job = store.enqueue(["release"])[0]
+        store.record_stage(job.id, "screenshots", "done", 1.5, [1.0, 2.0])
+        store.record_stage(job.id, "upload", "failed", 0.1)
+
+        assert store.completed_stages(job.id) == {"screenshots": [1.0, 2.0]}
+
+
+class TestRunQueue:
+    def test_failed_job_is_resumed_with_its_run_dir_and_finished_stages(self, tmp_path):
+        from torrent_utils.job_queue import run_queue
+        from torrent_utils.stages import StageScheduler
+
+        store = _store(tmp_path)
+        run_dir = tmp_path / "runs" / "001"
+        calls = []
+
+        def process(path, job, fail):
+            if job.run_dir is None:
+                run_dir.mkdir(parents=True)
+                job.set_run_dir(str(run_dir))
+
+            def screenshots():
+                calls.append("screenshots")
+                return [5.0]
+
+            def upload():
+                calls.append("upload")
+                if fail:
+                    sys.exit(1)
+                return "ok"
+
+            scheduler = StageScheduler(store=job, limits=job.limits)
+            scheduler.add("screenshots", screenshots)
+            scheduler.add("upload", upload, deps=["screenshots"])
+            with job.without_prompts():
+                scheduler.run()
+
+        counts = run_queue(["release"], lambda p, j: process(p, j, True), store=store)
+        assert counts == {"done": 0, "failed": 1}
+
+        counts = run_queue(["release"], lambda p, j: process(p, j, False), store=store)
+        assert counts == {"done": 1, "failed": 0}
+        assert calls == ["screenshots", "upload", "upload"]
+
+        job = store.enqueue(["release"])[0]
+        assert (job.status, job.run_dir) == ("done", str(run_dir))
+        assert store.completed_stages(job.id) == {"screenshots": [5.0], "upload": "ok"}
+
+    def test_done_jobs_are_skipped(self, tmp_path):
+        from torrent_utils.job_queue import run_queue
+
+        store = _store(tmp_path)
+        processed = []
+        run_queue(["a", "b"], lambda path, job: processed.append(path), store=store)
+        run_queue(["a", "b", "c"], lambda path, job: processed.append(path), store=store)
+
+        assert [p.rsplit("/", 1)[-1] for p in processed] == ["a", "b", "c"]
+
+    def test_prompts_are_serialised_but_stages_overlap(self, tmp_path):
+        from torrent_utils.job_queue import run_queue
+
+        store = _store(tmp_path)
+        in_prompt = []
+        overlapping = threading.Barrier(2, timeout=5)
+
+        def process(path, job):
+            in_prompt.append(path)
+            assert len(in_prompt) == 1  # only one job may be asking questions
+            time.sleep(0.02)
+            in_prompt.remove(path)
+            with job.without_prompts():
+                overlapping.wait()  # both jobs reach their stages at the same time
+
+        counts = run_queue(["a", "b"], process, max_jobs=2, store=store)
+
+        assert counts == {"done": 2, "failed": 0}
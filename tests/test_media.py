@@ -30,9 +30,8 @@ def _make_media_info(video: dict = None, audio: dict = None, audio_tracks: list
 def _make_media_file(filename="test.mkv", media_info=None):
     """Construct a MediaFile with mocked pymediainfo and guessit."""
     from torrent_utils.media import MediaFile
-    with patch("torrent_utils.media.MediaInfo.parse", return_value="{}"), \
-         patch("torrent_utils.media.json.loads", return_value=media_info or {}), \
-         patch("torrent_utils.media.guessit.guessit", return_value={}):
+    with patch("torrent_utils.media.media_info_report"), \
+         patch("torrent_utils.media.cached_guessit", return_value={}):
         obj = MediaFile.__new__(MediaFile)
         obj.path = filename
         obj.filename = filename
@@ -41,6 +40,35 @@ def _make_media_file(filename="test.mkv", media_info=None):
     return obj
 
 
+# ---------------------------------------------------------------------------
+# TrackIndex
+# ---------------------------------------------------------------------------
+
+class TestTrackIndex:
+    def test_tracks_grouped_by_type(self):
+        from torrent_utils.media import TrackIndex
+        index = TrackIndex.build(_make_media_info(
+            video={"Format": "HEVC"},
+            audio_tracks=[{"Language": "en"}, {"Language": "en", "Title": "Director's Commentary"}],
+        ))
+        assert index.video["Format"] == "HEVC"
+        assert index.audio == {"@type": "Audio", "Language": "en"}
+        assert len(index.audio_tracks) == 2 and len(index.by_type["General"]) == 1
+        assert index.primary_audio == (index.audio,)
+        assert not index.hdr
+
+    def test_empty_media_info(self):
+        from torrent_utils.media import TrackIndex
+        index = TrackIndex.build({})
+        assert (index.video, index.audio, index.audio_tracks, index.hdr) == ({}, {}, (), False)
+
+    def test_index_is_built_once_and_rebuilt_for_new_media_info(self):
+        f = _make_media_file(media_info=_make_media_info(video={"Width": "1920"}))
+        assert f.tracks is f.tracks
+        f.media_info = _make_media_info(video={"Width": "3840", "HDR_Format": "SMPTE ST 2086"})
+        assert f.video_track["Width"] == "3840" and f.tracks.hdr
+
+
 # ---------------------------------------------------------------------------
 # get_resolution
 # ---------------------------------------------------------------------------
@@ -351,11 +379,11 @@ class TestFilenameForGuessit:
 
 def _make_av1_mediafile(filename):
     """Create a real MediaFile instance (mocked _parse_media_info) with AV1 video."""
-    from torrent_utils.media import MediaFile
+    from torrent_utils.media import MediaFile, prefetch
     video = {"Format": "AV1", "Width": "1920", "Height": "1080"}
     media_info = _make_media_info(video=video)
     with patch.object(MediaFile, "_parse_media_info", return_value=media_info):
-        return MediaFile(filename)
+        return prefetch([MediaFile(filename)])[0]
 
 
 class TestAV1GuessitIntegration:
@@ -385,7 +413,7 @@ class TestAV1GuessitIntegration:
 
 def _make_av1_tvshow(filename):
     """Create a TVShow with AV1 video/DDP audio/English, mocked metadata and network calls."""
-    from torrent_utils.media import TVShow
+    from torrent_utils.media import TVShow, prefetch
     video = {"Format": "AV1", "Width": "1920", "Height": "1080"}
     audio = {
         "Format": "E-AC-3",
@@ -398,8 +426,9 @@ def _make_av1_tvshow(filename):
     mock_resp = MagicMock()
     mock_resp.json.return_value = {"name": "Test Show", "first_air_date": "2023-01-01"}
     with patch.object(TVShow, "_parse_media_info", return_value=media_info), \
-         patch("torrent_utils.media.requests.get", return_value=mock_resp):
-        return TVShow(filename, tmdb_api_key="fake", tmdb_id=12345)
+         patch.dict("torrent_utils.tmdb._clients", clear=True), \
+         patch("requests.Session.get", return_value=mock_resp):
+        return prefetch([TVShow(filename, tmdb_api_key="fake", tmdb_id=12345)])[0]
 
 
 class TestAV1GenerateName:
@@ -426,3 +455,38 @@ class TestAV1GenerateName:
         f = _make_av1_tvshow("Show.S01E01.1080p.NF.WEB-DL.DDP5.1.AV1-GRP.mkv")
         name = f.generate_name(source="NF WEB-DL", group="GRP", huno_format=True)
         assert name == "Test Show (2023) S01E01 (1080p NF WEB-DL AV1 SDR DDP 5.1 English - GRP).mkv"
+
+
+# ---------------------------------------------------------------------------
+# Lazy construction and prefetch
+# ---------------------------------------------------------------------------
+
+class TestLazyMediaFile:
+    def test_construction_does_no_work(self):
+        from torrent_utils.media import Movie
+        with patch.object(Movie, "_parse_media_info") as parse, \
+             patch("torrent_utils.media.cached_guessit") as guess, \
+             patch("torrent_utils.media.get_tmdb_id") as search:
+            Movie("Film.2020.1080p.BluRay.x264-GRP.mkv", tmdb_api_key="fake")
+        parse.assert_not_called()
+        guess.assert_not_called()
+        search.assert_not_called()
+
+    def test_prefetch_leaves_ambiguous_matches_for_the_prompt(self):
+        from torrent_utils.media import Movie, prefetch
+        candidates = [{"id": 7, "name": "Film", "year": "2020"}]
+        mock_resp = MagicMock()
+        mock_resp.json.return_value = {"title": "Film", "release_date": "2020-05-01"}
+        with patch.object(Movie, "_parse_media_info", return_value=_make_media_info(video={"Format": "AVC"})), \
+             patch("torrent_utils.media.get_tmdb_id", return_value=(None, candidates)) as search, \
+             patch("torrent_utils.media._prompt_tmdb_candidates", return_value=7) as prompt, \
+             patch.dict("torrent_utils.tmdb._clients", clear=True), \
+             patch("requests.Session.get", return_value=mock_resp):
+            films = prefetch([Movie(f"Film.2020.Part.{i}.mkv", tmdb_api_key="fake") for i in range(3)])
+            prompt.assert_not_called()
+            assert all(f.guessit_info["title"] == "Film" for f in films)
+
+            assert films[0].metadata["title"] == "Film"
+        assert search.call_count == 3
+        prompt.assert_called_once_with(candidates, "movie")
+        assert films[0].tmdb_id == 7
@@ -0,0 +1,89 @@
+"""Tests for torrent_utils/media_cache.py"""
+import json
+import os
+from unittest.mock import patch
+
+
+def _service(store, calls):
+    from torrent_utils.mediainfo import MediaInfoService
+
+    def inform(path):
+        calls.append(path)
+        general = {"@type": "General", "CompleteName": path, "FileName": "old", "FileExtension": "mkv"}
+        return (f"General\nComplete name                            : {path}\nFormat : Matroska\n",
+                json.dumps({"media": {"@ref": path, "track": [general]}}))
+    return MediaInfoService(inform=inform, store=store)
+
+
+class TestMediaInfoCache:
+    def test_renamed_file_is_not_parsed_again(self, tmp_path):
+        from torrent_utils.media_cache import MediaCache
+
+        store = MediaCache(str(tmp_path / "media.sqlite3"))
+        old = tmp_path / "old.mkv"
+        old.write_bytes(b"mkv")
+        calls = []
+        _service(store, calls).report(str(old))
+
+        new = tmp_path / "Show (2020) S01E01.mkv"
+        os.rename(old, new)
+        report = _service(store, calls).report(str(new))
+
+        assert len(calls) == 1
+        assert f"Complete name                            : {new}\n" in report.text
+        general = report.data["media"]["track"][0]
+        assert (general["CompleteName"], general["FileName"]) == (str(new), "Show (2020) S01E01")
+
+    def test_modified_file_is_parsed_again(self, tmp_path):
+        from torrent_utils.media_cache import MediaCache
+
+        store = MediaCache(str(tmp_path / "media.sqlite3"))
+        video = tmp_path / "video.mkv"
+        video.write_bytes(b"mkv")
+        calls = []
+        _service(store, calls).report(str(video))
+
+        video.write_bytes(b"re-encoded")
+        _service(store, calls).report(str(video))
+
+        assert len(calls) == 2
+
+
+class TestGuessitCache:
+    def test_results_are_reused_per_file_and_name(self, tmp_path):
+        from torrent_utils import media_cache
+
+        video = tmp_path / "Show.S01E02.1080p.WEB-DL.DDP5.1.H.264-GRP.mkv"
+        video.write_bytes(b"mkv")
+
+        with patch.object(media_cache, "_cache", media_cache.MediaCache(str(tmp_path / "media.sqlite3"))):
+            first = media_cache.cached_guessit(str(video))
+            with patch("torrent_utils.media_cache.guessit.guessit") as guess:
+                again = media_cache.cached_guessit(str(video))
+                media_cache.cached_guessit(str(video), "Other.Name.S01E03.mkv")
+
+        assert again == json.loads(json.dumps(dict(first)))
+        assert (again["season"], again["episode"], again["release_group"]) == (1, 2, "GRP")
+        guess.assert_called_once_with("Other.Name.S01E03.mkv")
+
+    def test_disabled_cache_calls_guessit(self, tmp_path):
+        from torrent_utils import media_cache
+
+        with patch.object(media_cache, "_cache", None), \
+             patch("torrent_utils.media_cache.guessit.guessit", return_value={"title": "Show"}) as guess:
+            assert media_cache.cached_guessit(str(tmp_path / "Show.mkv")) == {"title": "Show"}
+
+        guess.assert_called_once_with("Show.mkv")
+
+
+class TestCacheLocation:
+    def test_default_path_does_not_depend_on_working_directory(self, tmp_path, monkeypatch):
+        import os
+
+        from torrent_utils import media_cache
+
+        monkeypatch.chdir(tmp_path)
+
+        assert os.path.isabs(media_cache.MEDIA_CACHE_FILE)
+        assert media_cache.MediaCache().db_path == os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(media_cache.__file__))), "runs", "media_cache.sqlite3")
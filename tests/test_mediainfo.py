@@ -0,0 +1,110 @@
+"""Tests for torrent_utils/mediainfo.py"""
+import json
+import os
+import threading
+import time
+
+
+def _fake_inform(calls):
+    def inform(path):
+        calls.append(path)
+        time.sleep(0.05)
+        return "General\r\nFormat : Matroska\r\n", json.dumps({"media": {"track": [{"@type": "General"}]}})
+    return inform
+
+
+class TestMediaInfoService:
+    def test_each_file_is_parsed_once(self, tmp_path):
+        from torrent_utils.mediainfo import MediaInfoService
+
+        video = tmp_path / "video.mkv"
+        video.write_bytes(b"mkv")
+        calls = []
+        service = MediaInfoService(inform=_fake_inform(calls))
+
+        threads = [threading.Thread(target=service.report, args=(str(video),)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report = service.report(str(video))
+
+        assert calls == [str(video)]
+        assert report.text == "General\nFormat : Matroska\n"
+        assert report.data["media"]["track"][0]["@type"] == "General"
+
+    def test_modified_file_is_parsed_again(self, tmp_path):
+        from torrent_utils.mediainfo import MediaInfoService
+
+        video = tmp_path / "video.mkv"
+        video.write_bytes(b"mkv")
+        calls = []
+        service = MediaInfoService(inform=_fake_inform(calls))
+
+        service.report(str(video))
+        video.write_bytes(b"remuxed")
+        service.report(str(video))
+
+        assert len(calls) == 2
+
+    def test_oldest_reports_are_dropped(self, tmp_path):
+        from torrent_utils.mediainfo import MediaInfoService
+
+        calls = []
+        service = MediaInfoService(max_reports=1, inform=_fake_inform(calls))
+        first, second = tmp_path / "a.mkv", tmp_path / "b.mkv"
+        first.write_bytes(b"a")
+        second.write_bytes(b"b")
+
+        for path in (first, second, first):
+            service.report(str(path))
+
+        assert len(calls) == 3
+
+
+class TestSingleParse:
+    def test_text_and_json_match_separate_parses(self, tmp_path):
+        from pymediainfo import MediaInfo
+
+        from tests.test_screenshots import _write_video
+        from torrent_utils.mediainfo import _inform
+
+        video = str(_write_video(tmp_path / "clip.avi"))
+
+        text, json_text = _inform(video)
+
+        assert text == MediaInfo.parse(video, output="", full=False)
+        assert json.loads(json_text) == json.loads(MediaInfo.parse(video, output="JSON"))
+
+    def test_unexpected_private_api_falls_back_to_public_parse(self):
+        from unittest.mock import patch
+
+        from pymediainfo import MediaInfo
+
+        from torrent_utils import mediainfo
+
+        with patch.object(MediaInfo, "_get_library", return_value=("lib", "handle")), \
+                patch.object(mediainfo, "_parse_twice", return_value=("text", "{}")) as parse_twice:
+            assert mediainfo._inform("clip.mkv") == ("text", "{}")
+
+        parse_twice.assert_called_once_with("clip.mkv")
+
+    def test_dump_and_media_file_share_one_parse(self, tmp_path):
+        from unittest.mock import patch
+
+        from torrent_utils import mediainfo
+        from torrent_utils.helpers import getInfoDump
+        from torrent_utils.media import MediaFile
+
+        video = tmp_path / "Show.S01E01.1080p.WEB-DL-GRP.mkv"
+        video.write_bytes(b"mkv")
+        calls = []
+
+        with patch.object(mediainfo, "_service", mediainfo.MediaInfoService(inform=_fake_inform(calls))):
+            media_file = MediaFile(str(video))
+            getInfoDump(str(video), str(tmp_path))
+
+        assert len(calls) == 1
+        assert media_file.media_info["media"]["track"][0]["@type"] == "General"
+        with open(os.path.join(tmp_path, "mediainfo.txt"), encoding="utf-8") as dump:
+            assert dump.read() == "General\nFormat : Matroska\n"
@@ -0,0 +1,109 @@
+"""Tests for torrent_utils/multipart.py"""
+import base64
+import email.parser
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+
+def _parse(body, content_type):
+    message = email.parser.BytesParser().parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    return {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+
+
+class TestMultipartStream:
+    def test_body_parses_and_length_is_exact(self, tmp_path):
+        from torrent_utils.multipart import FilePart, MultipartStream
+
+        image = tmp_path / "screenshot_00.png"
+        image.write_bytes(os.urandom(200_000))
+        stream = MultipartStream({"api_key": "secret", "source": FilePart(str(image))})
+
+        body = stream.read()
+
+        assert len(body) == len(stream)
+        parts = _parse(body, stream.content_type)
+        assert parts["api_key"].get_payload() == "secret"
+        assert parts["source"].get_filename() == "screenshot_00.png"
+        assert parts["source"].get_content_type() == "image/png"
+        assert parts["source"].get_payload(decode=True) == image.read_bytes()
+
+    def test_base64_part_matches_one_shot_encoding(self, tmp_path):
+        from torrent_utils.multipart import BASE64_CHUNK_SIZE, Base64FilePart, MultipartStream
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(os.urandom(BASE64_CHUNK_SIZE * 2 + 7))
+        stream = MultipartStream({"key": "k", "image": Base64FilePart(str(image))})
+
+        parts = _parse(stream.read(), stream.content_type)
+
+        assert parts["image"].get_payload() == base64.b64encode(image.read_bytes()).decode()
+
+    def test_small_reads_hold_one_chunk_and_rewind(self, tmp_path):
+        from torrent_utils.multipart import CHUNK_SIZE, FilePart, MultipartStream
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(os.urandom(CHUNK_SIZE * 10))
+        stream = MultipartStream({"source": FilePart(str(image))})
+
+        pieces = []
+        while piece := stream.read(8192):
+            assert len(stream._buffer) < CHUNK_SIZE + 8192
+            pieces.append(piece)
+        first = b"".join(pieces)
+        assert stream.tell() == len(stream)
+
+        stream.seek(0)
+        assert stream.read() == first
+
+    def test_requests_streams_it_with_content_length(self, tmp_path):
+        from torrent_utils.helpers import post_multipart
+        from torrent_utils.multipart import FilePart
+
+        received = {}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received["length"] = int(self.headers["Content-Length"])
+                received["type"] = self.headers["Content-Type"]
+                received["body"] = self.rfile.read(received["length"])
+                self.send_response(200)
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.handle_request)
+        thread.start()
+        image = tmp_path / "shot.png"
+        image.write_bytes(os.urandom(300_000))
+        try:
+            response = post_multipart(f"http://127.0.0.1:{server.server_port}/upload",
+                                      {"source": FilePart(str(image))}, timeout=10)
+        finally:
+            thread.join(5)
+            server.server_close()
+
+        assert response.text == "ok"
+        assert received["length"] == len(received["body"])
+        assert _parse(received["body"], received["type"])["source"].get_payload(decode=True) == image.read_bytes()
+
+    def test_read_after_cancel_raises(self, tmp_path):
+        from torrent_utils.multipart import FilePart, MultipartStream, UploadCancelled, cancel_uploads_on
+
+        image = tmp_path / "a.png"
+        image.write_bytes(b"x" * 10)
+        cancel = threading.Event()
+        with cancel_uploads_on(cancel):
+            body = MultipartStream({"file": FilePart(str(image))})
+        assert MultipartStream({"file": FilePart(str(image))}).cancel is None
+
+        body.read(5)
+        cancel.set()
+        with pytest.raises(UploadCancelled):
+            body.read(5)
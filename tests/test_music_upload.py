@@ -309,6 +309,48 @@ class TestRedUploadRunner:
         assert torrent.source == "RED"
         assert torrent.private is True
 
+    def test_create_torrent_file_forwards_settings(self, tmp_path):
+        import musicTorrentMaker
+
+        album = tmp_path / "Album"
+        run_dir = tmp_path / "run"
+        album.mkdir()
+        run_dir.mkdir()
+        (album / "01.flac").write_bytes(b"audio")
+        settings = object()
+
+        with patch.object(musicTorrentMaker, "apply_piece_size") as apply_piece_size:
+            musicTorrentMaker.create_torrent_file(str(album), str(run_dir), "Album.torrent", settings=settings)
+
+        assert apply_piece_size.call_args.args[1] is settings
+
+    def test_create_torrent_files_hashes_once_for_every_tracker(self, tmp_path):
+        import torf
+        import musicTorrentMaker
+
+        album = tmp_path / "Album"
+        run_dir = tmp_path / "run"
+        album.mkdir()
+        run_dir.mkdir()
+        (album / "01.flac").write_bytes(b"audio" * 10000)
+        (album / "02.flac").write_bytes(b"more audio" * 10000)
+
+        with patch.object(musicTorrentMaker, "generate_torrent", wraps=musicTorrentMaker.generate_torrent) as generate:
+            written = musicTorrentMaker.create_torrent_files(str(album), str(run_dir), {
+                "red": ("Album [RED].torrent", "https://flacsfor.me/passkey/announce", "RED", "REDacted"),
+                "ops": ("Album [OPS].torrent", "https://home.opsfet.ch/passkey/announce", "OPS", "Orpheus"),
+            })
+
+        assert generate.call_count == 1
+        red = torf.Torrent.read(str(run_dir / written["red"]))
+        ops = torf.Torrent.read(str(run_dir / written["ops"]))
+        assert red.hashes == ops.hashes
+        assert (red.source, ops.source) == ("RED", "OPS")
+        assert red.trackers == [["https://flacsfor.me/passkey/announce"]]
+        assert ops.trackers == [["https://home.opsfet.ch/passkey/announce"]]
+        assert red.infohash != ops.infohash
+        assert red.verify(str(album)) and ops.verify(str(album))
+
     def test_red_upload_runs_dryrun_before_real_upload(self, tmp_path):
         import musicTorrentMaker
 
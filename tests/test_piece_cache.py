@@ -0,0 +1,71 @@
+"""Tests for torrent_utils/piece_cache.py"""
+import os
+from unittest.mock import patch
+
+import torf
+
+
+def _torrent(path):
+    torrent = torf.Torrent(path=str(path), private=True, creation_date=1700000000)
+    torrent.piece_size = 16 * 1024
+    return torrent
+
+
+class TestPieceCache:
+    def test_roundtrip_and_miss_for_other_piece_size(self, tmp_path, make_content):
+        from torrent_utils.piece_cache import PieceCache
+
+        content = make_content([50_000, 30_000])
+        paths = [str(content / "E01.mkv"), str(content / "E02.mkv")]
+        cache = PieceCache(str(tmp_path / "runs" / "cache.sqlite3"))
+
+        assert cache.get(paths, 16384) is None
+        cache.put(paths, 16384, b"x" * 40)
+
+        assert cache.get(paths, 16384) == b"x" * 40
+        assert cache.get(paths, 32768) is None
+
+    def test_hardlinked_and_renamed_copy_hits(self, tmp_path, make_content):
+        from torrent_utils.piece_cache import PieceCache
+
+        content = make_content([50_000, 30_000])
+        linked = tmp_path / "Renamed.Show.S01"
+        linked.mkdir()
+        os.link(content / "E01.mkv", linked / "Episode 1.mkv")
+        os.link(content / "E02.mkv", linked / "Episode 2.mkv")
+        cache = PieceCache(str(tmp_path / "cache.sqlite3"))
+
+        cache.put([str(content / "E01.mkv"), str(content / "E02.mkv")], 16384, b"y" * 20)
+
+        assert cache.get([str(linked / "Episode 1.mkv"), str(linked / "Episode 2.mkv")], 16384) == b"y" * 20
+
+    def test_modified_file_misses(self, tmp_path, make_content):
+        from torrent_utils.piece_cache import PieceCache
+
+        content = make_content([50_000, 30_000])
+        paths = [str(content / "E01.mkv"), str(content / "E02.mkv")]
+        cache = PieceCache(str(tmp_path / "cache.sqlite3"))
+        cache.put(paths, 16384, b"z" * 20)
+
+        stat = os.stat(paths[1])
+        os.utime(paths[1], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert cache.get(paths, 16384) is None
+
+
+class TestGenerateTorrentWithCache:
+    def test_second_run_skips_hashing(self, tmp_path, make_content):
+        from torrent_utils.hashing import generate_torrent
+        from torrent_utils.piece_cache import PieceCache
+
+        content = make_content([50_000, 30_000])
+        cache = PieceCache(str(tmp_path / "cache.sqlite3"))
+        first = _torrent(content)
+        assert generate_torrent(first, cache=cache)
+
+        second = _torrent(content)
+        with patch.object(torf.Torrent, "generate") as generate:
+            assert generate_torrent(second, cache=cache)
+
+        generate.assert_not_called()
+        assert second.dump() == first.dump()
@@ -0,0 +1,195 @@
+"""Tests for torrent_utils/piece_reuse.py"""
+import os
+from unittest.mock import patch
+
+import torf
+
+EPISODE_SIZES = [40_000, 25_000]
+
+
+def _make_run(tmp_path, run_name, content, torrent_name="Show.S01.torrent"):
+    run_dir = tmp_path / "runs" / run_name
+    run_dir.mkdir(parents=True)
+    (run_dir / "source_path.txt").write_text(str(content), encoding="utf-8")
+    torrent = torf.Torrent(path=str(content), private=True)
+    torrent.piece_size = 16 * 1024
+    torrent.generate()
+    torrent.write(str(run_dir / torrent_name))
+    return torrent
+
+
+def _hardlink_copy(content, destination):
+    from torrent_utils.helpers import copy_folder_structure
+    copy_folder_structure(str(content), str(destination))
+    return destination
+
+
+def _new_torrent(path):
+    torrent = torf.Torrent(path=str(path), private=True)
+    torrent.piece_size = 16 * 1024
+    return torrent
+
+
+class TestReusablePieces:
+    def test_hardlinked_copy_reuses_earlier_run(self, tmp_path, make_content):
+        from torrent_utils.hashing import generate_torrent
+        from torrent_utils.piece_reuse import previous_run_torrents
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        earlier = _make_run(tmp_path, "001", content)
+        seeding = _hardlink_copy(content, tmp_path / "seeding" / "Show S01 (1080p WEB-DL) - GRP")
+
+        torrent = _new_torrent(seeding)
+        with patch.object(torf.Torrent, "generate") as generate:
+            assert generate_torrent(torrent, previous_torrents=previous_run_torrents(str(tmp_path / "runs")))
+
+        generate.assert_not_called()
+        assert torrent.hashes == earlier.hashes
+
+    def test_plain_copy_with_same_layout_is_not_reused(self, tmp_path, make_content):
+        from torrent_utils.piece_reuse import previous_run_torrents, reusable_pieces
+        from torrent_utils.hashing import torrent_layout
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        _make_run(tmp_path, "001", content)
+        copy = tmp_path / "copy" / "Show.S01"
+        copy.mkdir(parents=True)
+        for f in content.iterdir():
+            (copy / f.name).write_bytes(f.read_bytes())
+
+        torrent = _new_torrent(copy)
+        candidates = previous_run_torrents(str(tmp_path / "runs"))
+
+        assert reusable_pieces(torrent_layout(torrent), torrent.piece_size, candidates, str(torrent.path)) == {}
+
+    def test_unrelated_runs_are_skipped_without_parsing_their_torrent(self, tmp_path, make_content):
+        from torrent_utils.hashing import torrent_layout
+        from torrent_utils.piece_reuse import previous_run_torrents, reusable_pieces
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        _make_run(tmp_path, "001", content)
+        other = make_content([10_000], name="Movie.2020", parent="other")
+
+        torrent = _new_torrent(other)
+        candidates = previous_run_torrents(str(tmp_path / "runs"))
+        with patch.object(torf.Torrent, "read", wraps=torf.Torrent.read) as read:
+            assert reusable_pieces(torrent_layout(torrent), torrent.piece_size, candidates, str(other)) == {}
+
+        read.assert_not_called()
+
+    def test_only_the_newest_runs_are_searched(self, tmp_path, make_content):
+        from torrent_utils.piece_reuse import previous_run_torrents
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        for run in ("001", "002", "003"):
+            _make_run(tmp_path, run, content)
+
+        candidates = previous_run_torrents(str(tmp_path / "runs"), limit=2)
+
+        assert [os.path.basename(os.path.dirname(path)) for path, _ in candidates] == ["003", "002"]
+
+    def test_modified_file_is_rehashed_but_unchanged_pieces_reused(self, tmp_path, make_content):
+        from torrent_utils.piece_reuse import previous_run_torrents, reusable_pieces
+        from torrent_utils.hashing import torrent_layout
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        earlier = _make_run(tmp_path, "001", content)
+        torrent_file = next((tmp_path / "runs" / "001").glob("*.torrent"))
+        written = os.stat(torrent_file).st_mtime_ns
+        os.utime(content / "E02.mkv", ns=(written, written + 5_000_000_000))
+
+        torrent = _new_torrent(content)
+        candidates = previous_run_torrents(str(tmp_path / "runs"))
+        known = reusable_pieces(torrent_layout(torrent), torrent.piece_size, candidates, str(torrent.path))
+
+        # E01 is 40,000 bytes: pieces 0 and 1 lie wholly inside it, piece 2 straddles E02
+        assert known == {0: earlier.hashes[0], 1: earlier.hashes[1]}
+
+    def test_different_piece_size_is_not_reused(self, tmp_path, make_content):
+        from torrent_utils.piece_reuse import previous_run_torrents, reusable_pieces
+        from torrent_utils.hashing import torrent_layout
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        _make_run(tmp_path, "001", content)
+
+        torrent = torf.Torrent(path=str(content))
+        torrent.piece_size = 32 * 1024
+        candidates = previous_run_torrents(str(tmp_path / "runs"))
+
+        assert reusable_pieces(torrent_layout(torrent), torrent.piece_size, candidates, str(torrent.path)) == {}
+
+
+class TestIncrementalRehash:
+    def _season(self, tmp_path, sizes):
+        content = tmp_path / "incoming" / "Show.S01"
+        content.mkdir(parents=True)
+        for i, size in enumerate(sizes, 1):
+            (content / f"E{i:02d}.mkv").write_bytes(os.urandom(size))
+        return content
+
+    def _age_files(self, content):
+        # Make the existing files older than any torrent written afterwards
+        for f in content.iterdir():
+            os.utime(f, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+
+    def test_replaced_episode_only_rehashes_touching_pieces(self, tmp_path, monkeypatch):
+        from torrent_utils import hashing
+        from torrent_utils.piece_reuse import previous_run_torrents
+
+        content = self._season(tmp_path, [65_536, 40_000, 65_536])
+        self._age_files(content)
+        _make_run(tmp_path, "001", content)
+
+        # A PROPER replaces E02 with a same-sized file (new inode)
+        (content / "E02.mkv").unlink()
+        (content / "E02.mkv").write_bytes(os.urandom(40_000))
+
+        hashed = []
+        real = hashing.hash_piece_range
+        monkeypatch.setattr(hashing, "hash_piece_range",
+                            lambda layout, ps, start, stop: hashed.append((start, stop)) or real(layout, ps, start, stop))
+
+        torrent = _new_torrent(content)
+        assert hashing.generate_torrent(torrent, previous_torrents=previous_run_torrents(str(tmp_path / "runs")))
+
+        reference = _new_torrent(content)
+        reference.generate()
+        assert torrent.hashes == reference.hashes
+        # E02 covers bytes 65,536-105,535, i.e. pieces 4-6; everything else came from run 001
+        assert hashed == [(4, 7)]
+
+    def test_added_episode_reuses_pieces_before_it(self, tmp_path):
+        from torrent_utils import hashing
+        from torrent_utils.piece_reuse import previous_run_torrents, reusable_pieces
+
+        content = self._season(tmp_path, [50_000, 50_000])
+        self._age_files(content)
+        _make_run(tmp_path, "001", content)
+        (content / "E03.mkv").write_bytes(os.urandom(30_000))
+
+        torrent = _new_torrent(content)
+        known = reusable_pieces(hashing.torrent_layout(torrent), torrent.piece_size,
+                                previous_run_torrents(str(tmp_path / "runs")), str(torrent.path))
+        assert hashing.generate_torrent(torrent, previous_torrents=previous_run_torrents(str(tmp_path / "runs")))
+
+        reference = _new_torrent(content)
+        reference.generate()
+        assert torrent.hashes == reference.hashes
+        # 100,000 bytes of unchanged files fill pieces 0-5 completely; piece 6 gains E03 bytes
+        assert sorted(known) == [0, 1, 2, 3, 4, 5]
+
+
+class TestTorrentIsCurrent:
+    def test_detects_added_and_modified_files(self, tmp_path, make_content):
+        from torrent_utils.piece_reuse import torrent_is_current
+
+        content = make_content(EPISODE_SIZES, parent="incoming")
+        for f in content.iterdir():
+            os.utime(f, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+        _make_run(tmp_path, "001", content)
+        torrent_file = str(next((tmp_path / "runs" / "001").glob("*.torrent")))
+
+        assert torrent_is_current(torrent_file, str(content))
+
+        (content / "E03.mkv").write_bytes(b"new episode")
+        assert not torrent_is_current(torrent_file, str(content))
@@ -0,0 +1,77 @@
+"""Tests for torrent_utils/piece_size.py"""
+import os
+
+import pytest
+import torf
+
+MiB = 1024 * 1024
+GiB = 1024 * MiB
+
+
+class TestParseSize:
+    @pytest.mark.parametrize("value,expected", [
+        ("4194304", 4 * MiB),
+        ("512K", 512 * 1024),
+        ("4M", 4 * MiB),
+        ("8 MiB", 8 * MiB),
+        ("", None),
+        ("big", None),
+        ("4G", None),
+    ])
+    def test_values(self, value, expected):
+        from torrent_utils.piece_size import parse_size
+        assert parse_size(value) == expected
+
+
+class TestPieceSizeLimits:
+    def test_platform_defaults(self):
+        from torrent_utils.piece_size import piece_size_limits
+        assert piece_size_limits(None, platform="linux") == (16 * 1024, 16 * MiB)
+        assert piece_size_limits(None, platform="win32") == (16 * 1024, 4 * MiB)
+
+    def test_settings_override_and_invalid_values_ignored(self):
+        from torrent_utils.piece_size import piece_size_limits
+        settings = {"PIECE_SIZE_MIN": "256K", "PIECE_SIZE_MAX": "3M"}
+        assert piece_size_limits(settings, platform="linux") == (256 * 1024, 16 * MiB)
+
+    def test_min_above_max_is_clamped(self):
+        from torrent_utils.piece_size import piece_size_limits
+        settings = {"PIECE_SIZE_MIN": "8M", "PIECE_SIZE_MAX": "2M"}
+        assert piece_size_limits(settings, platform="linux") == (2 * MiB, 2 * MiB)
+
+
+class TestChoosePieceSize:
+    def test_large_pack_uses_bigger_pieces_than_windows_cap(self):
+        from torrent_utils.piece_size import choose_piece_size
+        size = 80 * GiB
+        assert choose_piece_size(size, 10, max_size=16 * MiB) == 16 * MiB
+        assert choose_piece_size(size, 10, max_size=4 * MiB) == 4 * MiB
+
+    def test_small_files_keep_pieces_below_average_file_size(self):
+        from torrent_utils.piece_size import choose_piece_size
+        # 2 GiB spread over 4000 files averages ~512 KiB per file
+        assert choose_piece_size(2 * GiB, 4000) == 512 * 1024
+        assert choose_piece_size(2 * GiB, 1) == 2 * MiB
+
+    def test_never_below_minimum(self):
+        from torrent_utils.piece_size import choose_piece_size
+        assert choose_piece_size(10 * MiB, 10_000, min_size=64 * 1024) == 64 * 1024
+        assert choose_piece_size(0) == 16 * 1024
+
+
+class TestApplyPieceSize:
+    def test_sets_piece_size_on_torrent(self, tmp_path, caplog):
+        from torrent_utils.piece_size import apply_piece_size
+
+        content = tmp_path / "Album"
+        content.mkdir()
+        for i in range(3):
+            (content / f"{i:02d}.flac").write_bytes(os.urandom(200_000))
+        torrent = torf.Torrent(path=str(content))
+
+        with caplog.at_level("INFO"):
+            piece_size = apply_piece_size(torrent, {"PIECE_SIZE_MIN": "32K"})
+
+        assert piece_size == torrent.piece_size == 32 * 1024
+        assert f"{torrent.pieces:,} pieces" in caplog.text
+        assert "estimated hash time" in caplog.text
@@ -0,0 +1,303 @@
+"""Tests for torrent_utils/screenshots.py"""
+import json
+import subprocess
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+import pytest
+
+
+def _write_video(path, frames=50, fps=10, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG test videos here")
+    for i in range(frames):
+        frame = np.full((size[1], size[0], 3), (i * 5) % 255, dtype=np.uint8)
+        frame[::4, ::4] = 40
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def _completed(stdout):
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout=stdout)
+
+
+PROBE = json.dumps({
+    "streams": [{"width": 4, "height": 2}],
+    "format": {"duration": "100.0", "start_time": "1.5"},
+})
+
+
+class TestKeyframeFrameGrabber:
+    def test_snaps_to_indexed_keyframe_and_decodes_one_frame(self):
+        from torrent_utils.screenshots import KEYFRAME_PROBE_PACKETS, KeyframeFrameGrabber
+
+        packets = "14.0,K__\n14.5,___\n15.0,___\n"
+        raw = bytes(range(24))
+        with patch("torrent_utils.screenshots.subprocess.run",
+                   side_effect=[_completed(PROBE), _completed(packets), _completed(raw)]) as run:
+            grabber = KeyframeFrameGrabber("video.mkv")
+            frame, timestamp = grabber.grab(12.7)
+
+        assert grabber.opened and grabber.duration == 100.0
+        # The seek to 12.7 + start_time 1.5 lands on the keyframe at 14.0, i.e. 12.5 into the file
+        assert timestamp == pytest.approx(12.5)
+        assert frame.shape == (2, 4, 3) and frame.tobytes() == raw
+        probe_args = run.call_args_list[1].args[0]
+        assert probe_args[probe_args.index("-read_intervals") + 1] == f"14.200%+#{KEYFRAME_PROBE_PACKETS}"
+        ffmpeg_args = run.call_args_list[2].args[0]
+        assert "-noaccurate_seek" in ffmpeg_args
+        assert ffmpeg_args[ffmpeg_args.index("-ss") + 1] == "12.500000"
+        assert ffmpeg_args[ffmpeg_args.index("-frames:v") + 1] == "1"
+
+    def test_exact_seek_skips_keyframe_lookup(self):
+        from torrent_utils.screenshots import KeyframeFrameGrabber
+
+        with patch("torrent_utils.screenshots.subprocess.run",
+                   side_effect=[_completed(PROBE), _completed(bytes(24))]) as run:
+            grabber = KeyframeFrameGrabber("source.mkv")
+            frame, timestamp = grabber.grab(12.7, snap_to_keyframe=False)
+
+        assert timestamp == 12.7 and frame is not None
+        assert run.call_count == 2
+        assert "-noaccurate_seek" not in run.call_args_list[1].args[0]
+
+    def test_failed_probe_is_not_opened(self):
+        from torrent_utils.screenshots import KeyframeFrameGrabber
+
+        with patch("torrent_utils.screenshots.subprocess.run",
+                   side_effect=subprocess.CalledProcessError(1, "ffprobe")):
+            assert not KeyframeFrameGrabber("broken.mkv").opened
+
+
+def _thread_pool(max_workers, mp_context=None):
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers)
+
+
+class _FakeGrabber:
+    name = "keyframe"
+    opened = True
+    duration = 100.0
+
+    def __init__(self, path="", engine=""):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def grab(self, timestamp, snap_to_keyframe=True):
+        return np.full((8, 8, 3), 90, dtype=np.uint8), round(timestamp) + 0.5 if snap_to_keyframe else timestamp
+
+
+def _detailed_frame(height=270, width=480, seed=0):
+    return np.random.default_rng(seed).integers(30, 220, (height, width, 3), dtype=np.uint8)
+
+
+class TestScoreFrame:
+    def test_detailed_frame_is_ok(self):
+        from torrent_utils.screenshots import score_frame
+
+        quality = score_frame(_detailed_frame(2160, 3840))
+
+        assert quality.ok and quality.letterbox == 0 and quality.detail > 100
+
+    @pytest.mark.parametrize("value, reason", [(255, "white frame"), (0, "black frame"), (128, "too little detail")])
+    def test_blank_frames_rejected(self, value, reason):
+        from torrent_utils.screenshots import score_frame
+
+        assert score_frame(np.full((1080, 1920, 3), value, dtype=np.uint8)).reason == reason
+
+    def test_black_credits_rejected(self):
+        from torrent_utils.screenshots import score_frame
+
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        frame[500:520, 800:1100] = 255  # a line of credits text
+
+        assert score_frame(frame).reason == "black frame"
+
+    def test_letterbox_measured_and_heavy_bars_rejected(self):
+        from torrent_utils.screenshots import score_frame
+
+        scope = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        scope[140:940] = _detailed_frame(800, 1920)
+        sliver = np.zeros((1080, 1920, 3), dtype=np.uint8)
+        sliver[340:740, 600:1300] = _detailed_frame(400, 700)
+
+        quality = score_frame(scope)
+        assert quality.ok and quality.letterbox == pytest.approx(0.26, abs=0.01)
+        assert "letterboxed" in score_frame(sliver).reason
+
+    def test_unreadable_file_scores_none(self, tmp_path):
+        from torrent_utils.screenshots import score_image_file
+
+        (tmp_path / "broken.png").write_bytes(b"not a png")
+
+        assert score_image_file(str(tmp_path / "broken.png")) is None
+
+
+class TestGrabBestFrame:
+    class Grabber:
+        def __init__(self, frames):
+            self.frames = frames
+            self.grabbed = []
+
+        def grab(self, timestamp, snap_to_keyframe=True):
+            self.grabbed.append(timestamp)
+            return self.frames.get(timestamp), timestamp
+
+    def test_good_target_frame_grabs_nothing_else(self):
+        from torrent_utils.screenshots import grab_best_frame
+
+        grabber = self.Grabber({60.0: _detailed_frame()})
+
+        image, timestamp, quality = grab_best_frame(grabber, 60.0)
+
+        assert timestamp == 60.0 and quality.ok and grabber.grabbed == [60.0]
+
+    def test_black_target_replaced_by_best_candidate(self):
+        from torrent_utils.screenshots import candidate_timestamps, grab_best_frame
+
+        black = np.zeros((270, 480, 3), dtype=np.uint8)
+        flat = np.full((270, 480, 3), 128, dtype=np.uint8)
+        assert candidate_timestamps(60.0) == [60.0, 62.0, 58.0]
+        grabber = self.Grabber({60.0: black, 62.0: flat, 58.0: _detailed_frame()})
+
+        image, timestamp, quality = grab_best_frame(grabber, 60.0)
+
+        assert timestamp == 58.0 and quality.ok
+
+
+class TestPngOptions:
+    def test_defaults_and_fast_mode(self):
+        from torrent_utils.screenshots import FAST_PNG, PngOptions, png_options
+
+        assert png_options() == PngOptions(compress_level=9, optimize=True)
+        assert png_options({"SCREENSHOT_PNG_LEVEL": "9"}, fast=True) is FAST_PNG
+
+    def test_settings_override_and_bad_level_ignored(self):
+        from torrent_utils.screenshots import png_options
+
+        options = png_options({"SCREENSHOT_PNG_LEVEL": "3", "SCREENSHOT_PNG_OPTIMIZE": "no"})
+        assert (options.compress_level, options.optimize) == (3, False)
+        assert png_options({"SCREENSHOT_PNG_LEVEL": "11"}).compress_level == 9
+
+
+class TestSaveScreenshot:
+    def test_writes_frame_without_temp_files(self, tmp_path):
+        from PIL import Image
+        from torrent_utils.screenshots import FAST_PNG, save_screenshot
+
+        frame = np.zeros((1080, 3840, 3), dtype=np.uint8)
+        frame[:, :, 2] = 200  # red in BGR
+        save_screenshot(frame, str(tmp_path / "screenshot_00.png"), FAST_PNG)
+
+        assert [p.name for p in tmp_path.iterdir()] == ["screenshot_00.png"]
+        with Image.open(tmp_path / "screenshot_00.png") as img:
+            assert img.size == (1920, 540)
+            assert img.getpixel((0, 0)) == (200, 0, 0)
+
+
+class TestCaptureScreenshots:
+    def test_companion_frames_use_captured_timestamps(self, tmp_path):
+        from torrent_utils import screenshots
+
+        calls = []
+
+        def capture_frame(path, engine, timestamp, output_path, snap_to_keyframe=True, options=None, candidates=1):
+            calls.append((path, timestamp, snap_to_keyframe))
+            assert candidates == (3 if path == "encode.mkv" else 1)
+            open(output_path, "wb").close()
+            return (round(timestamp) + 0.5 if snap_to_keyframe else timestamp), 0.0, None
+
+        with patch.object(screenshots, "ProcessPoolExecutor", _thread_pool), \
+                patch.object(screenshots, "capture_frame", capture_frame):
+            count, timestamps, companion_count = screenshots.capture_screenshots(
+                "encode.mkv", [10.2, 20.2, 30.2], str(tmp_path), "screenshot_", engine="keyframe",
+                skip_indices={1}, companion=("source.mkv", "source_"))
+
+        assert (count, companion_count) == (3, 3)
+        assert timestamps == [10.5, 20.2, 30.5]
+        source_calls = sorted(call for call in calls if call[0] == "source.mkv")
+        assert source_calls == [("source.mkv", 10.5, False), ("source.mkv", 20.2, False), ("source.mkv", 30.5, False)]
+        assert ("encode.mkv", 20.2, True) not in calls
+        names = sorted(p.name for p in tmp_path.iterdir())
+        assert names == ["screenshot_00.png", "screenshot_02.png", "source_00.png", "source_01.png", "source_02.png"]
+
+    def test_failed_frames_are_not_counted(self, tmp_path):
+        from torrent_utils import screenshots
+
+        with patch.object(screenshots, "ProcessPoolExecutor", _thread_pool), \
+                patch.object(screenshots, "capture_frame", return_value=None):
+            count, timestamps, _ = screenshots.capture_screenshots("v.mkv", [1.0, 2.0], str(tmp_path), "screenshot_")
+
+        assert count == 0 and timestamps == [1.0, 2.0]
+
+
+class TestCreateOptimizedScreenshots:
+    def test_cv2_engine_writes_eight_screenshots(self, tmp_path):
+        from torrentmaker import create_optimized_screenshots
+
+        video = _write_video(tmp_path / "video.avi")
+
+        success, timestamps, source_success = create_optimized_screenshots(str(video), str(tmp_path))
+
+        assert success and len(timestamps) == 8 and source_success is None
+        names = sorted(p.name for p in (tmp_path / "screenshots").glob("*.png"))
+        assert names == [f"screenshot_{i:02d}.png" for i in range(8)]
+
+    def test_captures_source_alongside_encode(self, tmp_path):
+        from torrentmaker import create_optimized_screenshots
+
+        video = _write_video(tmp_path / "video.avi")
+        source = _write_video(tmp_path / "source.avi")
+
+        success, _, source_success = create_optimized_screenshots(str(video), str(tmp_path), source_path=str(source))
+
+        assert success and source_success
+        names = sorted(p.name for p in (tmp_path / "screenshots").glob("*.png"))
+        assert names == [f"screenshot_{i:02d}.png" for i in range(8)] + [f"source_{i:02d}.png" for i in range(8)]
+
+    def test_returns_snapped_timestamps_for_source_capture(self, tmp_path):
+        import torrentmaker
+        from torrent_utils import screenshots, timestamps
+
+        with patch.object(timestamps, "open_frame_grabber", _FakeGrabber), \
+                patch.object(screenshots, "open_frame_grabber", _FakeGrabber), \
+                patch.object(screenshots, "ProcessPoolExecutor", _thread_pool):
+            success, timestamps, _ = torrentmaker.create_optimized_screenshots(
+                str(tmp_path / "v.mkv"), str(tmp_path), engine="keyframe")
+
+        assert success
+        assert timestamps == [10.5, 20.5, 30.5, 40.5, 50.5, 60.5, 70.5, 80.5]
+        assert screenshots.load_capture_timestamps(str(tmp_path / "screenshots")) == timestamps
+
+    def test_existing_frames_pair_with_their_recorded_timestamps(self, tmp_path):
+        import torrentmaker
+        from torrent_utils import screenshots, timestamps
+
+        calls = []
+
+        def capture_frame(path, engine, timestamp, output_path, snap_to_keyframe=True, options=None, candidates=1):
+            calls.append((path, timestamp))
+            open(output_path, "wb").close()
+            return timestamp, 0.0, None
+
+        known = [11.25] + [None] * 7
+        with patch.object(timestamps, "open_frame_grabber", _FakeGrabber), \
+                patch.object(screenshots, "ProcessPoolExecutor", _thread_pool), \
+                patch.object(screenshots, "capture_frame", capture_frame):
+            success, captured, _ = torrentmaker.create_optimized_screenshots(
+                str(tmp_path / "v.mkv"), str(tmp_path), engine="keyframe", source_path="source.mkv",
+                skip_indices={0, 1}, known_timestamps=known)
+
+        assert success
+        assert ("source.mkv", 11.25) in calls
+        assert ("source.mkv", captured[1]) in calls
+        saved = screenshots.load_capture_timestamps(str(tmp_path / "screenshots"))
+        assert saved[0] == 11.25 and saved[1] is None and saved[2:] == captured[2:]
@@ -0,0 +1,153 @@
+"""Tests for torrent_utils/stages.py"""
+import threading
+import time
+
+import pytest
+
+
+class TestStageScheduler:
+    def test_independent_stages_overlap(self):
+        from torrent_utils.stages import StageScheduler
+
+        both_started = threading.Barrier(2, timeout=5)
+
+        def stage():
+            both_started.wait()
+            return "ok"
+
+        scheduler = StageScheduler()
+        scheduler.add("hash", stage)
+        scheduler.add("screenshots", stage)
+
+        assert scheduler.run() == {"hash": "ok", "screenshots": "ok"}
+
+    def test_dependencies_run_in_order_and_see_results(self):
+        from torrent_utils.stages import StageScheduler
+
+        order = []
+        scheduler = StageScheduler()
+
+        def screenshots():
+            time.sleep(0.05)
+            order.append("screenshots")
+            return ["[img]a[/img]"]
+
+        def upload():
+            order.append("upload")
+            return scheduler.stages["screenshots"].result + ["[img]b[/img]"]
+
+        scheduler.add("upload", upload, deps=["screenshots"])
+        scheduler.add("screenshots", screenshots)
+
+        results = scheduler.run()
+
+        assert order == ["screenshots", "upload"]
+        assert results["upload"] == ["[img]a[/img]", "[img]b[/img]"]
+        assert scheduler.stages["screenshots"].duration >= 0.05
+
+    def test_failure_skips_dependents_and_cancels_running_stages(self):
+        from torrent_utils.stages import StageFailed, StageScheduler
+
+        finished = []
+        scheduler = StageScheduler()
+
+        def failing():
+            time.sleep(0.05)
+            raise StageFailed("upload failed")
+
+        def long_hash():
+            # Stands in for torf's progress callback checking the event between pieces
+            if scheduler.cancel.wait(10):
+                finished.append("hash cancelled")
+
+        scheduler.add("hash", long_hash)
+        scheduler.add("upload", failing)
+        scheduler.add("description", lambda: finished.append("description"), deps=["upload"])
+
+        started = time.monotonic()
+        with pytest.raises(StageFailed, match="upload failed"):
+            scheduler.run()
+
+        assert time.monotonic() - started < 2
+        assert scheduler.cancel.is_set()
+        assert scheduler.stages["hash"].status == "cancelled"
+        assert scheduler.stages["description"].status == "skipped"
+        time.sleep(0.05)
+        assert finished == ["hash cancelled"]
+
+    def test_interrupt_cancels_and_reraises(self):
+        from unittest.mock import patch
+
+        from torrent_utils.stages import StageScheduler
+
+        scheduler = StageScheduler()
+        scheduler.add("hash", lambda: scheduler.cancel.wait(10))
+
+        with patch("torrent_utils.stages.wait", side_effect=KeyboardInterrupt), pytest.raises(KeyboardInterrupt):
+            scheduler.run()
+
+        assert scheduler.cancel.is_set()
+
+    def test_system_exit_is_reraised(self):
+        from torrent_utils.stages import StageScheduler
+
+        def exits():
+            raise SystemExit(1)
+
+        scheduler = StageScheduler()
+        scheduler.add("screenshots", exits)
+
+        with pytest.raises(SystemExit):
+            scheduler.run()
+
+    def test_pool_limit_serialises_stages(self):
+        from torrent_utils.stages import StageScheduler
+
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def stage():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+        scheduler = StageScheduler(limits={"network": threading.Semaphore(1)})
+        for name in ("a", "b", "c"):
+            scheduler.add(name, stage, pool="network")
+        scheduler.run()
+
+        assert max(peak) == 1
+
+    @pytest.mark.parametrize("deps", [["missing"], ["b"]])
+    def test_unknown_dependency_or_cycle_rejected(self, deps):
+        from torrent_utils.stages import StageScheduler
+
+        scheduler = StageScheduler()
+        scheduler.add("a", lambda: None, deps=deps)
+        scheduler.add("b", lambda: None, deps=["a"])
+
+        with pytest.raises(ValueError):
+            scheduler.run()
+
+    def test_store_skips_completed_stages_and_records_new_ones(self):
+        from torrent_utils.stages import StageScheduler
+
+        class Store:
+            recorded = []
+
+            def completed(self):
+                return {"screenshots": [1.0, 2.0]}
+
+            def record(self, stage):
+                self.recorded.append((stage.name, stage.status, stage.result))
+
+        scheduler = StageScheduler(store=Store())
+        scheduler.add("screenshots", lambda: pytest.fail("should not run again"))
+        scheduler.add("upload", lambda: len(scheduler.stages["screenshots"].result), deps=["screenshots"])
+
+        assert scheduler.run() == {"screenshots": [1.0, 2.0], "upload": 2}
+        assert Store.recorded == [("upload", "done", 2)]
@@ -0,0 +1,116 @@
+"""Tests for torrent_utils/timestamps.py"""
+from unittest.mock import patch
+
+import pytest
+
+
+class FakeGrabber:
+    opened = True
+
+    def __init__(self, path="video.mkv", engine="cv2", duration=1000.0, keyframes=(), chapters=()):
+        self.path = path
+        self.duration = duration
+        self._keyframes = list(keyframes)
+        self._chapters = list(chapters)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def keyframe_packets(self, start, end):
+        return [(time, size) for time, size in self._keyframes if start <= time <= end]
+
+    def chapters(self):
+        return self._chapters
+
+
+class TestUniformTimestamps:
+    def test_matches_the_original_eight_shot_spread(self):
+        from torrent_utils.timestamps import uniform_timestamps
+
+        assert uniform_timestamps(1000.0) == pytest.approx([i * 1000.0 / 10 for i in range(1, 9)])
+
+    def test_count_is_configurable(self):
+        from torrent_utils.timestamps import uniform_timestamps
+
+        assert uniform_timestamps(600.0, 4) == pytest.approx([120.0, 240.0, 360.0, 480.0])
+
+
+class TestSceneTimestamps:
+    def test_largest_keyframe_in_window_wins(self):
+        from torrent_utils.timestamps import scene_timestamps
+
+        grabber = FakeGrabber(duration=400.0, keyframes=[(155.0, 4000), (164.0, 90000), (172.0, 5000)])
+
+        assert scene_timestamps(grabber, 2) == [164.0, 320.0]
+
+
+class TestChapterTimestamps:
+    def test_middles_of_evenly_picked_chapters(self):
+        from torrent_utils.timestamps import chapter_timestamps
+
+        chapters = [(i * 300.0, (i + 1) * 300.0) for i in range(6)]
+
+        assert chapter_timestamps(FakeGrabber(duration=1800.0, chapters=chapters), 3) == [150.0, 750.0, 1350.0]
+
+    def test_short_chapters_skipped_and_topped_up_with_uniform(self):
+        from torrent_utils.timestamps import chapter_timestamps
+
+        chapters = [(0.0, 20.0), (20.0, 1000.0)]
+
+        timestamps = chapter_timestamps(FakeGrabber(duration=1000.0, chapters=chapters), 3)
+
+        assert len(timestamps) == 3 and 510.0 in timestamps
+        assert timestamps == sorted(timestamps)
+
+
+class TestPlanScreenshots:
+    @pytest.mark.parametrize("files, count, expected", [
+        (["e1", "e2", "e3"], 8, [("e1", 3), ("e2", 3), ("e3", 2)]),
+        ([f"e{i}" for i in range(10)], 4, [("e0", 1), ("e2", 1), ("e5", 1), ("e7", 1)]),
+        (["movie"], 8, [("movie", 8)]),
+    ])
+    def test_spread_over_files(self, files, count, expected):
+        from torrent_utils.timestamps import spread_over_files
+
+        assert spread_over_files(files, count) == expected
+
+    def test_shots_follow_file_order(self):
+        from torrent_utils import timestamps
+
+        with patch.object(timestamps, "open_frame_grabber", FakeGrabber):
+            shots = timestamps.plan_screenshots(["e1.mkv", "e2.mkv"], 4)
+
+        assert [shot.path for shot in shots] == ["e1.mkv", "e1.mkv", "e2.mkv", "e2.mkv"]
+        assert [shot.timestamp for shot in shots] == pytest.approx([400.0, 800.0, 400.0, 800.0])
+
+    def test_unopenable_file_fails_the_plan(self):
+        from torrent_utils import timestamps
+
+        class Closed(FakeGrabber):
+            opened = False
+
+        with patch.object(timestamps, "open_frame_grabber", Closed):
+            assert timestamps.plan_screenshots(["broken.mkv"], 2) is None
+
+    def test_unknown_strategy_rejected(self):
+        from torrent_utils.timestamps import pick_timestamps
+
+        with pytest.raises(ValueError):
+            pick_timestamps("video.mkv", 100.0, 2, "random")
+
+
+class TestSeasonPackScreenshots:
+    def test_screenshots_spread_over_episodes(self, tmp_path):
+        from tests.test_screenshots import _write_video
+        from torrentmaker import create_optimized_screenshots
+
+        episodes = [str(_write_video(tmp_path / f"E0{i}.avi")) for i in (1, 2)]
+
+        success, timestamps, _ = create_optimized_screenshots(episodes[0], str(tmp_path), count=4, files=episodes)
+
+        assert success and len(timestamps) == 4
+        names = sorted(p.name for p in (tmp_path / "screenshots").glob("*.png"))
+        assert names == [f"screenshot_{i:02d}.png" for i in range(4)]
@@ -0,0 +1,72 @@
+"""Tests for torrent_utils/tmdb.py"""
+import time
+from unittest.mock import MagicMock, patch
+
+
+def _response(body):
+    response = MagicMock()
+    response.json.return_value = body
+    return response
+
+
+SHOW = {"id": 1399, "name": "Game of Thrones", "poster_path": "/p.jpg",
+        "external_ids": {"imdb_id": "tt0944947", "tvdb_id": 121361}}
+
+
+class TestTMDBClient:
+    def test_details_carry_external_ids_in_one_request(self):
+        from torrent_utils.tmdb import TMDBClient
+
+        client = TMDBClient("key")
+        with patch("requests.Session.get", return_value=_response(SHOW)) as get:
+            assert client.details("tv", 1399)["name"] == "Game of Thrones"
+            assert client.external_ids("tv", 1399)["tvdb_id"] == 121361
+            assert client.details("tv", 1399)["poster_path"] == "/p.jpg"
+
+        get.assert_called_once()
+        args, kwargs = get.call_args
+        assert args[0] == "https://api.themoviedb.org/3/tv/1399"
+        assert kwargs["params"] == {"append_to_response": "external_ids", "api_key": "key"}
+
+    def test_responses_are_reused_across_runs(self, tmp_path):
+        from torrent_utils import tmdb
+
+        with patch.object(tmdb, "_cache", tmdb.TMDBCache(str(tmp_path / "tmdb.sqlite3"))), \
+             patch("requests.Session.get", return_value=_response({"results": [{"id": 1}]})) as get:
+            tmdb.TMDBClient("key").search("movie", "Alien")
+            assert tmdb.TMDBClient("key").search("movie", "Alien") == [{"id": 1}]
+            tmdb.TMDBClient("key").search("movie", "Aliens")
+
+        assert get.call_count == 2
+
+    def test_expired_responses_are_ignored(self, tmp_path):
+        from torrent_utils.tmdb import TMDBCache
+
+        cache = TMDBCache(str(tmp_path / "tmdb.sqlite3"))
+        cache.put("movie/1?", {"id": 1})
+
+        assert cache.get("movie/1?", ttl=60) == {"id": 1}
+        assert cache.get("movie/1?", ttl=-1) is None
+
+    def test_search_feeds_get_tmdb_id(self):
+        from torrent_utils.helpers import get_tmdb_id
+
+        results = {"results": [{"id": 603, "title": "The Matrix", "original_title": "The Matrix",
+                                "release_date": "1999-03-31"}]}
+        with patch.dict("torrent_utils.tmdb._clients", clear=True), \
+             patch("requests.Session.get", return_value=_response(results)):
+            tmdb_id, candidates = get_tmdb_id("The Matrix", "key", isMovie=True, year=1999)
+
+        assert tmdb_id == 603 and candidates[0]["name"] == "The Matrix"
+
+
+class TestRateLimiter:
+    def test_requests_beyond_the_burst_wait(self):
+        from torrent_utils.tmdb import RateLimiter
+
+        limiter = RateLimiter(rate=50, burst=2)
+        started = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+
+        assert time.monotonic() - started >= 0.03
@@ -1,4 +1,5 @@
 """Tests for torrentmaker.py screenshot upload host priority."""
+import os
 from unittest.mock import patch
 
 
@@ -65,3 +66,93 @@ def test_extract_screenshot_bbcodes_uses_screens_section(tmp_path):
         "[url=https://example.test/screen1.png][img]https://example.test/screen1.png[/img][/url]",
         "[url=https://example.test/screen2.png][img]https://example.test/screen2.png[/img][/url]",
     ]
+
+
+def test_upload_single_screenshot_reuses_cached_url(tmp_path):
+    from torrent_utils.upload_cache import UploadCache
+    from torrentmaker import upload_single_screenshot
+
+    img = tmp_path / "shot.png"
+    img.write_bytes(b"\x89PNG\r\n")
+    copy = tmp_path / "copy.png"
+    copy.write_bytes(b"\x89PNG\r\n")
+    cache = UploadCache(str(tmp_path / "uploads.sqlite3"))
+
+    with (
+        patch("torrentmaker.upload_to_hawkepics", return_value=None) as hawke,
+        patch("torrentmaker.uploadToPTPIMG", return_value="https://ptpimg.me/abc.png") as ptpimg,
+    ):
+        first = upload_single_screenshot(str(img), "hawke-key", None, "ptp-key", None, cache=cache)
+        second = upload_single_screenshot(str(copy), "hawke-key", None, "ptp-key", None, cache=cache)
+
+    assert first == second == "[url=https://ptpimg.me/abc.png][img]https://ptpimg.me/abc.png[/img][/url]"
+    hawke.assert_called_once()
+    ptpimg.assert_called_once()
+
+
+def _write_screenshots(directory, count):
+    for i in range(count):
+        (directory / f"screenshot_{i:02d}.png").write_bytes(b"\x89PNG\r\n" + bytes([i]))
+
+
+def test_failed_screenshot_is_retried_starting_from_another_host(tmp_path):
+    from torrentmaker import upload_screenshots_concurrently
+
+    _write_screenshots(tmp_path, 2)
+    calls = []
+
+    def hawke(path, key):
+        calls.append(("hawke", os.path.basename(path)))
+        return None if path.endswith("01.png") else "https://hawke.pics/image/0.png"
+
+    def ptpimg(path, key):
+        calls.append(("ptpimg", os.path.basename(path)))
+        # Down for the first attempt, back for the retry
+        return "https://ptpimg.me/1.png" if ("ptpimg", "screenshot_01.png") in calls[:-1] else None
+
+    with (
+        patch("torrentmaker.upload_to_hawkepics", side_effect=hawke),
+        patch("torrentmaker.uploadToPTPIMG", side_effect=ptpimg),
+        patch("torrentmaker.time.sleep"),
+    ):
+        bbcodes = upload_screenshots_concurrently(str(tmp_path), "hawke-key", None, "ptp-key", None)
+
+    assert bbcodes == ["[url=https://hawke.pics/image/0.png][img]https://hawke.pics/image/0.png[/img][/url]",
+                       "[url=https://ptpimg.me/1.png][img]https://ptpimg.me/1.png[/img][/url]"]
+    retry = [call for call in calls if call[1] == "screenshot_01.png"][2:]
+    assert retry[0] == ("ptpimg", "screenshot_01.png")
+
+
+def test_screenshots_failing_every_retry_are_none_at_their_index(tmp_path):
+    from torrentmaker import upload_screenshots_concurrently
+
+    _write_screenshots(tmp_path, 3)
+
+    def hawke(path, key):
+        return None if path.endswith("02.png") else f"https://hawke.pics/{os.path.basename(path)}"
+
+    with (
+        patch("torrentmaker.upload_to_hawkepics", side_effect=hawke) as upload,
+        patch("torrentmaker.time.sleep"),
+    ):
+        bbcodes = upload_screenshots_concurrently(str(tmp_path), "hawke-key", None, None, None)
+
+    assert len(bbcodes) == 3 and bbcodes[2] is None
+    assert "screenshot_00" in bbcodes[0] and "screenshot_01" in bbcodes[1]
+    assert upload.call_count == 2 + 3
+
+
+def test_cancelled_upload_uploads_nothing_and_returns_none(tmp_path):
+    import threading
+
+    from torrentmaker import upload_screenshots_concurrently
+
+    _write_screenshots(tmp_path, 3)
+    cancel = threading.Event()
+    cancel.set()
+
+    with patch("torrentmaker.upload_to_hawkepics", return_value="https://hawke.pics/0.png") as upload:
+        bbcodes = upload_screenshots_concurrently(str(tmp_path), "hawke-key", None, None, None, cancel=cancel)
+
+    assert bbcodes is None
+    upload.assert_not_called()
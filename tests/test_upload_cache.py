@@ -0,0 +1,58 @@
+"""Tests for torrent_utils/upload_cache.py"""
+import hashlib
+from unittest.mock import patch
+
+
+class TestUploadCache:
+    def test_lookup_is_per_digest_and_host(self, tmp_path):
+        from torrent_utils.upload_cache import UploadCache
+
+        cache = UploadCache(str(tmp_path / "uploads.sqlite3"))
+        cache.store("abc", "ptpimg", "https://ptpimg.me/abc.png")
+
+        assert cache.lookup("abc", "ptpimg") == "https://ptpimg.me/abc.png"
+        assert cache.lookup("abc", "catbox") is None
+        assert cache.lookup("def", "ptpimg") is None
+
+    def test_stale_entry_reverified_and_refreshed(self, tmp_path):
+        from torrent_utils.upload_cache import UploadCache
+
+        checked = []
+        cache = UploadCache(str(tmp_path / "uploads.sqlite3"), verify_after=3600, verify=lambda url: checked.append(url) or True)
+        with patch("torrent_utils.upload_cache.time.time", return_value=1000.0):
+            cache.store("abc", "catbox", "https://files.catbox.moe/abc.png")
+
+        with patch("torrent_utils.upload_cache.time.time", return_value=1000.0 + 7200):
+            assert cache.lookup("abc", "catbox") == "https://files.catbox.moe/abc.png"
+            assert cache.lookup("abc", "catbox") == "https://files.catbox.moe/abc.png"
+
+        assert checked == ["https://files.catbox.moe/abc.png"]
+
+    def test_dead_entry_forgotten(self, tmp_path):
+        from torrent_utils.upload_cache import UploadCache
+
+        cache = UploadCache(str(tmp_path / "uploads.sqlite3"), verify_after=0, verify=lambda url: False)
+        cache.store("abc", "imgbb", "https://i.ibb.co/abc.png")
+
+        assert cache.lookup("abc", "imgbb") is None
+        cache.verify = lambda url: True
+        assert cache.lookup("abc", "imgbb") is None
+
+    def test_unusable_database_falls_back_to_no_cache(self, tmp_path):
+        from torrent_utils.upload_cache import UploadCache
+
+        # A directory where the database file should be cannot be opened by SQLite
+        (tmp_path / "uploads.sqlite3").mkdir()
+        cache = UploadCache(str(tmp_path / "uploads.sqlite3"))
+
+        cache.store("abc", "ptpimg", "https://ptpimg.me/abc.png")
+        assert cache.lookup("abc", "ptpimg") is None
+        assert not cache.enabled
+
+    def test_file_digest_is_sha256_of_contents(self, tmp_path):
+        from torrent_utils.upload_cache import file_digest
+
+        image = tmp_path / "shot.png"
+        image.write_bytes(b"\x89PNG" * 1000)
+
+        assert file_digest(str(image), chunk_size=7) == hashlib.sha256(b"\x89PNG" * 1000).hexdigest()
@@ -0,0 +1,150 @@
+"""Tests for torrent_utils/verify.py"""
+import os
+import random
+
+import pytest
+import torf
+
+EPISODE_SIZES = [50_000, 30_000, 40_000]
+
+
+def _written_torrent(content, tmp_path):
+    torrent = torf.Torrent(path=str(content), private=True, creation_date=1700000000)
+    torrent.piece_size = 16 * 1024
+    torrent.generate()
+    torrent_path = tmp_path / "show.torrent"
+    torrent.write(str(torrent_path))
+    return torf.Torrent.read(str(torrent_path))
+
+
+def _corrupt(path, offset):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+
+class TestVerifyTorrent:
+    def test_intact_content_passes(self, tmp_path, make_content):
+        from torrent_utils.verify import verify_torrent
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+
+        result = verify_torrent(torrent, str(content), workers=2)
+
+        assert result.ok
+        assert result.pieces_checked == result.pieces_total == torrent.pieces
+
+    def test_reports_first_mismatching_piece_and_file(self, tmp_path, make_content):
+        from torrent_utils.verify import verify_torrent
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+        _corrupt(content / "E02.mkv", 20_000)  # absolute offset 70_000 -> piece 4
+        _corrupt(content / "E03.mkv", 30_000)
+
+        result = verify_torrent(torrent, str(content))
+
+        assert not result.ok
+        assert result.piece == 70_000 // (16 * 1024)
+        assert result.files == [str(content / "E02.mkv"), str(content / "E03.mkv")]
+
+    def test_stops_hashing_at_the_first_bad_piece(self, tmp_path, make_content):
+        from unittest.mock import patch
+
+        from torrent_utils.verify import verify_torrent
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+        _corrupt(content / "E01.mkv", 20_000)  # piece 1
+
+        with patch("torrent_utils.hashing.BATCH_SIZE", 16 * 1024):
+            result = verify_torrent(torrent, str(content))
+
+        assert result.piece == 1
+        # Up to two batches are in flight at once with a single worker
+        assert result.pieces_checked <= 2 < torrent.pieces
+
+    def test_lowest_mismatch_is_reported_whatever_order_batches_finish_in(self, tmp_path, make_content):
+        from unittest.mock import patch
+
+        from torrent_utils import hashing
+        from torrent_utils.verify import verify_torrent
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+        _corrupt(content / "E01.mkv", 20_000)  # piece 1
+        _corrupt(content / "E03.mkv", 30_000)  # piece 6
+
+        real_hash_pieces = hashing.hash_pieces
+
+        def reversed_batches(layout, piece_size, on_batch=None, **kwargs):
+            # Hash everything, then report the batches last to first
+            digests = real_hash_pieces(layout, piece_size, **kwargs)
+            for index in reversed(range(len(digests))):
+                if on_batch(index, digests[index:index + 1]) is not None:
+                    return None
+            return digests
+
+        with patch("torrent_utils.verify.hash_pieces", side_effect=reversed_batches):
+            result = verify_torrent(torrent, str(content))
+
+        assert result.piece == 1
+        # Piece 0 is still checked before piece 1 can be reported as the first mismatch
+        assert result.pieces_checked == torrent.pieces
+
+    def test_size_change_is_reported_without_hashing(self, tmp_path, make_content):
+        from unittest.mock import patch
+        from torrent_utils.verify import verify_torrent
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+        (content / "E03.mkv").write_bytes(b"short")
+
+        with patch("torrent_utils.verify.hash_pieces") as hash_pieces:
+            result = verify_torrent(torrent, str(content))
+
+        hash_pieces.assert_not_called()
+        assert "Size mismatch" in result.error and result.files == [str(content / "E03.mkv")]
+
+    def test_sampled_mode_only_hashes_selected_pieces(self, tmp_path, make_content):
+        from torrent_utils import verify
+
+        content = make_content([200_000, 150_000])
+        torrent = _written_torrent(content, tmp_path)
+        _corrupt(content / "E02.mkv", 149_999)  # inside the last piece, which is always sampled
+
+        result = verify.verify_torrent(torrent, str(content), samples=2, rng=random.Random(1))
+
+        assert result.pieces_checked < torrent.pieces
+        assert result.piece == torrent.pieces - 1
+
+
+class TestSamplePieces:
+    @pytest.mark.parametrize("samples", [1, 3, 50])
+    def test_every_file_gets_samples_within_its_pieces(self, samples):
+        from torrent_utils.hashing import FileEntry
+        from torrent_utils.verify import sample_pieces
+
+        layout = [FileEntry("a", 100_000), FileEntry("empty", 0), FileEntry("b", 40_000)]
+        chosen = sample_pieces(layout, 16 * 1024, samples, random.Random(0))
+
+        a_pieces = set(range(0, 100_000 // (16 * 1024) + 1))
+        b_pieces = set(range(100_000 // (16 * 1024), (140_000 - 1) // (16 * 1024) + 1))
+        assert chosen & a_pieces and chosen & b_pieces
+        assert chosen <= a_pieces | b_pieces
+        if samples >= 50:
+            assert chosen == a_pieces | b_pieces
+
+
+class TestResolveContentPath:
+    def test_accepts_content_or_parent_folder(self, tmp_path, make_content):
+        from torrent_utils.verify import resolve_content_path
+
+        content = make_content(EPISODE_SIZES)
+        torrent = _written_torrent(content, tmp_path)
+
+        assert resolve_content_path(torrent, str(content)) == str(content)
+        assert resolve_content_path(torrent, str(tmp_path)) == os.path.join(str(tmp_path), torrent.name)
@@ -4,7 +4,8 @@ import logging
 import os
 import sys
 
-from torrent_utils.helpers import get_path_list # Import the new helper function
+from torrent_utils.helpers import get_path_list, make_torrent_progress_callback
+from torrent_utils.verify import resolve_content_path, verify_torrent
 
 __VERSION = "1.1.0" # Incremented version
 LOG_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)-8s P%(process)06d.%(module)-12s %(funcName)-16sL%(lineno)04d %(message)s"
@@ -17,6 +18,12 @@ def main():
     parser = argparse.ArgumentParser(description='Edit a torrent file')
     parser.add_argument('file', nargs='?', default=None, help='path to the torrent file')
     parser.add_argument('-s', '--source', help='new value for the source field')
+    parser.add_argument('--verify', metavar='PATH',
+                        help='check the torrent against its content at PATH, or inside the folder PATH')
+    parser.add_argument('--verify-samples', type=int, metavar='N',
+                        help='with --verify, only check N random pieces per file')
+    parser.add_argument('--hash-workers', type=int, default=1,
+                        help='number of processes used by --verify (0 uses every CPU core)')
     arg = parser.parse_args()
 
     logging.basicConfig(datefmt=LOG_DATE_FORMAT, format=LOG_FORMAT, level=logging.INFO)
@@ -32,10 +39,22 @@ def main():
             with open(path, 'rb') as f:
                 torrent = torf.Torrent.read_from_file(path)
 
+            if arg.verify is not None:
+                content_path = resolve_content_path(torrent, arg.verify)
+                workers = (os.cpu_count() or 1) if arg.hash_workers == 0 else arg.hash_workers
+                result = verify_torrent(torrent, content_path, workers=workers, samples=arg.verify_samples,
+                                        callback=make_torrent_progress_callback(), interval=0.25)
+                if not result.ok:
+                    logging.error(f"Verification failed for '{os.path.basename(path)}': {result.describe()}")
+                    continue
+                logging.info(f"Verified '{os.path.basename(path)}': {result.describe()}")
+
             # Update the source flag if argument provided
             if arg.source is not None:
                 logging.info(f"Updating source for '{os.path.basename(path)}' to '{arg.source}'")
                 torrent.source = arg.source
+            elif arg.verify is not None:
+                continue
 
             # Save the modified torrent file
             torrent.write(path)
@@ -29,6 +29,15 @@ CONFIG_STRUCTURE = {
         'HUNO_ANNOUNCE_URL': 'https://hawke.uno/YOUR_PASSKEY/announce',
         'RED_ANNOUNCE_URL': 'https://flacsfor.me/YOUR_PASSKEY/announce',
         'OPS_ANNOUNCE_URL': 'https://home.opsfet.ch/YOUR_PASSKEY/announce',
+        '# Torrent Creation (piece sizes like 256K or 4M; empty for automatic)': '',
+        'PIECE_SIZE_MIN': '',
+        'PIECE_SIZE_MAX': '',
+        '# Screenshots (PNG compression level 0-9 and whether to optimise; empty for 9 and yes)': '',
+        'SCREENSHOT_PNG_LEVEL': '',
+        'SCREENSHOT_PNG_OPTIMIZE': '',
+        '# HTTP (retries and backoff factor in seconds for image hosts and APIs; empty for 3 and 0.5)': '',
+        'HTTP_RETRIES': '',
+        'HTTP_BACKOFF': '',
         '# Paths': '',
         'SEEDING_DIR': '',
         '# Seedbox FTP Settings': '',
@@ -0,0 +1,296 @@
+"""Piece hashing engines used when creating .torrent files."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+from .piece_reuse import reusable_pieces
+
+# Reads are issued in chunks of roughly this size, rounded to a whole number of pieces.
+# Kept at 4 MiB to stay clear of the Windows [Errno 22] seen with very large reads.
+READ_CHUNK_SIZE = 4 * 1024 * 1024
+# Amount of content handed to a worker process per task. Smaller batches give smoother
+# progress reporting; larger batches mean less inter-process overhead.
+BATCH_SIZE = 256 * 1024 * 1024
+# Linux (and other POSIX systems with preadv) read straight into a reused buffer and tell
+# the kernel the access is sequential and that hashed pages need not stay cached.
+POSIX_READS = hasattr(os, 'preadv') and hasattr(os, 'posix_fadvise')
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    """A file in torrent order: where it lives on disk and how many bytes it contributes."""
+    path: str
+    length: int
+
+
+def torrent_layout(torrent) -> list[FileEntry]:
+    """Returns the on-disk files of *torrent* in the order their bytes are hashed."""
+    info = torrent.metainfo['info']
+    if torrent.mode == 'singlefile':
+        return [FileEntry(str(torrent.path), int(info['length']))]
+    return [
+        FileEntry(str(filepath), int(fileinfo['length']))
+        for filepath, fileinfo in zip(torrent.filepaths, info['files'])
+    ]
+
+
+def piece_count(layout: list[FileEntry], piece_size: int) -> int:
+    total = sum(entry.length for entry in layout)
+    return -(-total // piece_size) if total else 0
+
+
+def file_at_offset(layout: list[FileEntry], offset: int) -> str | None:
+    """Returns the path of the file containing absolute byte *offset*."""
+    position = 0
+    for entry in layout:
+        if entry.length and position <= offset < position + entry.length:
+            return entry.path
+        position += entry.length
+    return layout[-1].path if layout else None
+
+
+def _read_chunks(path: str, offset: int, length: int, view: memoryview):
+    """Yields *length* bytes of *path* from *offset* as slices of *view*, which is reused.
+
+    Each slice is only valid until the next one is requested. With POSIX_READS, pages are
+    dropped from the page cache once hashed so that hashing a large pack does not push
+    the content other torrents are seeding out of memory.
+    """
+    if not POSIX_READS:
+        with open(path, 'rb', buffering=0) as f:
+            f.seek(offset)
+            while length:
+                read = f.readinto(view[:min(len(view), length)])
+                if not read:
+                    raise OSError(f"Unexpected end of file while hashing: {path}")
+                length -= read
+                yield view[:read]
+        return
+
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, offset, length, os.POSIX_FADV_SEQUENTIAL)
+        while length:
+            read = os.preadv(fd, [view[:min(len(view), length)]], offset)
+            if not read:
+                raise OSError(f"Unexpected end of file while hashing: {path}")
+            yield view[:read]
+            os.posix_fadvise(fd, offset, read, os.POSIX_FADV_DONTNEED)
+            offset += read
+            length -= read
+    finally:
+        os.close(fd)
+
+
+def hash_piece_range(layout: list[FileEntry], piece_size: int, start: int, stop: int) -> list[bytes]:
+    """Hashes pieces ``start`` to ``stop - 1`` and returns their SHA-1 digests.
+
+    Runs in worker processes, so it only takes plain picklable arguments.
+    """
+    total = sum(entry.length for entry in layout)
+    range_start = start * piece_size
+    range_end = min(stop * piece_size, total)
+    chunk_size = max(piece_size, (READ_CHUNK_SIZE // piece_size) * piece_size)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+
+    digests = []
+    hasher = hashlib.sha1()
+    piece_remaining = piece_size
+    position = 0
+
+    for entry in layout:
+        file_start, file_end = position, position + entry.length
+        position = file_end
+        if file_end <= range_start or not entry.length:
+            continue
+        if file_start >= range_end:
+            break
+
+        offset = max(range_start, file_start) - file_start
+        length = min(range_end, file_end) - file_start - offset
+        for chunk in _read_chunks(entry.path, offset, length, view):
+            read = len(chunk)
+            pos = 0
+            while pos < read:
+                take = min(piece_remaining, read - pos)
+                hasher.update(chunk[pos:pos + take])
+                pos += take
+                piece_remaining -= take
+                if not piece_remaining:
+                    digests.append(hasher.digest())
+                    hasher = hashlib.sha1()
+                    piece_remaining = piece_size
+
+    if piece_remaining != piece_size:
+        # Final, shorter piece at the end of the content
+        digests.append(hasher.digest())
+    return digests
+
+
+def _missing_batches(total_pieces: int, known, batch_pieces: int):
+    """Yields (start, stop) ranges covering every piece not in *known*, at most *batch_pieces* long."""
+    start = None
+    for index in range(total_pieces + 1):
+        missing = index < total_pieces and index not in known
+        if missing and start is None:
+            start = index
+        if start is not None and (not missing or index - start == batch_pieces):
+            yield start, index
+            start = index if missing else None
+
+
+class _InlineExecutor:
+    """Runs submitted work immediately in this process; used when only one worker is wanted."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def hash_pieces(layout: list[FileEntry], piece_size: int, workers: int = 1, callback=None, interval: float = 0,
+                known: dict[int, bytes] | None = None, on_batch=None) -> list[bytes] | None:
+    """Hashes the pieces of *layout* across a pool of *workers* processes.
+
+    Pieces already present in *known* (index to digest) are not read again. With a single
+    worker the hashing runs in this process.
+
+    *callback* is called as ``callback(filepath, pieces_done, pieces_total)`` at most
+    once every *interval* seconds, and always once hashing completes. Returning anything
+    other than ``None`` from it cancels hashing, in which case ``None`` is returned.
+    *on_batch*, if given, is called as ``on_batch(start, digests)`` with every batch of
+    fresh digests as it completes and can cancel hashing the same way.
+    """
+    known = known or {}
+    total_pieces = piece_count(layout, piece_size)
+    batch_pieces = max(1, BATCH_SIZE // piece_size)
+    batches = list(_missing_batches(total_pieces, known, batch_pieces))
+    results = dict(known)
+    pieces_done = len(known)
+    last_call = -1.0
+
+    # Spawned rather than forked: hashing runs in a stage thread while other threads hold locks
+    executor = (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+                if workers > 1 else _InlineExecutor())
+    with executor:
+        pending = {}
+        try:
+            # The inline executor hashes on submit, so submit lazily to keep progress flowing
+            queue = iter(batches)
+            for start, stop in queue:
+                pending[executor.submit(hash_piece_range, layout, piece_size, start, stop)] = (start, stop)
+                if len(pending) >= max(1, workers) * 2:
+                    break
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, stop = pending.pop(future)
+                    digests = future.result()
+                    results.update(zip(range(start, stop), digests))
+                    pieces_done += stop - start
+                    if on_batch is not None and on_batch(start, digests) is not None:
+                        logging.info("Piece hashing cancelled by batch check.")
+                        return None
+                    for next_start, next_stop in queue:
+                        pending[executor.submit(hash_piece_range, layout, piece_size, next_start, next_stop)] = (next_start, next_stop)
+                        break
+                    if callback is None:
+                        continue
+                    now = time.monotonic()
+                    if pieces_done < total_pieces and now - last_call < interval:
+                        continue
+                    last_call = now
+                    filepath = file_at_offset(layout, (stop - 1) * piece_size)
+                    if callback(filepath, pieces_done, total_pieces) is not None:
+                        logging.info("Piece hashing cancelled by callback.")
+                        return None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    return [results[index] for index in range(total_pieces)]
+
+
+def generate_torrent(torrent, workers: int | None = None, callback=None, interval: float = 0, cache=None,
+                     previous_torrents=None) -> bool:
+    """Hashes *torrent* and stores its pieces, like :meth:`torf.Torrent.generate`.
+
+    Pieces are hashed by a pool of *workers* processes, or in this process when *workers*
+    is unset or 1, producing exactly the same ``pieces`` value as torf. Where POSIX_READS
+    is unavailable a single worker falls back to torf's own hasher. The
+    *callback* has torf's signature: ``callback(torrent, filepath, pieces_done, pieces_total)``.
+
+    If a :class:`~torrent_utils.piece_cache.PieceCache` is given, pieces cached for the
+    same files are reused without reading any content, and fresh results are stored.
+    Likewise *previous_torrents*, a list of (torrent path, content path) pairs from
+    earlier runs, is searched for pieces covering files that have not changed since, so
+    only pieces touching replaced or added files are hashed again.
+    """
+    if torrent.path is None:
+        raise RuntimeError('generate_torrent() called with no path specified')
+    layout = torrent_layout(torrent)
+    paths = [entry.path for entry in layout]
+
+    if cache is not None:
+        cached = cache.get(paths, torrent.piece_size)
+        if cached is not None and len(cached) == torrent.pieces * 20:
+            torrent.metainfo['info']['pieces'] = cached
+            logging.info("Found piece hashes for this content in the piece cache. Skipping hashing.")
+            if callback:
+                callback(torrent, paths[-1], torrent.pieces, torrent.pieces)
+            return True
+
+    known = {}
+    if previous_torrents:
+        known = reusable_pieces(layout, torrent.piece_size, previous_torrents, str(torrent.path))
+
+    if len(known) == torrent.pieces:
+        torrent.metainfo['info']['pieces'] = b''.join(known[index] for index in range(torrent.pieces))
+        logging.info("All piece hashes reused from an earlier run. Skipping hashing.")
+        if callback:
+            callback(torrent, paths[-1], torrent.pieces, torrent.pieces)
+        generated = True
+    elif not known and (not workers or workers <= 1) and not POSIX_READS:
+        generated = torrent.generate(callback=callback, interval=interval)
+    else:
+        generated = _generate_with_pool(torrent, layout, workers or 1, callback, interval, known)
+
+    if generated and cache is not None:
+        cache.put(paths, torrent.piece_size, torrent.metainfo['info']['pieces'])
+    return generated
+
+
+def _generate_with_pool(torrent, layout: list[FileEntry], workers: int, callback, interval: float, known=None) -> bool:
+    if sum(entry.length for entry in layout) < 1:
+        raise ValueError(f"Empty or all files excluded: {torrent.path}")
+
+    to_hash = torrent.pieces - len(known or {})
+    logging.info(f"Hashing {to_hash} of {torrent.pieces} pieces with {workers} worker process(es)...")
+    def wrapped(filepath, pieces_done, pieces_total):
+        return callback(torrent, filepath, pieces_done, pieces_total)
+
+    digests = hash_pieces(layout, torrent.piece_size, workers=workers, callback=wrapped if callback else None,
+                          interval=interval, known=known)
+    if digests is None:
+        return False
+    if len(digests) != torrent.pieces:
+        raise RuntimeError(f'Unexpected number of hashes generated: {len(digests)} instead of {torrent.pieces}')
+    torrent.metainfo['info']['pieces'] = b''.join(digests)
+    return True
@@ -17,12 +17,15 @@ import uuid
 import contextlib
 import time
 import random
-from base64 import b64encode
 from pprint import pformat
 from urllib.parse import unquote
 
 from babel import Locale
-from pymediainfo import MediaInfo
+
+from .http_pool import session_for
+from .mediainfo import media_info_report
+from .multipart import Base64FilePart, FilePart, MultipartStream
+from .tmdb import tmdb_client
 
 DUMPFILE = "mediainfo.txt"
 _SLOWPICS_CONTEXT = {
@@ -288,11 +291,8 @@ def get_tmdb_id(name, api_key, isMovie, year=None):
     logging.info("Looking for title: " + name)
 
     endpoint = 'movie' if isMovie else 'tv'
-    url = f'https://api.themoviedb.org/3/search/{endpoint}'
     try:
-        response = requests.get(url, params={'query': name, 'api_key': api_key}, timeout=15)
-        response.raise_for_status()
-        results = response.json().get("results", [])
+        results = tmdb_client(api_key).search(endpoint, name)
 
         if not results:
             return None, []
@@ -339,36 +339,15 @@ def get_tmdb_id(name, api_key, isMovie, year=None):
 
 
 def getInfoDump(filePath: str, runDir: str, filename: str = DUMPFILE):
-    output = MediaInfo.parse(filename=filePath, output="", full=False)
-    logging.debug(output)
-    # don't ask, the output looks fine in the terminal, but writing it
-    # to a file adds empty lines every second line. This deletes them
+    """Writes the MediaInfo text dump of *filePath* to *runDir* and returns the complete JSON.
+    Both come from the run's single parse of the file (see torrent_utils.mediainfo)."""
+    report = media_info_report(filePath)
+    logging.debug(report.text)
     output_path = os.path.join(runDir, filename)
     logging.info("Creating mediainfo dump at " + output_path)
     with open(output_path, "w", encoding='utf-8') as f:
-        f.write(output)
-    with open(output_path, "r", encoding='utf-8') as fi:
-        # Get the lines from the file
-        lines = fi.readlines()
-
-        # Create an empty list to store the modified lines
-        new_lines = []
-
-        # Iterate over the lines in the file
-        for i, line in enumerate(lines):
-            # Check if the line number is even
-            if i % 2 == 0:
-                # If the line number is even, add the line to the new list
-                new_lines.append(line)
-
-    # Open the file in write mode
-    with open(output_path, 'w', encoding='utf-8') as fo:
-        # Write the modified lines to the file
-        for line in new_lines:
-            fo.write(line)
-    # Create a new mediainfo dump in JSON for parsing later
-    output = MediaInfo.parse(filename=filePath, output="JSON", full=False)
-    return output
+        f.write(report.text)
+    return report.json
 
 
 _last_alert_time = 0.0
@@ -414,10 +393,13 @@ def play_alert(kind: str = "input"):
         pass
 
 
-def make_torrent_progress_callback(alert_after_seconds: float = TORRENT_DONE_ALERT_SECONDS):
+def make_torrent_progress_callback(alert_after_seconds: float = TORRENT_DONE_ALERT_SECONDS, cancel=None):
+    """Returns a torf progress callback; once the *cancel* event is set it stops the hashing."""
     started_at = time.monotonic()
 
     def progress_callback(torrent, filepath, pieces_done, pieces_total):
+        if cancel is not None and cancel.is_set():
+            return True
         if pieces_total:
             print(f'{pieces_done/pieces_total*100:3.0f} % done', end="\r")
         else:
@@ -478,16 +460,19 @@ def cb(torrent, filepath, pieces_done, pieces_total):
     else:
         print('  0 % done', end="\r")
 
+def post_multipart(url: str, fields: dict, timeout: float, headers: dict | None = None):
+    """POSTs *fields* (strings and FileParts) as multipart/form-data streamed from disk,
+    so an upload holds one chunk of the image in memory rather than all of it."""
+    body = MultipartStream(fields)
+    headers = {**(headers or {}), "Content-Type": body.content_type}
+    return session_for(url).post(url, data=body, headers=headers, timeout=timeout)
+
 def uploadToPTPIMG(imageFile: str, api_key: str):
     """Uploads an image to PTPImg with robust error handling."""
     try:
-        with open(imageFile, 'rb') as f:
-            file_payload = {"file-upload[0]": f.read()}
-
-        response = requests.post(
-            url="https://ptpimg.me/upload.php",
-            data={"api_key": api_key},
-            files=file_payload,
+        response = post_multipart(
+            "https://ptpimg.me/upload.php",
+            {"api_key": api_key, "file-upload[0]": FilePart(imageFile)},
             timeout=30,
         )
         response.raise_for_status()
@@ -506,10 +491,7 @@ def upload_to_onlyimage(file_path: str, api_key: str):
     """Uploads an image to OnlyImage (Chevereto) with robust error handling."""
     api_endpoint = "https://onlyimage.org/api/1/upload"
     try:
-        with open(file_path, 'rb') as f:
-            files = {'source': (os.path.basename(file_path), f)}
-            data = {'key': api_key}
-            response = requests.post(api_endpoint, data=data, files=files, timeout=30)
+        response = post_multipart(api_endpoint, {'key': api_key, 'source': FilePart(file_path)}, timeout=30)
         response.raise_for_status()
 
         response_data = response.json()
@@ -532,10 +514,8 @@ def upload_to_hawkepics(file_path: str, api_key: str):
     """Uploads an image to hawke.pics (Chevereto) with robust error handling."""
     api_endpoint = "https://hawke.pics/api/1/upload"
     try:
-        with open(file_path, 'rb') as f:
-            files = {'source': (os.path.basename(file_path), f)}
-            headers = {'X-API-Key': api_key}
-            response = requests.post(api_endpoint, headers=headers, files=files, timeout=30)
+        response = post_multipart(api_endpoint, {'source': FilePart(file_path)}, timeout=30,
+                                  headers={'X-API-Key': api_key})
         response.raise_for_status()
 
         response_data = response.json()
@@ -619,12 +599,8 @@ def upload_to_imgbb(file_path: str, apiKey: str):
     """Uploads an image to ImgBB with robust error handling."""
     api_endpoint = "https://api.imgbb.com/1/upload"
     try:
-        with open(file_path, "rb") as imagefile:
-            payload = {
-                "key": apiKey,
-                "image": b64encode(imagefile.read()),
-            }
-        response = requests.post(api_endpoint, payload, timeout=20)
+        # ImgBB takes the image as base64 text, which is encoded while it is sent
+        response = post_multipart(api_endpoint, {"key": apiKey, "image": Base64FilePart(file_path)}, timeout=20)
         response.raise_for_status()
         
         response_data = response.json()
@@ -648,9 +624,7 @@ def upload_to_catbox(file_path: str, user_hash: str = None):
         data['userhash'] = user_hash
 
     try:
-        with open(file_path, 'rb') as f:
-            files = {'fileToUpload': (os.path.basename(file_path), f)}
-            response = requests.post(url, data=data, files=files, timeout=20)
+        response = post_multipart(url, {**data, 'fileToUpload': FilePart(file_path)}, timeout=20)
         response.raise_for_status()
         
         direct_link = response.text
@@ -0,0 +1,146 @@
+"""Shared, pooled HTTP sessions for the image hosts and other APIs called many times per run."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_POOL_SIZE = 5
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# Rate limiting and gateway errors are retried; other errors are left to the caller
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Longest a retry waits, whatever Retry-After asks for, so hedging and the caller's own
+# retries still get their turn
+MAX_RETRY_WAIT = 10.0
+
+_last_response = threading.local()
+
+
+def _remember_status(response, *args, **kwargs):
+    _last_response.status = response.status_code
+    retries = getattr(response.raw, "retries", None)
+    _last_response.retried = tuple(entry.status for entry in getattr(retries, "history", ()) if entry.status)
+
+
+def last_status() -> int | None:
+    """Returns the HTTP status of the last response a shared session received on this thread."""
+    return getattr(_last_response, "status", None)
+
+
+def retried_statuses() -> tuple[int, ...]:
+    """Returns the statuses of the responses retried before the last one on this thread."""
+    return getattr(_last_response, "retried", ())
+
+
+def reset_last_status():
+    _last_response.status = None
+    _last_response.retried = ()
+
+
+class CappedRetry(Retry):
+    """Retry that honours Retry-After, but never waits longer than MAX_RETRY_WAIT."""
+
+    def get_retry_after(self, response) -> float | None:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, MAX_RETRY_WAIT)
+
+
+def make_retry(retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF) -> Retry:
+    # Uploads are retried too: a duplicate image on a host is harmless, a lost screenshot is not
+    return CappedRetry(
+        total=retries,
+        connect=retries,
+        read=0,
+        status=retries,
+        backoff_factor=backoff,
+        backoff_max=MAX_RETRY_WAIT,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+class SessionRegistry:
+    """One keep-alive :class:`requests.Session` per host, created on first use.
+
+    Each session's connection pool holds at least *pool_size* connections so that
+    concurrent workers talking to the same host never open throwaway connections.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, retry: Retry | None = None):
+        self.pool_size = pool_size
+        self.retry = retry or make_retry()
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def _mount(self, session: requests.Session):
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=self.retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def get(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.hooks["response"].append(_remember_status)
+                self._mount(session)
+                self._sessions[host] = session
+            return session
+
+    def configure(self, pool_size: int | None = None, retry: Retry | None = None):
+        """Grows the pools to *pool_size* and/or replaces the retry policy of every session."""
+        with self._lock:
+            changed = False
+            if pool_size and pool_size > self.pool_size:
+                self.pool_size, changed = pool_size, True
+            if retry is not None:
+                self.retry, changed = retry, True
+            if changed:
+                # Requests already in flight keep the connection they hold on the old adapter
+                for session in self._sessions.values():
+                    self._mount(session)
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_registry = SessionRegistry()
+
+
+def session_for(url: str) -> requests.Session:
+    """Returns the shared session for the host of *url*."""
+    return _registry.get(url)
+
+
+def ensure_pool_size(workers: int):
+    """Makes sure *workers* concurrent requests to one host can each keep a connection."""
+    _registry.configure(pool_size=workers)
+
+
+def configure_http(settings=None):
+    """Applies HTTP_RETRIES and HTTP_BACKOFF from settings.ini to every shared session."""
+    retries, backoff = DEFAULT_RETRIES, DEFAULT_BACKOFF
+    raw_retries = settings.get('HTTP_RETRIES', '') if settings is not None else ''
+    raw_backoff = settings.get('HTTP_BACKOFF', '') if settings is not None else ''
+    try:
+        if raw_retries:
+            retries = max(0, int(raw_retries))
+        if raw_backoff:
+            backoff = max(0.0, float(raw_backoff))
+    except ValueError:
+        logging.warning(f"Ignoring HTTP_RETRIES = '{raw_retries}' / HTTP_BACKOFF = '{raw_backoff}': "
+                        f"expected numbers.")
+        retries, backoff = DEFAULT_RETRIES, DEFAULT_BACKOFF
+    _registry.configure(retry=make_retry(retries, backoff))
@@ -0,0 +1,197 @@
+"""Racing image hosts against each other, ordered by how they have been performing."""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .http_pool import last_status, reset_last_status, retried_statuses
+from .multipart import cancel_uploads_on
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+# A host averaging slower than this, or failing more often than not, goes to the back of the line
+SLOW_HOST_SECONDS = 10.0
+UNRELIABLE_SUCCESS_RATE = 0.5
+MIN_SAMPLES = 3
+# Default latency budget before the next host is started alongside a silent one
+HEDGE_AFTER = 5.0
+# Concurrent uploads per host start here and move between the bounds (see AdaptiveLimiter)
+INITIAL_HOST_CONCURRENCY = 2
+MAX_HOST_CONCURRENCY = 8
+# Responses that mean the host wants fewer requests
+THROTTLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class HostRecord:
+    latency: float = 0.0
+    success_rate: float = 1.0
+    samples: int = 0
+
+    @property
+    def demoted(self) -> bool:
+        return self.samples >= MIN_SAMPLES and (
+            self.latency > SLOW_HOST_SECONDS or self.success_rate < UNRELIABLE_SUCCESS_RATE)
+
+
+class HostStats:
+    """Moving averages of upload latency and success per host.
+
+    With a *store* (a :class:`~torrent_utils.upload_cache.HostStatsStore`) they are loaded
+    from and saved to disk, so a host that was slow or failing last run starts at the back.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._lock = threading.Lock()
+        self.records: dict[str, HostRecord] = {}
+        if store is not None:
+            for host, latency, success_rate, samples in store.load():
+                self.records[host] = HostRecord(latency, success_rate, samples)
+
+    def record(self, host: str, seconds: float, ok: bool):
+        with self._lock:
+            record = self.records.setdefault(host, HostRecord())
+            if record.samples == 0:
+                record.latency, record.success_rate = seconds, float(ok)
+            else:
+                record.latency += EWMA_ALPHA * (seconds - record.latency)
+                record.success_rate += EWMA_ALPHA * (float(ok) - record.success_rate)
+            record.samples += 1
+            snapshot = HostRecord(record.latency, record.success_rate, record.samples)
+        if self.store is not None:
+            self.store.save(host, snapshot.latency, snapshot.success_rate, snapshot.samples)
+
+    def order(self, hosts: list[tuple]) -> list[tuple]:
+        """Returns *hosts* (tuples starting with the host key) with demoted hosts moved to
+        the end, otherwise keeping the configured preference."""
+        with self._lock:
+            demoted = {key for key, record in self.records.items() if record.demoted}
+        return sorted(hosts, key=lambda host: host[0] in demoted)
+
+
+class AdaptiveLimiter:
+    """Per-host concurrency limits adjusted AIMD-style, like TCP congestion control.
+
+    Every fast success adds 1/limit (about one more slot per round of uploads); a throttling
+    response (429/5xx) or an upload slower than *target_latency* halves the limit.
+    """
+
+    def __init__(self, initial: int = INITIAL_HOST_CONCURRENCY, maximum: int = MAX_HOST_CONCURRENCY,
+                 target_latency: float = SLOW_HOST_SECONDS):
+        self.initial = initial
+        self.maximum = max(1, maximum)
+        self.target_latency = target_latency
+        self.limits: dict[str, float] = {}
+        self._active: dict[str, int] = {}
+        self._condition = threading.Condition()
+
+    def limit(self, host: str) -> int:
+        return max(1, int(self.limits.get(host, min(self.initial, self.maximum))))
+
+    @contextmanager
+    def slot(self, host: str):
+        with self._condition:
+            self._condition.wait_for(lambda: self._active.get(host, 0) < self.limit(host))
+            self._active[host] = self._active.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active[host] -= 1
+                self._condition.notify_all()
+
+    def feedback(self, host: str, seconds: float, ok: bool, throttled: bool = False):
+        with self._condition:
+            limit = self.limits.get(host, float(min(self.initial, self.maximum)))
+            if throttled or seconds > self.target_latency:
+                limit = max(1.0, limit / 2)
+                logging.debug(f"Backing off {host} to {int(limit)} concurrent upload(s).")
+            elif ok:
+                limit = min(float(self.maximum), limit + 1 / limit)
+            self.limits[host] = limit
+            self._condition.notify_all()
+
+
+def hedged_upload(image_path: str, hosts: list[tuple], hedge_after: float | None = HEDGE_AFTER,
+                  stats: HostStats | None = None, limiter: AdaptiveLimiter | None = None):
+    """Uploads *image_path* to (key, name, upload) *hosts* in order, starting the next host
+    whenever the running ones fail or stay silent for *hedge_after* seconds. With
+    *hedge_after* None each host is only tried after the previous one failed.
+
+    Returns (key, name, url) from the first host to succeed, or None. Uploads still
+    running then stop sending their body at the next chunk, and neither they nor hosts
+    still waiting for a slot report to *stats* or *limiter*. Each upload waits for a
+    slot from *limiter* and reports back to it.
+    """
+    if not hosts:
+        return None
+    executor = ThreadPoolExecutor(max_workers=len(hosts), thread_name_prefix="hedge")
+    pending = {}
+    remaining = list(hosts)
+    # Set once this call returns, so the hosts that lost the race stop uploading
+    finished = threading.Event()
+
+    def attempt(key, upload):
+        with limiter.slot(key) if limiter else _no_slot():
+            if finished.is_set():
+                return None
+            started_at = time.monotonic()
+            url = None
+            reset_last_status()
+            try:
+                with cancel_uploads_on(finished):
+                    url = upload(image_path)
+            finally:
+                # An upload cut short by the winner says nothing about how its host performs
+                if not finished.is_set():
+                    seconds = time.monotonic() - started_at
+                    if stats is not None:
+                        stats.record(key, seconds, bool(url))
+                    if limiter is not None:
+                        # A 429 retried by the session still means the host wants fewer requests
+                        throttled = any(status in THROTTLE_STATUSES
+                                        for status in (last_status(), *retried_statuses()))
+                        limiter.feedback(key, seconds, bool(url), throttled=throttled)
+        return url
+
+    def start_next():
+        key, name, upload = remaining.pop(0)
+        if pending:
+            logging.info(f"Also trying {name} for {os.path.basename(image_path)}.")
+        pending[executor.submit(attempt, key, upload)] = (key, name)
+
+    try:
+        start_next()
+        while pending:
+            done, _ = wait(pending, timeout=hedge_after if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                start_next()
+                continue
+            for future in done:
+                key, name = pending.pop(future)
+                try:
+                    url = future.result()
+                except Exception as e:
+                    logging.error(f"{name} upload raised: {e}")
+                    url = None
+                if url:
+                    return key, name, url
+                # A failed host is replaced straight away
+                if remaining:
+                    start_next()
+        return None
+    finally:
+        finished.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+@contextmanager
+def _no_slot():
+    yield
@@ -0,0 +1,196 @@
+"""Persistent job queue for processing many releases in one torrentmaker.py session."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+from dataclasses import dataclass, field
+
+JOB_DB_FILE = os.path.join("runs", "jobs.sqlite3")
+# How many stages of each kind may run at once across all jobs. Hashing already fans out
+# over worker processes and is disk-bound, so one pack is hashed at a time.
+POOL_LIMITS = {"hash": 1, "screenshots": 2, "upload": 3}
+
+
+@dataclass
+class Job:
+    id: int
+    path: str
+    status: str
+    run_dir: str | None = None
+    error: str | None = None
+
+
+class JobStore:
+    """SQLite tables of queued releases and the stages each has completed.
+
+    Jobs are keyed by their normalised absolute path, so queueing the same bulk file again
+    picks up where the last session stopped.
+    """
+
+    def __init__(self, db_path: str = JOB_DB_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " path TEXT NOT NULL UNIQUE,"
+                " status TEXT NOT NULL,"
+                " run_dir TEXT,"
+                " error TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_stages ("
+                " job_id INTEGER NOT NULL REFERENCES jobs(id),"
+                " stage TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " seconds REAL,"
+                " result TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (job_id, stage))"
+            )
+            yield conn
+
+    def enqueue(self, paths) -> list[Job]:
+        """Adds *paths* that are not queued yet and returns the jobs for all of them, in order."""
+        normalised = [os.path.normpath(os.path.abspath(path)) for path in paths]
+        with self._connect() as conn:
+            for path in normalised:
+                conn.execute(
+                    "INSERT OR IGNORE INTO jobs (path, status, updated_at) VALUES (?, 'pending', ?)",
+                    (path, time.time()),
+                )
+            rows = {
+                row[1]: Job(*row) for row in conn.execute("SELECT id, path, status, run_dir, error FROM jobs")
+            }
+        return [rows[path] for path in dict.fromkeys(normalised)]
+
+    def update_job(self, job: Job, status: str, error: str | None = None):
+        job.status, job.error = status, error
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, run_dir = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, job.run_dir, error, time.time(), job.id),
+            )
+
+    def completed_stages(self, job_id: int) -> dict:
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT stage, result FROM job_stages WHERE job_id = ? AND status = 'done'", (job_id,)
+            ).fetchall()
+        return {stage: json.loads(result) if result is not None else None for stage, result in rows}
+
+    def record_stage(self, job_id: int, stage: str, status: str, seconds: float | None = None, result=None):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_stages (job_id, stage, status, seconds, result, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, stage, status, seconds, json.dumps(result), time.time()),
+            )
+
+
+@dataclass
+class JobContext:
+    """What a running job needs from the queue: its record, the shared pool limits and the
+    prompt lock, which is held while the job may ask the user questions."""
+    job: Job
+    store: JobStore
+    limits: dict[str, threading.Semaphore] = field(default_factory=dict)
+    prompt_lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def run_dir(self) -> str | None:
+        if self.job.run_dir and os.path.isdir(self.job.run_dir):
+            return self.job.run_dir
+        return None
+
+    def set_run_dir(self, run_dir: str):
+        self.job.run_dir = run_dir
+        self.store.update_job(self.job, "running")
+
+    def completed(self) -> dict:
+        return self.store.completed_stages(self.job.id)
+
+    def record(self, stage):
+        """Stores a finished :class:`~torrent_utils.stages.Stage`; the store interface of StageScheduler."""
+        self.store.record_stage(self.job.id, stage.name, stage.status, stage.duration,
+                                stage.result if stage.status == "done" else None)
+
+    def mark_done(self, stage_name: str):
+        self.store.record_stage(self.job.id, stage_name, "done")
+
+    @contextmanager
+    def without_prompts(self):
+        """Lets other jobs prompt the user while this one runs its non-interactive stages."""
+        self.prompt_lock.release()
+        try:
+            yield
+        finally:
+            self.prompt_lock.acquire()
+
+
+def run_queue(paths, process, max_jobs: int = 2, store: JobStore | None = None,
+              pool_limits: dict[str, int] | None = None) -> dict[str, int]:
+    """Runs ``process(path, context)`` for every path not already done, *max_jobs* at a time.
+
+    Each job holds the prompt lock except inside ``context.without_prompts()``, so
+    questions from different jobs never interleave. A job raising (including through
+    ``sys.exit``) is marked failed and retried next time the queue is run. Returns a
+    count of jobs per final status.
+    """
+    store = store or JobStore()
+    jobs = store.enqueue(paths)
+    limits = {name: threading.Semaphore(size) for name, size in (pool_limits or POOL_LIMITS).items()}
+    prompt_lock = threading.Lock()
+    counts = {"done": 0, "failed": 0}
+
+    skipped = [job for job in jobs if job.status == "done"]
+    for job in skipped:
+        logging.info(f"Skipping {job.path}: already done in {job.run_dir}.")
+    counts["done"] += len(skipped)
+    pending = [job for job in jobs if job.status != "done"]
+    logging.info(f"Processing {len(pending)} queued release(s) with up to {max_jobs} at a time...")
+
+    def run_job(job: Job) -> str:
+        context = JobContext(job=job, store=store, limits=limits, prompt_lock=prompt_lock)
+        prompt_lock.acquire()
+        try:
+            if job.status != "pending":
+                logging.info(f"Resuming {job.path} (previous attempt: {job.status}).")
+            store.update_job(job, "running")
+            process(job.path, context)
+            store.update_job(job, "done")
+            logging.info(f"Finished {job.path}")
+        except BaseException as e:
+            if isinstance(e, SystemExit):
+                message = f"exited with status {e.code}"
+            else:
+                message = str(e) or type(e).__name__
+            store.update_job(job, "failed", message)
+            logging.error(f"Job for {job.path} failed: {message}")
+            if isinstance(e, KeyboardInterrupt):
+                raise
+        finally:
+            prompt_lock.release()
+        return job.status
+
+    with ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="job") as executor:
+        for status in executor.map(run_job, pending):
+            counts[status] = counts.get(status, 0) + 1
+
+    logging.info(f"Queue finished: {counts['done']} done, {counts['failed']} failed.")
+    return counts
@@ -1,16 +1,18 @@
 import logging
-import guessit
-import json
 import requests
 import os
 import re
 import sys
-from pymediainfo import MediaInfo
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
 from babel import Locale
 
 # These are still needed for now, but more logic will be moved from them.
 from .helpers import get_tmdb_id, get_season, get_episode, play_alert
+from .media_cache import cached_guessit
+from .mediainfo import media_info_report
+from .tmdb import tmdb_client
 
 
 def _prompt_tmdb_candidates(candidates: list, media_type: str) -> int | None:
@@ -36,6 +38,45 @@ def _prompt_tmdb_candidates(candidates: list, media_type: str) -> int | None:
     return None
 
 
+# MediaInfo parses and TMDB lookups run this many files at a time in prefetch()
+PREFETCH_WORKERS = 4
+_SECONDARY_AUDIO_KEYWORDS = ('commentary', 'director', 'audio description', 'descriptive',
+                             'hearing impaired', 'sdh', 'ad ')
+
+
+@dataclass(frozen=True, slots=True)
+class TrackIndex:
+    """The tracks of a MediaInfo report grouped by @type, built once per parse so naming
+    never has to scan the track list again."""
+    by_type: dict[str, tuple[dict, ...]] = field(default_factory=dict)
+    video: dict = field(default_factory=dict)
+    audio: dict = field(default_factory=dict)
+    audio_tracks: tuple[dict, ...] = ()
+    primary_audio: tuple[dict, ...] = ()
+    hdr: bool = False
+
+    @classmethod
+    def build(cls, media_info: dict) -> "TrackIndex":
+        tracks = media_info.get('media', {}).get('track', []) if media_info else []
+        by_type: dict[str, list[dict]] = {}
+        for track in tracks:
+            by_type.setdefault(track.get('@type'), []).append(track)
+        video = by_type.get('Video', [{}])[0]
+        audio_tracks = tuple(by_type.get('Audio', ()))
+        return cls(
+            by_type={kind: tuple(group) for kind, group in by_type.items()},
+            video=video,
+            audio=audio_tracks[0] if audio_tracks else {},
+            audio_tracks=audio_tracks,
+            primary_audio=tuple(
+                t for t in audio_tracks
+                if not any(kw in t.get('Title', '').lower() for kw in _SECONDARY_AUDIO_KEYWORDS)
+            ),
+            # Any HDR field or value on the video track, as str(video_track) used to check
+            hdr=any('HDR' in key or 'HDR' in str(value) for key, value in video.items()),
+        )
+
+
 class MediaFile:
     """A base class representing a generic media file."""
 
@@ -45,9 +86,11 @@ class MediaFile:
         self.path = file_path
         self.filename = os.path.basename(file_path)
         logging.info(f"Initializing MediaFile for: {self.filename}")
-        self.media_info = self._parse_media_info()
-        self.guessit_info = guessit.guessit(self._filename_for_guessit())
-        logging.debug(f"Guessit Info: {self.guessit_info}")
+        # media_info, guessit_info and metadata are resolved on first use (or by prefetch())
+        self._media_info = None
+        self._guessit_info = None
+        self._metadata = None
+        self._tracks = None
 
     def _filename_for_guessit(self) -> str:
         """Return filename with codec tokens that guessit doesn't recognise stripped out,
@@ -60,38 +103,70 @@ class MediaFile:
 
     def _parse_media_info(self) -> dict:
         try:
-            media_info_str = MediaInfo.parse(self.path, output="JSON")
-            return json.loads(media_info_str)
+            return media_info_report(self.path).data
         except Exception as e:
             logging.error(f"Could not parse MediaInfo for {self.filename}: {e}")
             return {}
 
     @property
-    def video_track(self) -> dict:
-        if self.media_info and 'track' in self.media_info.get('media', {}):
-            return next((t for t in self.media_info['media']['track'] if t.get('@type') == 'Video'), {})
+    def media_info(self) -> dict:
+        if getattr(self, '_media_info', None) is None:
+            self.media_info = self._parse_media_info()
+        return self._media_info
+
+    @media_info.setter
+    def media_info(self, value: dict):
+        self._media_info = value
+        self._tracks = None
+
+    @property
+    def guessit_info(self) -> dict:
+        if getattr(self, '_guessit_info', None) is None:
+            self._guessit_info = cached_guessit(self.path, self._filename_for_guessit())
+            logging.debug(f"Guessit Info: {self._guessit_info}")
+        return self._guessit_info
+
+    @guessit_info.setter
+    def guessit_info(self, value: dict):
+        self._guessit_info = value
+
+    @property
+    def metadata(self) -> dict:
+        """TMDB details, fetched (and if need be asked for) on first use."""
+        if getattr(self, '_metadata', None) is None:
+            self._metadata = self.fetch_metadata()
+        return self._metadata
+
+    @metadata.setter
+    def metadata(self, value: dict):
+        self._metadata = value
+
+    def fetch_metadata(self, interactive: bool = True) -> dict | None:
+        """A plain media file has no metadata source; see Movie and TVShow."""
         return {}
 
+    @property
+    def tracks(self) -> TrackIndex:
+        """The track index of :attr:`media_info`, built on first use."""
+        if getattr(self, '_tracks', None) is None:
+            self._tracks = TrackIndex.build(self.media_info)
+        return self._tracks
+
+    @property
+    def video_track(self) -> dict:
+        return self.tracks.video
+
     @property
     def audio_track(self) -> dict:
-        if self.media_info and 'track' in self.media_info.get('media', {}):
-            return next((t for t in self.media_info['media']['track'] if t.get('@type') == 'Audio'), {})
-        return {}
+        return self.tracks.audio
 
     @property
-    def audio_tracks(self) -> list:
-        if self.media_info and 'track' in self.media_info.get('media', {}):
-            return [t for t in self.media_info['media']['track'] if t.get('@type') == 'Audio']
-        return []
+    def audio_tracks(self) -> tuple:
+        return self.tracks.audio_tracks
 
-    def _get_primary_audio_tracks(self) -> list:
+    def _get_primary_audio_tracks(self) -> tuple:
         """Returns audio tracks excluding commentary and other secondary tracks."""
-        _secondary_keywords = ('commentary', 'director', 'audio description', 'descriptive',
-                               'hearing impaired', 'sdh', 'ad ')
-        return [
-            t for t in self.audio_tracks
-            if not any(kw in t.get('Title', '').lower() for kw in _secondary_keywords)
-        ]
+        return self.tracks.primary_audio
         
     def get_resolution(self) -> str:
         """Determines the video resolution with more detailed logic."""
@@ -249,7 +324,7 @@ class MediaFile:
 
     def get_colour_space(self) -> str:
         """Determines the color space (SDR, HDR, etc.)."""
-        if "HDR" not in str(self.video_track): return "SDR"
+        if not self.tracks.hdr: return "SDR"
         
         hdr_format = self.video_track.get('HDR_Format', '')
         hdr_compat = self.video_track.get('HDR_Format_Compatibility', '')
@@ -306,28 +381,30 @@ class Movie(MediaFile):
         super().__init__(file_path)
         self.tmdb_api_key = tmdb_api_key
         self.tmdb_id = tmdb_id
-        self.metadata = self.fetch_metadata()
+        self._tmdb_candidates = None
 
-    def fetch_metadata(self) -> dict:
-        """Fetches metadata from The Movie Database (TMDb) with error handling."""
-        if not self.tmdb_id:
+    def fetch_metadata(self, interactive: bool = True) -> dict | None:
+        """Fetches metadata from The Movie Database (TMDb) with error handling.
+        Without *interactive*, returns None instead of asking the user to pick a match."""
+        candidates = getattr(self, '_tmdb_candidates', None)
+        if not self.tmdb_id and candidates is None:
             logging.info("Attempting to find TMDB ID for movie...")
             title_to_search = self.guessit_info.get('title', '')
             year_hint = self.guessit_info.get('year')
             self.tmdb_id, candidates = get_tmdb_id(title_to_search, self.tmdb_api_key, isMovie=True, year=year_hint)
+            self._tmdb_candidates = candidates
 
         if not self.tmdb_id:
+            if not interactive:
+                return None
             self.tmdb_id = _prompt_tmdb_candidates(candidates, 'movie')
 
         if not self.tmdb_id:
             logging.error("Could not determine TMDB ID for movie.")
             return {}
 
-        url = f'https://api.themoviedb.org/3/movie/{self.tmdb_id}'
         try:
-            response = requests.get(url, params={'api_key': self.tmdb_api_key}, timeout=15)
-            response.raise_for_status()  # Will raise an exception for 4xx/5xx errors
-            return response.json()
+            return tmdb_client(self.tmdb_api_key).details('movie', self.tmdb_id)
         except requests.exceptions.RequestException as e:
             logging.error(f"Failed to fetch TMDB data for movie ID {self.tmdb_id}: {e}")
             return {}
@@ -379,28 +456,30 @@ class TVShow(MediaFile):
         super().__init__(file_path)
         self.tmdb_api_key = tmdb_api_key
         self.tmdb_id = tmdb_id
-        self.metadata = self.fetch_metadata()
+        self._tmdb_candidates = None
 
-    def fetch_metadata(self) -> dict:
-        """Fetches TV show metadata from TMDb with error handling."""
-        if not self.tmdb_id:
+    def fetch_metadata(self, interactive: bool = True) -> dict | None:
+        """Fetches TV show metadata from TMDb with error handling.
+        Without *interactive*, returns None instead of asking the user to pick a match."""
+        candidates = getattr(self, '_tmdb_candidates', None)
+        if not self.tmdb_id and candidates is None:
             logging.info("Attempting to find TMDB ID for TV show...")
             title_to_search = self.guessit_info.get('title', '')
             year_hint = self.guessit_info.get('year')
             self.tmdb_id, candidates = get_tmdb_id(title_to_search, self.tmdb_api_key, isMovie=False, year=year_hint)
+            self._tmdb_candidates = candidates
 
         if not self.tmdb_id:
+            if not interactive:
+                return None
             self.tmdb_id = _prompt_tmdb_candidates(candidates, 'TV show')
 
         if not self.tmdb_id:
             logging.error("Could not determine TMDB ID for TV show.")
             return {}
             
-        url = f'https://api.themoviedb.org/3/tv/{self.tmdb_id}'
         try:
-            response = requests.get(url, params={'api_key': self.tmdb_api_key}, timeout=15)
-            response.raise_for_status() # Will raise an exception for 4xx/5xx errors
-            return response.json()
+            return tmdb_client(self.tmdb_api_key).details('tv', self.tmdb_id)
         except requests.RequestException as e:
             logging.error(f"Failed to fetch TMDB data for TV show ID {self.tmdb_id}: {e}")
             return {}
@@ -484,3 +563,25 @@ class TVShow(MediaFile):
             filename = filename.replace(' ', '.')
 
         return re.sub(r'[\'é]', '', filename).replace('..', '.').replace('--', '-')
+
+
+def prefetch(media_files: list, metadata: bool = True, workers: int = PREFETCH_WORKERS) -> list:
+    """Resolves media_info, guessit_info and (with *metadata*) TMDB metadata of many files concurrently.
+
+    Nothing is asked here: a file whose TMDB match needs the user to choose is left
+    unresolved and prompts on first access of its metadata, as it would without prefetching.
+    Returns *media_files*.
+    """
+    def resolve(media_file):
+        try:
+            media_file.guessit_info
+            if metadata:
+                fetched = media_file.fetch_metadata(interactive=False)
+                if fetched is not None:
+                    media_file.metadata = fetched
+        except Exception as e:
+            logging.error(f"Could not prefetch {media_file.filename}: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(resolve, media_files))
+    return media_files
@@ -0,0 +1,138 @@
+"""On-disk cache of MediaInfo reports and guessit results, shared by fileRenamer and torrentmaker."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import guessit
+from guessit.jsonutils import GuessitEncoder
+
+from . import mediainfo
+from .piece_cache import file_identity
+
+# Under the scripts' own runs/ folder rather than the working directory, so fileRenamer.py
+# and torrentmaker.py share one warm cache wherever they are started from
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEDIA_CACHE_FILE = os.path.join(SCRIPT_DIR, "runs", "media_cache.sqlite3")
+MAX_CACHE_ENTRIES = 5000
+
+
+class MediaCache:
+    """Persistent MediaInfo and guessit results, keyed by the identity of the file.
+
+    The identity (device, inode, size, mtime) survives renames and hardlinks, so a file
+    renamed by fileRenamer.py is not parsed again by torrentmaker.py. guessit results are
+    also keyed by the name that was parsed, since that is all guessit looks at.
+    """
+
+    def __init__(self, db_path: str = MEDIA_CACHE_FILE):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS media_info ("
+            " identity TEXT PRIMARY KEY,"
+            " path TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " json TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS guessit ("
+            " identity TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " PRIMARY KEY (identity, name))"
+        )
+        return conn
+
+    @staticmethod
+    def _identity(path: str) -> str:
+        return json.dumps(file_identity(path))
+
+    def _put(self, table: str, columns: tuple, values: tuple):
+        placeholders = ", ".join("?" * (len(columns) + 1))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, created_at) VALUES ({placeholders})",
+                (*values, time.time()),
+            )
+            conn.execute(
+                f"DELETE FROM {table} WHERE rowid NOT IN "
+                f"(SELECT rowid FROM {table} ORDER BY created_at DESC LIMIT ?)",
+                (MAX_CACHE_ENTRIES,),
+            )
+
+    def get_media_info(self, path: str) -> tuple[str, str, str] | None:
+        """Returns (path parsed, text, JSON) for the file at *path*, or None."""
+        try:
+            with closing(self._connect()) as conn:
+                return conn.execute(
+                    "SELECT path, text, json FROM media_info WHERE identity = ?", (self._identity(path),)
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"MediaInfo cache lookup failed: {e}")
+            return None
+
+    def put_media_info(self, path: str, text: str, json_text: str):
+        try:
+            self._put("media_info", ("identity", "path", "text", "json"),
+                      (self._identity(path), os.path.abspath(path), text, json_text))
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not store MediaInfo in cache: {e}")
+
+    def get_guessit(self, path: str, name: str) -> dict | None:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT result FROM guessit WHERE identity = ? AND name = ?", (self._identity(path), name)
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"guessit cache lookup failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def put_guessit(self, path: str, name: str, result):
+        try:
+            self._put("guessit", ("identity", "name", "result"),
+                      (self._identity(path), name, json.dumps(result, cls=GuessitEncoder)))
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not store guessit result in cache: {e}")
+
+
+_cache: MediaCache | None = None
+
+
+def enable_media_cache(db_path: str = MEDIA_CACHE_FILE) -> MediaCache:
+    """Turns on the persistent cache for this process, for MediaInfo and guessit alike."""
+    global _cache
+    _cache = MediaCache(db_path)
+    mediainfo.use_store(_cache)
+    return _cache
+
+
+def cached_guessit(path: str, name: str | None = None):
+    """guessit of *name* (the file name of *path* by default), from the cache when enabled.
+
+    Cached results come back as a plain dict with languages and countries as strings.
+    """
+    name = name or os.path.basename(path)
+    cache = _cache
+    if cache is not None:
+        result = cache.get_guessit(path, name)
+        if result is not None:
+            return result
+    result = guessit.guessit(name)
+    if cache is not None:
+        cache.put_guessit(path, name, result)
+    return result
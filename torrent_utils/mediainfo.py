@@ -0,0 +1,163 @@
+"""One MediaInfo parse per file and run, shared by the text dump and MediaFile."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from pymediainfo import MediaInfo
+
+# Reports kept in memory; a bulk rename only ever needs the file it is on
+MAX_REPORTS = 64
+
+
+@dataclass
+class MediaInfoReport:
+    """Everything needed from one MediaInfo parse: the text dump posted to trackers
+    (normal view) and the complete JSON that MediaFile reads tracks from."""
+    path: str
+    text: str
+    json: str
+    data: dict = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # libmediainfo ends lines with \r\n on Windows, which doubled every line in the dump
+        self.text = "\n".join(self.text.splitlines()) + "\n"
+        self.data = json.loads(self.json) if self.json else {}
+
+    def relocated(self, path: str) -> MediaInfoReport:
+        """The same report for the file now at *path* (renamed or hardlinked)."""
+        path = os.path.abspath(path)
+        text = re.sub(r"^(Complete name\s*: ).*$", lambda m: m.group(1) + path, self.text, count=1, flags=re.M)
+        data = json.loads(self.json) if self.json else {}
+        media = data.get('media') or {}
+        general = next((t for t in media.get('track', []) if t.get('@type') == 'General'), None)
+        if general is not None:
+            name = os.path.basename(path)
+            stem, extension = os.path.splitext(name)
+            general.update(CompleteName=path, FolderName=os.path.dirname(path), FileNameExtension=name,
+                           FileName=stem, FileExtension=extension.lstrip('.'))
+        if '@ref' in media:
+            media['@ref'] = path
+        return MediaInfoReport(path, text, json.dumps(data) if data else self.json)
+
+
+def _parse_twice(path: str) -> tuple[str, str]:
+    """The public pymediainfo way: one parse for the text, another for the JSON."""
+    return (MediaInfo.parse(path, output="", full=False),
+            MediaInfo.parse(path, output="JSON", full=True))
+
+
+def _inform_once(path: str) -> tuple[str, str]:
+    """Opens *path* in libmediainfo once through pymediainfo's private library handle."""
+    lib, handle, _, lib_version = MediaInfo._get_library()
+    try:
+        if lib_version >= (18, 3):
+            lib.MediaInfo_Option(handle, "Cover_Data", "")
+        lib.MediaInfo_Option(handle, "CharSet", "UTF-8")
+        if lib.MediaInfo_Open(handle, path) == 0:
+            if not os.path.exists(path):
+                raise FileNotFoundError(path)
+            raise RuntimeError(f"An error occured while opening {path} with libmediainfo")
+        lib.MediaInfo_Option(handle, "Inform", "")
+        lib.MediaInfo_Option(handle, "Complete", "")
+        text = lib.MediaInfo_Inform(handle, 0)
+        lib.MediaInfo_Option(handle, "Inform", "JSON")
+        lib.MediaInfo_Option(handle, "Complete", "1")
+        json_text = lib.MediaInfo_Inform(handle, 0)
+    finally:
+        lib.MediaInfo_Close(handle)
+        lib.MediaInfo_Delete(handle)
+    return text, json_text
+
+
+def _inform(path: str) -> tuple[str, str]:
+    """Renders *path* both as text and as complete JSON, parsing it once where the
+    installed pymediainfo allows it."""
+    try:
+        return _inform_once(path)
+    except (AttributeError, TypeError, ValueError) as e:
+        # _get_library is private and may change shape between pymediainfo versions
+        logging.debug(f"Single-parse MediaInfo unavailable ({e!r}); parsing {os.path.basename(path)} twice.")
+        return _parse_twice(path)
+
+
+class MediaInfoService:
+    """Parses each file once and hands out the same :class:`MediaInfoReport` afterwards.
+
+    Reports are keyed by (path, size, mtime), so a file that was replaced or renamed is
+    parsed again. Concurrent requests for one file wait for a single parse. With a
+    *store* (a :class:`~torrent_utils.media_cache.MediaCache`), reports from earlier
+    runs are reused as well.
+    """
+
+    def __init__(self, max_reports: int = MAX_REPORTS, inform=_inform, store=None):
+        self.max_reports = max_reports
+        self.inform = inform
+        self.store = store
+        self._reports: OrderedDict[tuple, MediaInfoReport] = OrderedDict()
+        self._locks: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(path: str) -> tuple:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def report(self, path: str) -> MediaInfoReport:
+        path = os.fspath(path)
+        key = self._key(path)
+        with self._lock:
+            file_lock = self._locks.setdefault(key, threading.Lock())
+        with file_lock:
+            with self._lock:
+                report = self._reports.get(key)
+                if report is not None:
+                    self._reports.move_to_end(key)
+                    return report
+            try:
+                report = self._load(path)
+            finally:
+                with self._lock:
+                    self._locks.pop(key, None)
+            with self._lock:
+                self._reports[key] = report
+                while len(self._reports) > self.max_reports:
+                    self._reports.popitem(last=False)
+        return report
+
+    def _load(self, path: str) -> MediaInfoReport:
+        store = self.store
+        cached = store.get_media_info(path) if store is not None else None
+        if cached is not None:
+            parsed_path, text, json_text = cached
+            logging.debug(f"Reusing cached MediaInfo for {os.path.basename(path)}")
+            report = MediaInfoReport(parsed_path, text, json_text)
+            return report if parsed_path == os.path.abspath(path) else report.relocated(path)
+        logging.debug(f"Parsing MediaInfo for {os.path.basename(path)}")
+        text, json_text = self.inform(path)
+        if store is not None:
+            store.put_media_info(path, text, json_text)
+        return MediaInfoReport(os.path.abspath(path), text, json_text)
+
+    def clear(self):
+        with self._lock:
+            self._reports.clear()
+
+
+_service = MediaInfoService()
+
+
+def media_info_report(path: str) -> MediaInfoReport:
+    """Returns the shared report for *path*, parsing the file on first use."""
+    return _service.report(path)
+
+
+def use_store(store):
+    """Backs the shared service with a persistent *store*, or none."""
+    _service.store = store
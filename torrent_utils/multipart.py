@@ -0,0 +1,151 @@
+"""multipart/form-data bodies streamed from disk, for uploading large screenshots."""
+
+from __future__ import annotations
+
+import base64
+import io
+import mimetypes
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+CHUNK_SIZE = 64 * 1024
+# Base64 turns every 3 bytes into 4 characters, so chunks must be a multiple of 3
+BASE64_CHUNK_SIZE = 48 * 1024
+
+_cancel = threading.local()
+
+
+class UploadCancelled(Exception):
+    """Raised from a body's read once its cancel event is set, which aborts the request.
+
+    Not an OSError, so urllib3 does not mistake it for a connection error and retry."""
+
+
+@contextmanager
+def cancel_uploads_on(event: threading.Event):
+    """Makes every MultipartStream created on this thread inside the block stop sending
+    once *event* is set."""
+    previous = getattr(_cancel, "event", None)
+    _cancel.event = event
+    try:
+        yield
+    finally:
+        _cancel.event = previous
+
+
+class FilePart:
+    """A file sent as it is, read in chunks."""
+
+    def __init__(self, path: str, filename: str | None = None, content_type: str | None = None):
+        self.path = path
+        self.filename = filename or os.path.basename(path)
+        self.content_type = content_type or mimetypes.guess_type(self.filename)[0] or "application/octet-stream"
+
+    def headers(self, name: str) -> str:
+        return (f'Content-Disposition: form-data; name="{name}"; filename="{self.filename}"\r\n'
+                f'Content-Type: {self.content_type}\r\n')
+
+    def __len__(self):
+        return os.path.getsize(self.path)
+
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                yield chunk
+
+
+class Base64FilePart(FilePart):
+    """A file sent as a base64 text field, encoded a chunk at a time (what ImgBB expects)."""
+
+    def headers(self, name: str) -> str:
+        return f'Content-Disposition: form-data; name="{name}"\r\n'
+
+    def __len__(self):
+        return 4 * -(-os.path.getsize(self.path) // 3)
+
+    def chunks(self):
+        with open(self.path, 'rb') as f:
+            while chunk := f.read(BASE64_CHUNK_SIZE):
+                yield base64.b64encode(chunk)
+
+
+class MultipartStream(io.RawIOBase):
+    """A read-only, rewindable file object producing a multipart/form-data body.
+
+    *fields* maps names to strings or :class:`FilePart`s. Only one chunk of a file is
+    held in memory at a time, and the length is known up front so requests sends a
+    Content-Length instead of chunked encoding. Rewinding (``seek(0)``) lets urllib3
+    retry the upload. Once *cancel* (by default the event of an enclosing
+    :func:`cancel_uploads_on`) is set, the next read raises :class:`UploadCancelled`.
+    """
+
+    def __init__(self, fields: dict, boundary: str | None = None, cancel: threading.Event | None = None):
+        super().__init__()
+        self.cancel = cancel if cancel is not None else getattr(_cancel, "event", None)
+        self.boundary = boundary or uuid.uuid4().hex
+        self.fields = list(fields.items())
+        self._length = sum(len(piece) for piece in self._pieces())
+        self.seek(0)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def _pieces(self):
+        """Yields the body as bytes and FileParts, which :meth:`read` expands into chunks."""
+        for name, value in self.fields:
+            if isinstance(value, FilePart):
+                yield f"--{self.boundary}\r\n{value.headers(name)}\r\n".encode()
+                yield value
+                yield b"\r\n"
+            else:
+                yield (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                       f'{value}\r\n').encode()
+        yield f"--{self.boundary}--\r\n".encode()
+
+    def _chunks(self):
+        for piece in self._pieces():
+            if isinstance(piece, FilePart):
+                yield from piece.chunks()
+            else:
+                yield piece
+
+    def __len__(self):
+        return self._length
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if (whence, offset) != (io.SEEK_SET, 0):
+            raise io.UnsupportedOperation("MultipartStream can only be rewound to the start")
+        self._chunk_iter, self._buffer, self._position = self._chunks(), b"", 0
+        return 0
+
+    def read(self, size=-1):
+        if self.cancel is not None and self.cancel.is_set():
+            raise UploadCancelled("Upload cancelled")
+        while size is None or size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunk_iter, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size is None or size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
@@ -0,0 +1,91 @@
+"""On-disk cache of torrent piece hashes, keyed by the identity of the hashed files."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+PIECE_CACHE_FILE = os.path.join("runs", "piece_cache.sqlite3")
+MAX_CACHE_ENTRIES = 500
+
+
+def file_identity(path: str) -> tuple[int, int, int, int]:
+    """Returns (device, inode, size, mtime_ns) for *path*.
+
+    Renames and hardlinks keep the same identity, while any rewrite of the file
+    changes its size or mtime.
+    """
+    st = os.stat(path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class PieceCache:
+    """Persistent store of piece tables for previously hashed content.
+
+    A piece table is looked up by the ordered identities of every file in the torrent
+    plus the piece size, so it is found again for renamed or hardlinked copies of the
+    same files but never for content that has been modified since it was hashed.
+    """
+
+    def __init__(self, db_path: str = PIECE_CACHE_FILE):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS piece_hashes ("
+            " layout_key TEXT PRIMARY KEY,"
+            " piece_size INTEGER NOT NULL,"
+            " paths TEXT NOT NULL,"
+            " pieces BLOB NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        return conn
+
+    @staticmethod
+    def layout_key(paths, piece_size: int) -> str:
+        identities = [file_identity(path) for path in paths]
+        payload = json.dumps({"piece_size": piece_size, "files": identities})
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, paths, piece_size: int) -> bytes | None:
+        """Returns the cached concatenated piece hashes for *paths*, or None."""
+        try:
+            key = self.layout_key(paths, piece_size)
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT pieces, paths FROM piece_hashes WHERE layout_key = ?", (key,)
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Piece cache lookup failed: {e}")
+            return None
+        if not row:
+            return None
+        logging.debug(f"Piece cache hit (first hashed as {json.loads(row[1])[0]})")
+        return row[0]
+
+    def put(self, paths, piece_size: int, pieces: bytes):
+        """Stores *pieces* for *paths*, evicting the oldest entries beyond MAX_CACHE_ENTRIES."""
+        try:
+            key = self.layout_key(paths, piece_size)
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO piece_hashes (layout_key, piece_size, paths, pieces, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, piece_size, json.dumps([str(p) for p in paths]), bytes(pieces), time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM piece_hashes WHERE layout_key NOT IN "
+                    "(SELECT layout_key FROM piece_hashes ORDER BY created_at DESC LIMIT ?)",
+                    (MAX_CACHE_ENTRIES,),
+                )
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not store piece hashes in cache: {e}")
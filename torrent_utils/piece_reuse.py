@@ -0,0 +1,184 @@
+"""Reuse of piece hashes from .torrent files written by earlier runs."""
+
+from __future__ import annotations
+
+import logging
+import os
+
+import torf
+
+# Only this many of the newest runs are searched for reusable pieces
+MAX_PREVIOUS_RUNS = 50
+
+
+def previous_run_torrents(runs_dir: str = "runs", limit: int = MAX_PREVIOUS_RUNS) -> list[tuple[str, str]]:
+    """Returns (torrent path, content path) for the newest *limit* earlier runs, newest first.
+
+    The content path is the source path the run recorded in source_path.txt.
+    """
+    if not os.path.isdir(runs_dir):
+        return []
+    candidates = []
+    for run in sorted(os.listdir(runs_dir), reverse=True)[:limit]:
+        run_path = os.path.join(runs_dir, run)
+        meta_path = os.path.join(run_path, "source_path.txt")
+        if not os.path.isfile(meta_path):
+            continue
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                content_path = f.read().strip()
+        except OSError:
+            continue
+        for name in os.listdir(run_path):
+            if name.endswith('.torrent'):
+                candidates.append((os.path.join(run_path, name), content_path))
+    return candidates
+
+
+def _previous_files(previous: torf.Torrent, content_path: str) -> list[tuple[str, str, int]]:
+    """Returns (relative path, path on disk, length) for each file of an earlier torrent."""
+    # The first path segment is the torrent name, which may differ from the folder on disk
+    if previous.mode == 'singlefile':
+        return [("", content_path, previous.size)]
+    return [
+        (os.path.join(*file.parts[1:]), os.path.join(content_path, *file.parts[1:]), file.size)
+        for file in previous.files
+    ]
+
+
+def torrent_is_current(torrent_path: str, content_path: str) -> bool:
+    """True if *content_path* still holds exactly the files *torrent_path* was created from.
+
+    Returns False when a file was added, removed, resized or modified after the torrent
+    was written, e.g. after an episode of a season pack was replaced by a PROPER.
+    """
+    try:
+        previous = torf.Torrent.read(torrent_path)
+        written_at = os.stat(torrent_path).st_mtime_ns
+        current = torf.Torrent(path=content_path)
+        previous_files = [(key, length) for key, _, length in _previous_files(previous, content_path)]
+        current_files = [(key, length) for key, _, length in _previous_files(current, content_path)]
+        if previous_files != current_files:
+            return False
+        return all(os.stat(path).st_mtime_ns <= written_at for path in current.filepaths)
+    except (torf.TorfError, OSError) as e:
+        logging.debug(f"Could not compare {torrent_path} with {content_path}: {e}")
+        return False
+
+
+def _relative_path(path: str, root: str) -> str:
+    return "" if os.path.normpath(path) == os.path.normpath(root) else os.path.relpath(path, root)
+
+
+def _file_identities(path: str) -> dict[tuple[int, int], int]:
+    """Maps (device, inode) to mtime for every file at or under *path*, without reading any."""
+    if os.path.isfile(path):
+        paths = [path]
+    else:
+        paths = [os.path.join(folder, name) for folder, _, names in os.walk(path) for name in names]
+    identities = {}
+    for file_path in paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        identities[(stat.st_dev, stat.st_ino)] = stat.st_mtime_ns
+    return identities
+
+
+def _is_unchanged(path: str, previous_path: str, length: int, written_at: int) -> bool:
+    """True if *path* is the very file an earlier run hashed, untouched since then."""
+    try:
+        new, old = os.stat(path), os.stat(previous_path)
+    except OSError:
+        return False
+    return ((new.st_dev, new.st_ino) == (old.st_dev, old.st_ino)
+            and new.st_size == length
+            and new.st_mtime_ns <= written_at)
+
+
+def iter_piece_spans(files, piece_size: int):
+    """Yields, for each piece, the tuple of (file key, offset in file, length) it covers.
+
+    *files* is a sequence of (key, length) in torrent order. Empty files cover no bytes
+    and never appear in a span.
+    """
+    spans = []
+    piece_remaining = piece_size
+    for key, length in files:
+        offset = 0
+        while offset < length:
+            take = min(piece_remaining, length - offset)
+            spans.append((key, offset, take))
+            offset += take
+            piece_remaining -= take
+            if not piece_remaining:
+                yield tuple(spans)
+                spans = []
+                piece_remaining = piece_size
+    if spans:
+        yield tuple(spans)
+
+
+def reusable_pieces(layout, piece_size: int, candidates, root: str) -> dict[int, bytes]:
+    """Collects piece hashes that earlier torrents already computed for the same bytes.
+
+    *layout* is the list of files (with ``path`` and ``length``) about to be hashed from
+    the content at *root*. A file counts as unchanged when it is the same inode as the
+    file an earlier run hashed (its original or a hardlinked seeding copy made by
+    ``copy_folder_structure``) and has not been modified since that torrent was written.
+
+    A piece is reused only if an earlier piece of the same size covered exactly the same
+    byte ranges of the same unchanged files, so pieces straddling a replaced or added
+    file are always re-hashed. Returns a dict mapping piece index to SHA-1 digest, which
+    covers every piece when nothing changed.
+    """
+    new_files = [(_relative_path(entry.path, root), entry.length) for entry in layout]
+    new_spans = list(iter_piece_spans(new_files, piece_size))
+    new_identities = set(_file_identities(root))
+    content_identities = {}
+    best = {}
+    for torrent_path, content_path in candidates:
+        if not os.path.exists(content_path):
+            continue
+        # Parsing a torrent means reading its whole piece table, so first make sure its
+        # content still shares an untouched file with ours, from a stat of each file
+        if content_path not in content_identities:
+            content_identities[content_path] = _file_identities(content_path)
+        try:
+            written_at = os.stat(torrent_path).st_mtime_ns
+        except OSError:
+            continue
+        if not any(identity in new_identities and mtime <= written_at
+                   for identity, mtime in content_identities[content_path].items()):
+            continue
+        try:
+            previous = torf.Torrent.read(torrent_path)
+        except (torf.TorfError, OSError) as e:
+            logging.debug(f"Skipping unreadable torrent {torrent_path}: {e}")
+            continue
+        if previous.piece_size != piece_size or not previous.hashes:
+            continue
+
+        new_paths = {key: entry.path for (key, _), entry in zip(new_files, layout)}
+        previous_files = _previous_files(previous, content_path)
+        unchanged = {
+            key for key, previous_path, length in previous_files
+            if key in new_paths and _is_unchanged(new_paths[key], previous_path, length, written_at)
+        }
+        if not unchanged:
+            continue
+
+        old_hashes = previous.hashes
+        known_spans = {
+            spans: old_hashes[index]
+            for index, spans in enumerate(iter_piece_spans([(key, length) for key, _, length in previous_files], piece_size))
+            if index < len(old_hashes) and all(key in unchanged for key, _, _ in spans)
+        }
+        found = {index: known_spans[spans] for index, spans in enumerate(new_spans) if spans in known_spans}
+        if len(found) > len(best):
+            best = found
+            logging.info(f"{len(found)}/{len(new_spans)} piece hashes can be reused from {os.path.relpath(torrent_path)}.")
+        if len(best) == len(new_spans):
+            break
+    return best
@@ -0,0 +1,106 @@
+"""Piece-size policy shared by the video and music torrent makers."""
+
+from __future__ import annotations
+
+import logging
+import re
+import sys
+
+import torf
+
+PIECE_SIZE_FLOOR = 16 * 1024  # smallest piece size BitTorrent clients accept
+DEFAULT_PIECE_SIZE_MIN = PIECE_SIZE_FLOOR
+DEFAULT_PIECE_SIZE_MAX = 16 * 1024 * 1024
+# Larger pieces make Windows fail reads with [Errno 22], so keep the old 4 MiB cap there
+WINDOWS_PIECE_SIZE_MAX = 4 * 1024 * 1024
+# Rough single-core SHA-1 throughput including disk reads, only used for the time estimate
+HASH_BYTES_PER_SECOND = 300 * 1024 * 1024
+
+_SIZE_UNITS = {'': 1, 'k': 1024, 'kib': 1024, 'm': 1024 ** 2, 'mib': 1024 ** 2}
+
+
+def parse_size(value) -> int | None:
+    """Parses a piece size such as ``4194304``, ``512K``, ``4M`` or ``8 MiB``.
+
+    Returns None for empty or malformed values.
+    """
+    match = re.fullmatch(r'\s*(\d+)\s*([a-z]*)\s*', str(value or ''), flags=re.IGNORECASE)
+    if not match or match.group(2).lower() not in _SIZE_UNITS:
+        return None
+    return int(match.group(1)) * _SIZE_UNITS[match.group(2).lower()]
+
+
+def _is_valid_piece_size(size: int | None) -> bool:
+    return size is not None and size >= PIECE_SIZE_FLOOR and size & (size - 1) == 0
+
+
+def piece_size_limits(settings=None, platform: str = sys.platform) -> tuple[int, int]:
+    """Returns the (min, max) piece size from PIECE_SIZE_MIN/PIECE_SIZE_MAX in settings.ini.
+
+    Unset or invalid values fall back to the platform defaults.
+    """
+    limits = [DEFAULT_PIECE_SIZE_MIN, WINDOWS_PIECE_SIZE_MAX if platform == 'win32' else DEFAULT_PIECE_SIZE_MAX]
+    for index, key in enumerate(('PIECE_SIZE_MIN', 'PIECE_SIZE_MAX')):
+        raw = settings.get(key, '') if settings is not None else ''
+        if not raw:
+            continue
+        size = parse_size(raw)
+        if _is_valid_piece_size(size):
+            limits[index] = size
+        else:
+            logging.warning(f"Ignoring {key} = '{raw}': piece sizes must be a power of two of at least 16 KiB.")
+    if limits[0] > limits[1]:
+        logging.warning(f"PIECE_SIZE_MIN is larger than PIECE_SIZE_MAX; using {format_size(limits[1])} for both.")
+        limits[0] = limits[1]
+    return limits[0], limits[1]
+
+
+def choose_piece_size(total_size: int, file_count: int = 1,
+                      min_size: int = DEFAULT_PIECE_SIZE_MIN, max_size: int = DEFAULT_PIECE_SIZE_MAX) -> int:
+    """Picks a power-of-two piece size for *total_size* bytes spread over *file_count* files.
+
+    Follows torf's curve (a few hundred to ~2000 pieces depending on size) within the
+    limits, but never goes above the average file size so that pieces of a many-file
+    torrent, such as an album, rarely span several files.
+    """
+    if total_size <= 0:
+        return min_size
+    piece_size = torf.Torrent.calculate_piece_size(total_size, min_size=min_size, max_size=max_size)
+    average_file_size = total_size // max(1, file_count)
+    while piece_size > min_size and piece_size > average_file_size:
+        piece_size //= 2
+    return piece_size
+
+
+def estimate_hash_seconds(total_size: int, workers: int = 1) -> float:
+    return total_size / (HASH_BYTES_PER_SECOND * max(1, workers))
+
+
+def format_size(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+    if size >= 1024 ** 2:
+        return f"{size / 1024 ** 2:g} MiB"
+    return f"{size / 1024:g} KiB"
+
+
+def apply_piece_size(torrent: torf.Torrent, settings=None, workers: int = 1) -> int:
+    """Sets the piece size of *torrent* (whose path must be set) according to the policy.
+
+    Logs the resulting piece count, size of the piece table and estimated hash time.
+    Returns the chosen piece size.
+    """
+    min_size, max_size = piece_size_limits(settings)
+    piece_size = choose_piece_size(torrent.size, len(torrent.files), min_size, max_size)
+    # Widen torf's own limits first so the chosen size is never rejected
+    torrent.piece_size_min = PIECE_SIZE_FLOOR
+    torrent.piece_size_max = max(max_size, piece_size)
+    torrent.piece_size = piece_size
+
+    minutes, seconds = divmod(round(estimate_hash_seconds(torrent.size, workers)), 60)
+    logging.info(
+        f"Piece size {format_size(piece_size)}: {torrent.pieces:,} pieces "
+        f"({format_size(torrent.pieces * 20)} of piece hashes), "
+        f"estimated hash time {minutes}m {seconds:02d}s with {max(1, workers)} worker(s)."
+    )
+    return piece_size
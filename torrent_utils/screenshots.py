@@ -0,0 +1,478 @@
+"""Frame grabbers used to take screenshots from video files."""
+
+from __future__ import annotations
+
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, replace
+
+import cv2
+import numpy as np
+from PIL import Image
+
+SCREENSHOT_ENGINES = ("cv2", "keyframe")
+# Packets the keyframe engine reads after seeking to find the keyframe it landed on
+KEYFRAME_PROBE_PACKETS = 8
+FFMPEG_TIMEOUT = 120
+# Every capture worker runs its own decoder, which for UHD HEVC/AV1 costs a lot of memory
+MAX_CAPTURE_WORKERS = 4
+# Frames are scored on a grayscale copy whose longest side is at most this many pixels
+SCORE_MAX_SIDE = 480
+WHITE_LEVEL, BLACK_LEVEL = 245, 16
+# A frame is rejected when this much of it is near-white or near-black (inside any bars)...
+MAX_BLANK_FRACTION = 0.90
+# ...when bars cover more than this much of it...
+MAX_LETTERBOX_FRACTION = 0.60
+# ...or when the variance of its Laplacian is below this, i.e. a fade or a flat colour
+MIN_DETAIL = 10.0
+# A rejected frame is replaced by the best of this many frames spread over the window (seconds)
+CANDIDATE_FRAMES = 3
+CANDIDATE_WINDOW = 4.0
+# How often a cancellable capture checks its cancel event while frames are being decoded
+CANCEL_POLL_SECONDS = 0.5
+# Written next to the screenshots: the timestamp each frame was actually taken at, by index
+TIMESTAMPS_FILE = "timestamps.json"
+
+
+class Cv2FrameGrabber:
+    """Seeks with OpenCV, which decodes forward from the previous keyframe on every seek."""
+    name = "cv2"
+
+    def __init__(self, path: str):
+        self.path = path
+        # Suppress ffmpeg/libav stderr (e.g. "Unsupported encoding type") that leaks through OpenCV
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        saved_stderr = os.dup(2)
+        os.dup2(devnull, 2)
+        os.close(devnull)
+        try:
+            self.video = cv2.VideoCapture(path)
+        finally:
+            os.dup2(saved_stderr, 2)
+            os.close(saved_stderr)
+
+    @property
+    def opened(self) -> bool:
+        return self.video.isOpened()
+
+    @property
+    def duration(self) -> float:
+        return int(self.video.get(cv2.CAP_PROP_FRAME_COUNT)) / int(self.video.get(cv2.CAP_PROP_FPS))
+
+    def grab(self, timestamp: float, snap_to_keyframe: bool = True):
+        """Returns (BGR frame or None, timestamp of the frame)."""
+        self.video.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
+        success, image = self.video.read()
+        return (image if success else None), timestamp
+
+    def close(self):
+        self.video.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class KeyframeFrameGrabber:
+    """Seeks with ffmpeg straight to a keyframe found in the container index.
+
+    With *snap_to_keyframe* the frame is taken from the keyframe at or before the target,
+    which the seek index leads to directly, so only a few packets are read and exactly
+    one frame is decoded. Without it ffmpeg seeks to the preceding keyframe and
+    decodes up to the exact timestamp, which is what comparison captures need to line
+    up with frames already taken from another file.
+    """
+    name = "keyframe"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.width = self.height = 0
+        self.start_time = 0.0
+        self._duration = 0.0
+        try:
+            probe = json.loads(_run([
+                "ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "stream=width,height:format=duration,start_time",
+                "-of", "json", path,
+            ]))
+            stream = probe["streams"][0]
+            self.width, self.height = int(stream["width"]), int(stream["height"])
+            self.start_time = float(probe["format"].get("start_time") or 0)
+            self._duration = float(probe["format"]["duration"])
+        except (OSError, subprocess.SubprocessError, ValueError, KeyError, IndexError) as e:
+            logging.error(f"ffprobe could not read {path}: {e}")
+
+    @property
+    def opened(self) -> bool:
+        return bool(self.width and self.height and self._duration)
+
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    def keyframe_packets(self, start: float, end: float) -> list[tuple[float, int]]:
+        """Returns (time relative to the start of the file, size in bytes) of every keyframe
+        between *start* and *end* seconds.
+
+        Nothing is decoded, but the whole span is still read from disk, so keep it short.
+        """
+        start = self.start_time + max(0.0, start)
+        output = _run([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-read_intervals", f"{start:.3f}%{self.start_time + end:.3f}",
+            "-show_entries", "packet=pts_time,size,flags", "-of", "csv=p=0", self.path,
+        ])
+        keyframes = []
+        for line in output.splitlines():
+            pts_time, _, rest = line.partition(",")
+            size, _, flags = rest.partition(",")
+            if "K" in flags and pts_time not in ("", "N/A"):
+                keyframes.append((float(pts_time) - self.start_time, int(size) if size.isdigit() else 0))
+        return keyframes
+
+    def keyframe_at(self, timestamp: float) -> float | None:
+        """Returns the time of the keyframe a seek to *timestamp* lands on (relative to the
+        start of the file), reading only the first few packets after it."""
+        start = self.start_time + max(0.0, timestamp)
+        output = _run([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-read_intervals", f"{start:.3f}%+#{KEYFRAME_PROBE_PACKETS}",
+            "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", self.path,
+        ])
+        for line in output.splitlines():
+            pts_time, _, flags = line.partition(",")
+            if "K" in flags and pts_time not in ("", "N/A"):
+                return float(pts_time) - self.start_time
+        return None
+
+    def chapters(self) -> list[tuple[float, float]]:
+        """Returns the (start, end) of every chapter, relative to the start of the file."""
+        try:
+            probe = json.loads(_run(["ffprobe", "-v", "error", "-show_chapters", "-of", "json", self.path]))
+            return [(float(chapter["start_time"]) - self.start_time, float(chapter["end_time"]) - self.start_time)
+                    for chapter in probe.get("chapters", [])]
+        except (OSError, subprocess.SubprocessError, ValueError, KeyError) as e:
+            logging.warning(f"ffprobe could not read chapters of {self.path}: {e}")
+            return []
+
+    def grab(self, timestamp: float, snap_to_keyframe: bool = True):
+        """Returns (BGR frame or None, timestamp of the frame)."""
+        try:
+            seek = []
+            if snap_to_keyframe:
+                keyframe = self.keyframe_at(timestamp)
+                timestamp = timestamp if keyframe is None else keyframe
+                # Start decoding at the keyframe the index leads to instead of the exact time
+                seek = ["-noaccurate_seek"]
+            raw = _run([
+                "ffmpeg", "-v", "error", "-nostdin", *seek, "-ss", f"{timestamp:.6f}", "-i", self.path,
+                "-map", "0:v:0", "-frames:v", "1", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1",
+            ], text=False)
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.warning(f"ffmpeg could not extract a frame at {timestamp:.2f}s: {e}")
+            return None, timestamp
+        frame_size = self.width * self.height * 3
+        if len(raw) < frame_size:
+            return None, timestamp
+        return np.frombuffer(raw[:frame_size], dtype=np.uint8).reshape(self.height, self.width, 3), timestamp
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def _run(command: list[str], text: bool = True):
+    return subprocess.run(command, capture_output=True, check=True, text=text, timeout=FFMPEG_TIMEOUT).stdout
+
+
+def open_frame_grabber(path: str, engine: str = "cv2"):
+    """Returns a frame grabber for *path* using *engine* (one of SCREENSHOT_ENGINES)."""
+    if engine == "keyframe":
+        return KeyframeFrameGrabber(path)
+    if engine == "cv2":
+        return Cv2FrameGrabber(path)
+    raise ValueError(f"Unknown screenshot engine: {engine}")
+
+
+@dataclass
+class FrameQuality:
+    """Measurements of a frame from :func:`score_frame`. ``reason`` is None for a usable frame."""
+    white: float = 0.0
+    black: float = 0.0
+    letterbox: float = 0.0
+    detail: float = 0.0
+    reason: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.reason is None
+
+
+def _bar_extent(means: np.ndarray) -> int:
+    """Returns how many leading entries of *means* are near-black."""
+    dark = means <= BLACK_LEVEL
+    return len(dark) if dark.all() else int(np.argmin(dark))
+
+
+def score_frame(image) -> FrameQuality:
+    """Scores a BGR or grayscale frame on a decimated grayscale view of it.
+
+    Black bars are measured from the edges inwards, so the blank and detail checks only
+    look at the picture itself.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    scale = SCORE_MAX_SIDE / max(gray.shape)
+    if scale < 1:
+        gray = cv2.resize(gray, (max(1, int(gray.shape[1] * scale)), max(1, int(gray.shape[0] * scale))),
+                          interpolation=cv2.INTER_AREA)
+    quality = FrameQuality()
+
+    row_means = gray.mean(axis=1)
+    top, bottom = _bar_extent(row_means), _bar_extent(row_means[::-1])
+    # Pillarbox bars are measured between the letterbox bars only
+    picture = gray[top:len(row_means) - bottom]
+    col_means = picture.mean(axis=0) if picture.size else row_means[:0]
+    left, right = _bar_extent(col_means), _bar_extent(col_means[::-1])
+    picture = picture[:, left:len(col_means) - right]
+    if picture.size == 0:
+        quality.black, quality.letterbox = 1.0, 1.0
+        quality.reason = "black frame"
+        return quality
+
+    quality.letterbox = 1 - picture.size / gray.size
+    quality.white = float((picture >= WHITE_LEVEL).mean())
+    quality.black = float((picture <= BLACK_LEVEL).mean())
+    quality.detail = float(cv2.Laplacian(picture, cv2.CV_64F).var())
+    # Credits on black crop down to the text, so black is checked over the whole frame too
+    if (gray <= BLACK_LEVEL).mean() >= MAX_BLANK_FRACTION:
+        quality.reason = "black frame"
+    elif quality.white >= MAX_BLANK_FRACTION:
+        quality.reason = "white frame"
+    elif quality.black >= MAX_BLANK_FRACTION:
+        quality.reason = "black frame"
+    elif quality.letterbox > MAX_LETTERBOX_FRACTION:
+        quality.reason = f"{quality.letterbox:.0%} letterboxed"
+    elif quality.detail < MIN_DETAIL:
+        quality.reason = "too little detail"
+    return quality
+
+
+def score_image_file(path: str) -> FrameQuality | None:
+    """Scores a screenshot on disk; returns None if it cannot be decoded."""
+    try:
+        image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+    except cv2.error:
+        return None
+    return score_frame(image) if image is not None else None
+
+
+def candidate_timestamps(timestamp: float, count: int = CANDIDATE_FRAMES, window: float = CANDIDATE_WINDOW) -> list[float]:
+    """Returns *timestamp* followed by count - 1 alternatives alternating either side of it,
+    at most window / 2 away."""
+    half = max(1, count // 2)
+    timestamps = [timestamp]
+    for step in range(1, count):
+        distance = window / 2 * ((step + 1) // 2) / half
+        timestamps.append(max(0.0, timestamp + (distance if step % 2 else -distance)))
+    return timestamps
+
+
+def grab_best_frame(grabber, timestamp: float, snap_to_keyframe: bool = True, candidates: int = CANDIDATE_FRAMES):
+    """Grabs the frame at *timestamp* and, only if :func:`score_frame` rejects it, the
+    other candidates around it, returning the most detailed usable one (or the most
+    detailed of all if none is usable). Returns (image or None, timestamp, FrameQuality or None).
+    """
+    best = (None, timestamp, None)
+    seen = set()
+    for candidate in candidate_timestamps(timestamp, candidates):
+        image, frame_timestamp = grabber.grab(candidate, snap_to_keyframe=snap_to_keyframe)
+        # Nearby candidates can snap to the same keyframe
+        if image is None or frame_timestamp in seen:
+            continue
+        seen.add(frame_timestamp)
+        quality = score_frame(image)
+        if best[2] is None or (quality.ok, quality.detail) > (best[2].ok, best[2].detail):
+            best = (image, frame_timestamp, quality)
+        if quality.ok and candidate == timestamp:
+            break
+    return best
+
+
+@dataclass(frozen=True)
+class PngOptions:
+    """How screenshots are written. *optimize* makes Pillow search for the smallest encoding,
+    by far the slowest part of taking a screenshot."""
+    compress_level: int = 9
+    optimize: bool = True
+    max_width: int = 1920
+
+
+# For image hosts that recompress uploads anyway, where a smaller PNG buys nothing
+FAST_PNG = PngOptions(compress_level=1, optimize=False)
+
+
+def png_options(settings=None, fast: bool = False) -> PngOptions:
+    """Returns the PngOptions from SCREENSHOT_PNG_LEVEL/SCREENSHOT_PNG_OPTIMIZE in settings.ini,
+    or FAST_PNG if *fast*."""
+    if fast:
+        return FAST_PNG
+    options = PngOptions()
+    raw_level = settings.get('SCREENSHOT_PNG_LEVEL', '') if settings is not None else ''
+    raw_optimize = settings.get('SCREENSHOT_PNG_OPTIMIZE', '') if settings is not None else ''
+    if raw_level:
+        if raw_level.strip().isdigit() and 0 <= int(raw_level) <= 9:
+            options = replace(options, compress_level=int(raw_level))
+        else:
+            logging.warning(f"Ignoring SCREENSHOT_PNG_LEVEL = '{raw_level}': expected a number from 0 to 9.")
+    if raw_optimize:
+        options = replace(options, optimize=raw_optimize.strip().lower() in ('1', 'true', 'yes', 'on'))
+    return options
+
+
+def save_screenshot(image, output_path: str, options: PngOptions = PngOptions()):
+    """Writes a decoded BGR frame to *output_path* as a PNG no wider than options.max_width."""
+    try:
+        img = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if img.width > options.max_width:
+            ratio = options.max_width / img.width
+            new_height = int(img.height * ratio)
+            img = img.resize((options.max_width, new_height), Image.Resampling.LANCZOS)
+        img.save(output_path, 'PNG', compress_level=options.compress_level, optimize=options.optimize)
+    except Exception as e:
+        logging.error(f"Failed to optimize screenshot {output_path}: {e}")
+        cv2.imwrite(output_path, image)
+
+
+def capture_frame(path: str, engine: str, timestamp: float, output_path: str, snap_to_keyframe: bool = True,
+                  options: PngOptions = PngOptions(), candidates: int = 1):
+    """Captures one frame of *path* into *output_path* with a decoder of its own.
+
+    With more than one *candidate*, a blank, letterboxed or featureless frame is replaced
+    by the best frame near *timestamp* (see :func:`grab_best_frame`). Runs in worker
+    processes. Returns (timestamp of the captured frame, seconds taken, reason the frame
+    was still rejected or None), or None if no frame could be read.
+    """
+    started_at = time.monotonic()
+    reason = None
+    with open_frame_grabber(path, engine) as grabber:
+        if not grabber.opened:
+            return None
+        if candidates > 1:
+            image, timestamp, quality = grab_best_frame(grabber, timestamp, snap_to_keyframe, candidates)
+            reason = quality.reason if quality else None
+        else:
+            image, timestamp = grabber.grab(timestamp, snap_to_keyframe=snap_to_keyframe)
+    if image is None:
+        return None
+    save_screenshot(image, output_path, options)
+    return timestamp, time.monotonic() - started_at, reason
+
+
+def capture_screenshots(path: str, timestamps: list[float], screenshots_dir: str, prefix: str, engine: str = "cv2",
+                        skip_indices=None, snap_to_keyframe: bool = True, companion: tuple[str, str] | None = None,
+                        workers: int | None = None, options: PngOptions = PngOptions(),
+                        candidates: int = CANDIDATE_FRAMES, paths: list[str] | None = None, cancel=None):
+    """Captures {prefix}XX.png for every timestamp across a pool of processes.
+
+    *paths*, if given, names the file of each timestamp instead of *path*, for shots
+    spread over the episodes of a pack.
+
+    Frames of *path* that look unusable are swapped for the best of *candidates* frames
+    around their timestamp, so pass 1 when the timestamps have to be kept exactly.
+
+    *companion* is an optional (path, prefix) of a second file, typically the source of an
+    encode, captured at exactly the timestamps the frames of *path* ended up at. Each
+    companion frame is queued as soon as its counterpart is done, so both files are
+    decoded at the same time. Returns (frames captured or skipped, captured timestamps,
+    companion frames captured). Setting the *cancel* event stops queuing and waiting for frames.
+    """
+    skip_indices = set(skip_indices or ())
+    captured = list(timestamps)
+    counts = {prefix: len([i for i in range(len(timestamps)) if i in skip_indices])}
+    if companion:
+        counts[companion[1]] = 0
+    tasks = (len(timestamps) - counts[prefix]) * (2 if companion else 1)
+    workers = workers or min(MAX_CAPTURE_WORKERS, os.cpu_count() or 1, max(1, tasks))
+
+    def submit(executor, file_path, file_prefix, index, timestamp, snap):
+        output_path = os.path.join(screenshots_dir, f"{file_prefix}{index:02d}.png")
+        frames = candidates if file_prefix == prefix else 1
+        future = executor.submit(capture_frame, file_path, engine, timestamp, output_path, snap, options, frames)
+        pending[future] = (file_prefix, index, timestamp)
+
+    pending = {}
+    # Spawned workers do not inherit locks held by this process's other threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        for index, timestamp in enumerate(timestamps):
+            if index in skip_indices:
+                if companion:
+                    submit(executor, companion[0], companion[1], index, timestamp, False)
+                continue
+            submit(executor, paths[index] if paths else path, prefix, index, timestamp, snap_to_keyframe)
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=CANCEL_POLL_SECONDS if cancel else None, return_when=FIRST_COMPLETED)
+                if cancel is not None and cancel.is_set():
+                    logging.info("Screenshot capture cancelled.")
+                    for future in pending:
+                        future.cancel()
+                    break
+                for future in done:
+                    file_prefix, index, timestamp = pending.pop(future)
+                    result = future.result()
+                    if result is None:
+                        logging.warning(f"Failed to capture {file_prefix}{index:02d} at timestamp {timestamp:.2f}s")
+                        continue
+                    frame_timestamp, seconds, reason = result
+                    counts[file_prefix] += 1
+                    logging.info(f"Captured {file_prefix}{index:02d} at {frame_timestamp:.2f}s "
+                                 f"in {seconds:.2f}s ({engine}).")
+                    if reason:
+                        logging.warning(f"{file_prefix}{index:02d} is the best frame near {timestamp:.2f}s "
+                                        f"but still looks poor ({reason}).")
+                    if file_prefix == prefix:
+                        captured[index] = frame_timestamp
+                        if companion:
+                            submit(executor, companion[0], companion[1], index, frame_timestamp, False)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    return counts[prefix], captured, counts[companion[1]] if companion else 0
+
+
+def save_capture_timestamps(screenshots_dir: str, timestamps: list[float | None]):
+    """Records the timestamp each screenshot was taken at (None where unknown) in TIMESTAMPS_FILE."""
+    try:
+        with open(os.path.join(screenshots_dir, TIMESTAMPS_FILE), "w", encoding="utf-8") as f:
+            json.dump(timestamps, f)
+    except OSError as e:
+        logging.warning(f"Could not save screenshot timestamps: {e}")
+
+
+def load_capture_timestamps(screenshots_dir: str) -> list[float | None]:
+    """The timestamps saved by :func:`save_capture_timestamps`, or [] if there are none."""
+    try:
+        with open(os.path.join(screenshots_dir, TIMESTAMPS_FILE), encoding="utf-8") as f:
+            timestamps = json.load(f)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable screenshot timestamps: {e}")
+        return []
+    if not isinstance(timestamps, list):
+        return []
+    return [float(t) if isinstance(t, (int, float)) else None for t in timestamps]
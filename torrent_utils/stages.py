@@ -0,0 +1,174 @@
+"""A small dependency-aware scheduler for running the independent steps of a run concurrently."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+class StageFailed(Exception):
+    """Raised by a stage to stop the run after logging why; dependent stages are skipped."""
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[[], Any]
+    deps: tuple[str, ...] = ()
+    pool: str | None = None
+    started_at: float | None = None
+    finished_at: float | None = None
+    status: str = "pending"
+    resumed: bool = False
+    result: Any = None
+    error: BaseException | None = field(default=None, repr=False)
+
+    @property
+    def duration(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class StageScheduler:
+    """Runs stages in threads as soon as every stage they depend on has succeeded.
+
+    *limits* maps a pool name to a semaphore bounding how many stages tagged with that
+    pool may run at once; the semaphores can be shared between schedulers.
+
+    If a stage raises (or the run is interrupted), :attr:`cancel` is set, stages not yet
+    started are skipped and the error is re-raised from :meth:`run` straight away. Stages
+    still running are left to notice :attr:`cancel` and stop on their own; long stages
+    such as hashing should check it regularly.
+
+    An optional *store* persists progress: ``store.completed()`` returns a dict of stage
+    name to result for stages finished in an earlier attempt, which are not run again,
+    and ``store.record(stage)`` is called whenever a stage succeeds or fails.
+    """
+
+    def __init__(self, max_workers: int | None = None, limits: dict[str, threading.Semaphore] | None = None,
+                 store=None, cancel: threading.Event | None = None):
+        self.max_workers = max_workers
+        self.limits = limits or {}
+        self.store = store
+        self.cancel = cancel or threading.Event()
+        self.stages: dict[str, Stage] = {}
+
+    def add(self, name: str, func: Callable[[], Any], deps=(), pool: str | None = None) -> Stage:
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' already added")
+        stage = Stage(name=name, func=func, deps=tuple(deps), pool=pool)
+        self.stages[name] = stage
+        return stage
+
+    def _validate(self):
+        for stage in self.stages.values():
+            missing = [dep for dep in stage.deps if dep not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+        # Kahn's algorithm to reject cycles before starting anything
+        remaining = {name: set(stage.deps) for name, stage in self.stages.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Stage dependency cycle between: {', '.join(sorted(remaining))}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _run_stage(self, stage: Stage):
+        semaphore = self.limits.get(stage.pool) if stage.pool else None
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            stage.started_at = time.monotonic()
+            if self.cancel.is_set():
+                # Waited for its pool while the run was being cancelled
+                return None
+            logging.debug(f"Stage '{stage.name}' started")
+            return stage.func()
+        finally:
+            stage.finished_at = time.monotonic()
+            if semaphore is not None:
+                semaphore.release()
+
+    def run(self) -> dict[str, Any]:
+        """Runs every stage and returns a dict of stage name to return value."""
+        self._validate()
+        if self.store is not None:
+            for name, result in self.store.completed().items():
+                stage = self.stages.get(name)
+                if stage is not None:
+                    stage.status, stage.result, stage.resumed = "done", result, True
+                    logging.info(f"Stage '{name}' already completed in an earlier attempt. Skipping.")
+        started_at = time.monotonic()
+        first_error = None
+        max_workers = self.max_workers or max(1, len(self.stages))
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+        running = {}
+        try:
+            while first_error is None:
+                for stage in self.stages.values():
+                    if stage.status != "pending":
+                        continue
+                    dep_statuses = {self.stages[dep].status for dep in stage.deps}
+                    if dep_statuses & {"failed", "skipped"}:
+                        stage.status = "skipped"
+                        logging.info(f"Skipping stage '{stage.name}' because a stage it depends on did not complete.")
+                    elif dep_statuses <= {"done"}:
+                        stage.status = "running"
+                        running[executor.submit(self._run_stage, stage)] = stage
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        stage.result = future.result()
+                        stage.status = "done"
+                    except BaseException as e:
+                        stage.status = "failed"
+                        stage.error = e
+                        if first_error is None:
+                            first_error = e
+                    if self.store is not None:
+                        self.store.record(stage)
+        except BaseException as e:
+            # KeyboardInterrupt (or anything else) while waiting in the main thread
+            first_error = e
+        finally:
+            if first_error is not None:
+                self.cancel.set()
+                if running:
+                    logging.info(f"Cancelling running stage(s): {', '.join(s.name for s in running.values())}")
+                for stage in running.values():
+                    stage.status = "cancelled"
+            # Stages that are still running stop once they see the cancel event
+            executor.shutdown(wait=first_error is None, cancel_futures=True)
+
+        for stage in self.stages.values():
+            if stage.status == "pending":
+                stage.status = "skipped"
+        self.log_timings(time.monotonic() - started_at)
+        if first_error is not None:
+            raise first_error
+        return {name: stage.result for name, stage in self.stages.items()}
+
+    def log_timings(self, wall_seconds: float):
+        parts = []
+        for stage in self.stages.values():
+            if stage.resumed:
+                parts.append(f"{stage.name} resumed")
+            elif stage.status in ("done", "failed"):
+                parts.append(f"{stage.name} {stage.duration:.1f}s")
+            else:
+                parts.append(f"{stage.name} {stage.status}")
+        total = sum(stage.duration for stage in self.stages.values())
+        logging.info(f"Stage timings: {', '.join(parts)}")
+        logging.info(f"Stages took {wall_seconds:.1f}s wall-clock ({total:.1f}s if run one after another)")
@@ -0,0 +1,99 @@
+"""Where screenshots are taken: timestamp strategies and spreading shots over a season pack."""
+
+from __future__ import annotations
+
+import logging
+import os
+from dataclasses import dataclass
+
+from .screenshots import KeyframeFrameGrabber, open_frame_grabber
+
+TIMESTAMP_STRATEGIES = ("uniform", "scenes", "chapters")
+DEFAULT_SCREENSHOT_COUNT = 8
+# Every shot decodes up to CANDIDATE_FRAMES frames, so the count is what bounds the runtime
+MAX_SCREENSHOT_COUNT = 20
+UNIFORM_END = 0.8
+# Seconds of packet headers the scenes strategy reads around each uniform timestamp
+SCENE_SEARCH_WINDOW = 30.0
+# Chapters shorter than this (studio logos, recaps, previews) are not sampled
+MIN_CHAPTER_SECONDS = 60.0
+
+
+@dataclass(frozen=True)
+class Shot:
+    path: str
+    timestamp: float
+
+
+def uniform_timestamps(duration: float, count: int = DEFAULT_SCREENSHOT_COUNT) -> list[float]:
+    """Spreads *count* timestamps evenly up to 80% of the file, clear of the end credits."""
+    return [i * duration * UNIFORM_END / count for i in range(1, count + 1)]
+
+
+def scene_timestamps(grabber: KeyframeFrameGrabber, count: int = DEFAULT_SCREENSHOT_COUNT,
+                     window: float = SCENE_SEARCH_WINDOW) -> list[float]:
+    """Moves each uniform timestamp to the largest keyframe near it.
+
+    Encoders put keyframes on scene cuts, and a large one is a detailed opening frame
+    of a new shot rather than a fade or a static title card. Nothing is decoded and only
+    *window* seconds around each timestamp are read, so the cost does not depend on the
+    length of the file.
+    """
+    timestamps = []
+    for timestamp in uniform_timestamps(grabber.duration, count):
+        keyframes = grabber.keyframe_packets(timestamp - window / 2, timestamp + window / 2)
+        if keyframes:
+            timestamp = max(keyframes, key=lambda keyframe: keyframe[1])[0]
+        timestamps.append(timestamp)
+    return timestamps
+
+
+def chapter_timestamps(grabber: KeyframeFrameGrabber, count: int = DEFAULT_SCREENSHOT_COUNT) -> list[float]:
+    """Takes the middle of evenly picked chapters, topped up with uniform timestamps when
+    the file has fewer usable chapters than *count*."""
+    middles = [(start + end) / 2 for start, end in grabber.chapters() if end - start >= MIN_CHAPTER_SECONDS]
+    if len(middles) >= count:
+        return [middles[i * len(middles) // count] for i in range(count)]
+    if not middles:
+        logging.info(f"No chapters in {os.path.basename(grabber.path)}, using uniform timestamps.")
+    extra = [timestamp for timestamp in uniform_timestamps(grabber.duration, count)
+             if all(abs(timestamp - middle) > MIN_CHAPTER_SECONDS for middle in middles)]
+    return sorted(middles + extra[:count - len(middles)])
+
+
+def pick_timestamps(path: str, duration: float, count: int = DEFAULT_SCREENSHOT_COUNT,
+                    strategy: str = "uniform") -> list[float]:
+    """Returns *count* timestamps in *path* chosen by *strategy* (one of TIMESTAMP_STRATEGIES)."""
+    if strategy == "uniform":
+        return uniform_timestamps(duration, count)
+    if strategy not in TIMESTAMP_STRATEGIES:
+        raise ValueError(f"Unknown timestamp strategy: {strategy}")
+    grabber = KeyframeFrameGrabber(path)
+    if not grabber.opened:
+        return uniform_timestamps(duration, count)
+    if strategy == "scenes":
+        return scene_timestamps(grabber, count)
+    return chapter_timestamps(grabber, count)
+
+
+def spread_over_files(files: list[str], count: int) -> list[tuple[str, int]]:
+    """Shares *count* shots between up to *count* evenly picked *files* (e.g. the episodes
+    of a season pack, in order). Returns (file, shots) pairs; earlier files get the remainder."""
+    picked = min(count, len(files))
+    chosen = [files[i * len(files) // picked] for i in range(picked)]
+    share, remainder = divmod(count, len(chosen))
+    return [(path, share + (1 if i < remainder else 0)) for i, path in enumerate(chosen)]
+
+
+def plan_screenshots(files: list[str], count: int = DEFAULT_SCREENSHOT_COUNT, strategy: str = "uniform",
+                     engine: str = "cv2") -> list[Shot] | None:
+    """Returns the *count* shots to take from *files*, or None if one of them cannot be opened."""
+    shots = []
+    for path, shots_in_file in spread_over_files(files, count):
+        with open_frame_grabber(path, engine) as grabber:
+            if not grabber.opened:
+                logging.error(f"Could not open video file: {path}")
+                return None
+            duration = grabber.duration
+        shots.extend(Shot(path, timestamp) for timestamp in pick_timestamps(path, duration, shots_in_file, strategy))
+    return shots
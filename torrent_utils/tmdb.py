@@ -0,0 +1,160 @@
+"""TMDB API client: one pooled session, cached responses and a shared request rate limit."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from .http_pool import session_for
+
+TMDB_API_URL = "https://api.themoviedb.org/3"
+TMDB_CACHE_FILE = os.path.join("runs", "tmdb_cache.sqlite3")
+TMDB_TIMEOUT = 15
+# Search results can change as entries are added; details barely do
+SEARCH_TTL = 24 * 3600
+DETAILS_TTL = 7 * 24 * 3600
+# Sub-resources fetched together with the details in one request
+DETAILS_APPEND = ("external_ids",)
+# TMDB allows roughly 50 requests per second per IP; stay well below it
+REQUESTS_PER_SECOND = 20.0
+BURST = 20
+
+
+class RateLimiter:
+    """Token bucket: up to *burst* requests at once, refilled at *rate* per second."""
+
+    def __init__(self, rate: float = REQUESTS_PER_SECOND, burst: int = BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class TMDBCache:
+    """SQLite store of TMDB responses by request, each with the time it was fetched."""
+
+    def __init__(self, db_path: str = TMDB_CACHE_FILE):
+        self.db_path = db_path
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " request TEXT PRIMARY KEY,"
+            " body TEXT NOT NULL,"
+            " fetched_at REAL NOT NULL)"
+        )
+        return conn
+
+    def get(self, request: str, ttl: float) -> dict | None:
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT body FROM responses WHERE request = ? AND fetched_at >= ?", (request, time.time() - ttl)
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"TMDB cache lookup failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def put(self, request: str, body: dict):
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (request, body, fetched_at) VALUES (?, ?, ?)",
+                    (request, json.dumps(body), time.time()),
+                )
+                conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - max(SEARCH_TTL, DETAILS_TTL),))
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not store TMDB response in cache: {e}")
+
+
+_rate_limiter = RateLimiter()
+_cache: TMDBCache | None = None
+
+
+class TMDBClient:
+    """The TMDB endpoints used for naming and uploads.
+
+    Responses are kept for the rest of the run and, once :func:`enable_tmdb_cache` was
+    called, on disk for SEARCH_TTL / DETAILS_TTL. Details come with DETAILS_APPEND in the
+    same request, so external IDs never cost a second one. Every request waits for the
+    process-wide rate limiter; 429s are retried after Retry-After by the pooled session.
+    """
+
+    def __init__(self, api_key: str, limiter: RateLimiter | None = None):
+        self.api_key = api_key
+        self.limiter = limiter or _rate_limiter
+        self._responses: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, params: dict | None = None, ttl: float = DETAILS_TTL) -> dict:
+        """GETs /3/*path* and returns the JSON body; raises requests.RequestException on failure."""
+        params = dict(params or {})
+        request = path + "?" + "&".join(f"{key}={params[key]}" for key in sorted(params))
+        with self._lock:
+            body = self._responses.get(request)
+        if body is None and _cache is not None:
+            body = _cache.get(request, ttl)
+        if body is None:
+            self.limiter.acquire()
+            url = f"{TMDB_API_URL}/{path}"
+            response = session_for(url).get(url, params={**params, 'api_key': self.api_key}, timeout=TMDB_TIMEOUT)
+            response.raise_for_status()
+            body = response.json()
+            if _cache is not None:
+                _cache.put(request, body)
+        with self._lock:
+            self._responses[request] = body
+        return body
+
+    def search(self, kind: str, query: str) -> list[dict]:
+        """Search results for *query*; *kind* is 'movie' or 'tv'."""
+        return self.get(f"search/{kind}", {'query': query}, ttl=SEARCH_TTL).get("results", [])
+
+    def details(self, kind: str, tmdb_id) -> dict:
+        return self.get(f"{kind}/{tmdb_id}", {'append_to_response': ",".join(DETAILS_APPEND)})
+
+    def external_ids(self, kind: str, tmdb_id) -> dict:
+        return self.details(kind, tmdb_id).get("external_ids") or {}
+
+
+_clients: dict[str, TMDBClient] = {}
+_clients_lock = threading.Lock()
+
+
+def tmdb_client(api_key: str) -> TMDBClient:
+    """Returns the shared client for *api_key*."""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = TMDBClient(api_key)
+        return client
+
+
+def enable_tmdb_cache(db_path: str = TMDB_CACHE_FILE) -> TMDBCache:
+    """Keeps TMDB responses on disk across runs, for every client in this process."""
+    global _cache
+    _cache = TMDBCache(db_path)
+    return _cache
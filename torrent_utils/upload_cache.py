@@ -0,0 +1,165 @@
+"""Persistent cache of image host URLs, keyed by the SHA-256 of the uploaded bytes."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+import requests
+
+from .http_pool import session_for
+
+UPLOAD_CACHE_FILE = os.path.join("runs", "uploads.sqlite3")
+HOST_STATS_FILE = os.path.join("runs", "host_stats.sqlite3")
+# Cached URLs older than this are checked with a HEAD request before being reused
+VERIFY_AFTER = 7 * 24 * 3600
+VERIFY_TIMEOUT = 10
+
+
+def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def url_is_live(url: str) -> bool:
+    try:
+        response = session_for(url).head(url, timeout=VERIFY_TIMEOUT, allow_redirects=True)
+    except requests.RequestException:
+        return False
+    return response.status_code < 400
+
+
+class UploadCache:
+    """SQLite table of (image SHA-256, host) -> URL.
+
+    The same screenshot uploaded again, from a --force re-run or from another run
+    folder, is answered from here instead of the image host. If the database cannot be
+    used, the error is logged once and uploads carry on without the cache.
+    """
+
+    def __init__(self, db_path: str = UPLOAD_CACHE_FILE, verify_after: float = VERIFY_AFTER, verify=url_is_live):
+        self.db_path = db_path
+        self.verify_after = verify_after
+        self.verify = verify
+        self.enabled = True
+        self._lock = threading.Lock()
+
+    def _disable(self, error: Exception):
+        if self.enabled:
+            logging.warning(f"Upload cache unavailable, continuing without it: {error}")
+        self.enabled = False
+
+    @contextmanager
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS uploads ("
+                " sha256 TEXT NOT NULL,"
+                " host TEXT NOT NULL,"
+                " url TEXT NOT NULL,"
+                " verified_at REAL NOT NULL,"
+                " PRIMARY KEY (sha256, host))"
+            )
+            yield conn
+
+    def lookup(self, digest: str, host: str) -> str | None:
+        """Returns the cached URL, re-checking it first if it was last verified too long ago."""
+        if not self.enabled:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT url, verified_at FROM uploads WHERE sha256 = ? AND host = ?", (digest, host)
+                ).fetchone()
+        except (OSError, sqlite3.Error) as e:
+            self._disable(e)
+            return None
+        if row is None:
+            return None
+        url, verified_at = row
+        if time.time() - verified_at <= self.verify_after:
+            return url
+        if self.verify(url):
+            self.store(digest, host, url)
+            return url
+        logging.info(f"Cached {host} upload {url} is gone; uploading again.")
+        self.forget(digest, host)
+        return None
+
+    def store(self, digest: str, host: str, url: str):
+        if not self.enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO uploads (sha256, host, url, verified_at) VALUES (?, ?, ?, ?)",
+                    (digest, host, url, time.time()),
+                )
+        except (OSError, sqlite3.Error) as e:
+            self._disable(e)
+
+    def forget(self, digest: str, host: str):
+        if not self.enabled:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM uploads WHERE sha256 = ? AND host = ?", (digest, host))
+        except (OSError, sqlite3.Error) as e:
+            self._disable(e)
+
+
+class HostStatsStore:
+    """SQLite table of the host averages kept by :class:`~torrent_utils.image_upload.HostStats`.
+
+    A database of its own, so that a locked or broken upload cache does not take the
+    host ordering with it, and the other way round.
+    """
+
+    def __init__(self, db_path: str = HOST_STATS_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, closing(sqlite3.connect(self.db_path, timeout=30)) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS host_stats ("
+                " host TEXT PRIMARY KEY,"
+                " latency REAL NOT NULL,"
+                " success_rate REAL NOT NULL,"
+                " samples INTEGER NOT NULL)"
+            )
+            yield conn
+
+    def load(self) -> list[tuple[str, float, float, int]]:
+        """Returns (host, latency, success rate, samples) for every host, or [] if unreadable."""
+        try:
+            with self._connect() as conn:
+                return conn.execute("SELECT host, latency, success_rate, samples FROM host_stats").fetchall()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not load image host stats: {e}")
+            return []
+
+    def save(self, host: str, latency: float, success_rate: float, samples: int):
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO host_stats (host, latency, success_rate, samples) VALUES (?, ?, ?, ?)",
+                    (host, latency, success_rate, samples),
+                )
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f"Could not save image host stats: {e}")
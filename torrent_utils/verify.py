@@ -0,0 +1,142 @@
+"""Checking an existing .torrent against the content on disk."""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+from dataclasses import dataclass, field
+
+import torf
+
+from .hashing import FileEntry, hash_pieces
+
+
+@dataclass
+class VerifyResult:
+    """Outcome of :func:`verify_torrent`. ``ok`` is True when every checked piece matched."""
+    pieces_checked: int = 0
+    pieces_total: int = 0
+    piece: int | None = None
+    files: list[str] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def describe(self) -> str:
+        if self.ok:
+            return f"{self.pieces_checked}/{self.pieces_total} pieces verified OK"
+        return self.error
+
+
+def resolve_content_path(torrent: torf.Torrent, path: str) -> str:
+    """Returns where the content of *torrent* lives, given either the content itself or
+    the folder it was downloaded into (e.g. a client's save path or SEEDING_DIR)."""
+    candidate = os.path.join(path, torrent.name)
+    if os.path.isdir(path) and os.path.basename(os.path.normpath(path)) != torrent.name and os.path.exists(candidate):
+        return candidate
+    return path
+
+
+def content_layout(torrent: torf.Torrent, content_path: str) -> list[FileEntry]:
+    """Returns the files *torrent* expects under *content_path*, in hashing order."""
+    if torrent.mode == 'singlefile':
+        return [FileEntry(content_path, torrent.size)]
+    # The first path segment is the torrent name, which may differ from the folder on disk
+    return [FileEntry(os.path.join(content_path, *file.parts[1:]), file.size) for file in torrent.files]
+
+
+def _piece_files(layout: list[FileEntry], piece_size: int, index: int) -> list[str]:
+    """Returns the paths of every file piece *index* covers."""
+    start, end = index * piece_size, (index + 1) * piece_size
+    files = []
+    position = 0
+    for entry in layout:
+        if entry.length and position < end and start < position + entry.length:
+            files.append(entry.path)
+        position += entry.length
+    return files
+
+
+def sample_pieces(layout: list[FileEntry], piece_size: int, samples: int, rng=None) -> set[int]:
+    """Picks up to *samples* random pieces overlapping each file, always including the
+    first and last piece of the file."""
+    rng = rng or random.Random()
+    chosen = set()
+    position = 0
+    for entry in layout:
+        if entry.length:
+            first = position // piece_size
+            last = (position + entry.length - 1) // piece_size
+            candidates = range(first, last + 1)
+            picks = {first, last} if samples > 1 else {rng.choice(candidates)}
+            middle = candidates[1:-1]
+            picks.update(rng.sample(middle, min(len(middle), max(0, samples - len(picks)))))
+            chosen.update(picks)
+        position += entry.length
+    return chosen
+
+
+def verify_torrent(torrent: torf.Torrent, content_path: str, workers: int = 1, samples: int | None = None,
+                   callback=None, interval: float = 0, rng=None) -> VerifyResult:
+    """Re-hashes the content at *content_path* and compares it with the pieces of *torrent*.
+
+    Missing or wrongly sized files are reported without reading anything. With *samples*
+    only that many random pieces per file are hashed, which catches a replaced or
+    re-encoded file in seconds; otherwise every piece is checked across *workers*
+    processes. Hashing stops as soon as the lowest mismatching piece is known, i.e. once
+    every piece before the first mismatch found has been checked, so the reported piece
+    does not depend on which worker finished first. *callback* has torf's signature:
+    ``callback(torrent, filepath, pieces_done, pieces_total)``.
+    """
+    layout = content_layout(torrent, content_path)
+    expected = torrent.hashes
+    result = VerifyResult(pieces_total=len(expected))
+
+    for entry in layout:
+        try:
+            size = os.path.getsize(entry.path)
+        except OSError:
+            result.error = f"Missing file: {entry.path}"
+            result.files = [entry.path]
+            return result
+        if size != entry.length:
+            result.error = f"Size mismatch for {entry.path}: {size} bytes on disk, {entry.length} in torrent"
+            result.files = [entry.path]
+            return result
+
+    if samples:
+        selected = sample_pieces(layout, torrent.piece_size, samples, rng)
+    else:
+        selected = set(range(len(expected)))
+    # Pieces that are not selected are passed as already known so they are never read
+    known = {index: digest for index, digest in enumerate(expected) if index not in selected}
+    logging.info(f"Verifying {len(selected)} of {len(expected)} pieces against {content_path}...")
+
+    def wrapped(filepath, pieces_done, pieces_total):
+        return callback(torrent, filepath, pieces_done, pieces_total)
+
+    unchecked = set(selected)
+
+    def check(start, digests):
+        for index, digest in enumerate(digests, start):
+            if index in unchecked:
+                unchecked.discard(index)
+                result.pieces_checked += 1
+                if digest != expected[index] and (result.piece is None or index < result.piece):
+                    result.piece = index
+        # Batches finish out of order; wait for the ones that could hold an earlier mismatch
+        if result.piece is not None and min(unchecked, default=result.piece) >= result.piece:
+            return True
+        return None
+
+    digests = hash_pieces(layout, torrent.piece_size, workers=workers, callback=wrapped if callback else None,
+                          interval=interval, known=known, on_batch=check)
+    if result.piece is not None:
+        result.files = _piece_files(layout, torrent.piece_size, result.piece)
+        result.error = f"Piece {result.piece} does not match (covers {', '.join(result.files)})"
+    elif digests is None:
+        result.error = "Verification cancelled"
+    return result
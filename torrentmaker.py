@@ -1,9 +1,9 @@
 import argparse
+import contextlib
 import os
 import logging
 import sys
 import requests
-import cv2
 import torf
 import qbittorrentapi
 import json
@@ -15,12 +15,11 @@ import configparser
 import guessit
 import ctypes
 import Levenshtein
-import numpy as np
 import concurrent.futures
+import threading
 import time
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from PIL import Image
 from pprint import pprint
 from pprint import pformat
 from base64 import b64encode
@@ -32,16 +31,36 @@ from torrent_utils.config_loader import load_settings, validate_settings
 from torrent_utils.HUNOInfo import bannedEncoders, encoderGroups
 from torrent_utils.helpers import (
     getInfoDump, getUserInput, has_folders, make_torrent_progress_callback, uploadToPTPIMG,
-    copy_folder_structure, qbitInject, FileOrFolder, is_valid_torf_hash,
+    copy_folder_structure, qbitInject, FileOrFolder, is_valid_torf_hash, get_path_list,
     convert_sha1_hash, ensure_mediainfo_cli, upload_to_catbox, upload_to_imgbb,
     upload_to_onlyimage, upload_to_hawkepics, play_alert, upload_to_slowpics
 )
 from torrent_utils.media import Movie, TVShow
+from torrent_utils.media_cache import enable_media_cache
+from torrent_utils.tmdb import enable_tmdb_cache, tmdb_client
+from torrent_utils.hashing import generate_torrent
+from torrent_utils.piece_cache import PieceCache
+from torrent_utils.piece_size import apply_piece_size
+from torrent_utils.screenshots import (SCREENSHOT_ENGINES, PngOptions, capture_screenshots,
+                                       load_capture_timestamps, png_options, save_capture_timestamps,
+                                       score_image_file)
+from torrent_utils.timestamps import (DEFAULT_SCREENSHOT_COUNT, MAX_SCREENSHOT_COUNT, TIMESTAMP_STRATEGIES,
+                                      plan_screenshots)
+from torrent_utils.upload_cache import HostStatsStore, UploadCache, file_digest
+from torrent_utils.http_pool import configure_http, ensure_pool_size
+from torrent_utils.image_upload import HEDGE_AFTER, MAX_HOST_CONCURRENCY, AdaptiveLimiter, HostStats, hedged_upload
+from torrent_utils.piece_reuse import previous_run_torrents, torrent_is_current
+from torrent_utils.job_queue import run_queue
+from torrent_utils.stages import StageFailed, StageScheduler
+from torrent_utils.verify import verify_torrent
 
 __VERSION = "2.1.3"
 HUNO_API_URL = "https://hawke.uno/api/torrents/upload"
 LOG_FORMAT = "%(asctime)s.%(msecs)03d %(levelname)-8s P%(process)06d.%(module)-12s %(funcName)-16sL%(lineno)04d %(message)s"
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Screenshots that failed on every host are retried this many times, starting from another host
+UPLOAD_RETRY_ROUNDS = 2
+UPLOAD_RETRY_DELAY = 5
 
 # TODO: Improve detection of AV1 WEB Encodes
 # TODO: Sound alert when screenshot uploading fails
@@ -520,7 +539,7 @@ def main():
     )
     # Arguments are unchanged
     parser.add_argument(
-        "path", action="store",
+        "path", action="store", nargs="?",
         help="Path for file or folder to create .torrent file for",
         type=str
     )
@@ -549,7 +568,30 @@ def main():
         "--hash",
         action="store",
         type=str,
-        help="Pre-made hash of the torrent file. Will skip the hashing process.",
+        help="Pre-made piece hashes of the torrent (concatenated SHA-1 hex). Will skip the hashing process.",
+        default=None
+    )
+    parser.add_argument(
+        "--hash-workers",
+        action="store",
+        type=int,
+        help="Number of processes used to hash torrent pieces. 0 uses every CPU core. "
+             "If omitted, pieces are hashed in a single process",
+        default=None
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="Re-hash the content against the torrent before uploading or injecting it, "
+             "and abort on the first mismatching piece",
+        default=False
+    )
+    parser.add_argument(
+        "--verify-samples",
+        action="store",
+        type=int,
+        metavar="N",
+        help="With --verify, only check N random pieces per file instead of the whole content",
         default=None
     )
     parser.add_argument(
@@ -650,6 +692,65 @@ def main():
         help="Path to source file/folder for encode uploads (validates release is an encode)",
         default=None
     )
+    parser.add_argument(
+        "--screenshot-engine",
+        action="store",
+        choices=SCREENSHOT_ENGINES,
+        help="How screenshots are taken: 'cv2' seeks with OpenCV, 'keyframe' uses ffprobe's keyframe "
+             "index and ffmpeg to decode only the frames needed (much faster on long HEVC/AV1 files)",
+        default="cv2"
+    )
+    parser.add_argument(
+        "--screenshots",
+        action="store",
+        type=int,
+        metavar="N",
+        help=f"Number of screenshots to take (1-{MAX_SCREENSHOT_COUNT}, default {DEFAULT_SCREENSHOT_COUNT}); "
+             "for a season pack they are spread over the episodes",
+        default=DEFAULT_SCREENSHOT_COUNT
+    )
+    parser.add_argument(
+        "--screenshot-strategy",
+        action="store",
+        choices=TIMESTAMP_STRATEGIES,
+        help="Where screenshots are taken: 'uniform' spreads them evenly, 'scenes' moves each to the largest "
+             "nearby keyframe (a scene cut), 'chapters' takes the middle of chapters; the last two need ffprobe",
+        default="uniform"
+    )
+    parser.add_argument(
+        "--fast-screenshots",
+        action="store_true",
+        help="Write screenshots with fast PNG compression instead of the optimised (smallest) encoding; "
+             "worth it when the image host recompresses uploads anyway",
+        default=False
+    )
+    parser.add_argument(
+        "--hedge-after",
+        action="store",
+        type=float,
+        nargs="?",
+        const=HEDGE_AFTER,
+        metavar="SECONDS",
+        help=f"Race image hosts: start the next host whenever an upload has had no answer for SECONDS "
+             f"(default {HEDGE_AFTER:g}); the first to succeed wins. Without it hosts are tried one after another",
+        default=None
+    )
+    parser.add_argument(
+        "--queue",
+        action="store",
+        type=str,
+        metavar="FILE",
+        help="Process every path listed in FILE (one per line), tracking progress in runs/jobs.sqlite3 "
+             "so an interrupted queue resumes without redoing finished stages",
+        default=None
+    )
+    parser.add_argument(
+        "--jobs",
+        action="store",
+        type=int,
+        help="With --queue, how many releases to process at the same time",
+        default=2
+    )
     parser.add_argument(
         "-D", "--debug", action="store_true", help="debug mode", default=False
     )
@@ -665,6 +766,8 @@ def main():
     if arg.episode and arg.movie:
         logging.error("Movie and Episode arguments can't be enabled at the same time. Please remove one.")
         sys.exit(1)
+    if not arg.path and not arg.queue:
+        parser.error("a path is required unless --queue is given")
 
     logging.basicConfig(datefmt=LOG_DATE_FORMAT, format=LOG_FORMAT, level=level)
     logging.info(f"Version {__VERSION} starting...")
@@ -681,7 +784,38 @@ def main():
         required_settings.append('SEEDING_DIR')
 
     validate_settings(settings, required_settings)
-    
+    configure_http(settings)
+    enable_media_cache()
+    enable_tmdb_cache()
+
+    if not arg.skipMICheck:
+        ensure_mediainfo_cli()
+    if arg.screenshot_engine == "keyframe" and not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        logging.error("--screenshot-engine keyframe needs ffmpeg and ffprobe in PATH.")
+        sys.exit(1)
+    if arg.screenshot_strategy != "uniform" and not shutil.which("ffprobe"):
+        logging.error(f"--screenshot-strategy {arg.screenshot_strategy} needs ffprobe in PATH.")
+        sys.exit(1)
+    if not 1 <= arg.screenshots <= MAX_SCREENSHOT_COUNT:
+        logging.error(f"--screenshots must be between 1 and {MAX_SCREENSHOT_COUNT}.")
+        sys.exit(1)
+
+    if arg.queue:
+        paths = get_path_list(None, arg.queue)
+        counts = run_queue(paths, lambda path, job: process_release(arg, settings, path, job), max_jobs=arg.jobs)
+        if counts.get("failed"):
+            sys.exit(1)
+    else:
+        process_release(arg, settings, arg.path)
+
+
+def process_release(arg, settings, path, job=None):
+    """Runs the whole pipeline for one file or folder.
+
+    *job* is the :class:`~torrent_utils.job_queue.JobContext` when running from --queue. It
+    keeps the run directory and finished stages across attempts and shares the bounded
+    hashing, screenshot and upload pools with the other jobs.
+    """
     # Assign settings to variables
     huno_api = settings.get('HUNO_API')
     huno_announce_url = settings.get('HUNO_ANNOUNCE_URL')
@@ -697,6 +831,12 @@ def main():
     slowpics_remember_me = settings.get('SLOWPICS_REMEMBER_ME')
     slowpics_session = settings.get('SLOWPICS_SESSION')
     seeding_dir = settings.get('SEEDING_DIR')
+    screenshot_png = png_options(settings, fast=arg.fast_screenshots)
+    screenshot_count = arg.screenshots
+    # Only opened when screenshots are uploaded, so other runs never touch the database
+    upload_cache = UploadCache() if arg.upload else None
+    host_stats = HostStats(HostStatsStore()) if arg.upload else None
+    upload_limiter = AdaptiveLimiter()
 
     if hawkepics_api == '': hawkepics_api = None
     if ptpimg_api == '': ptpimg_api = None
@@ -706,10 +846,6 @@ def main():
     if slowpics_session == '': slowpics_session = None
     # --- END Settings Section ---
 
-    if not arg.skipMICheck:
-        ensure_mediainfo_cli()
-
-    path = arg.path
     isFolder = FileOrFolder(path)
 
     if isFolder not in [1, 2]:
@@ -737,31 +873,38 @@ def main():
     has_torrent = has_screenshots = has_links = False
     prev_torrent_filename = None
 
-    if not arg.force:
+    resume_dir = job.run_dir if job is not None else None
+    if not arg.force and not resume_dir:
         prev_run = find_previous_run(os.path.abspath(path))
         if prev_run:
             prev_torrent_files = [f for f in os.listdir(prev_run) if f.endswith('.torrent')]
             prev_torrent_filename = prev_torrent_files[0] if prev_torrent_files else None
             has_torrent = prev_torrent_filename is not None
+            if has_torrent and not torrent_is_current(os.path.join(prev_run, prev_torrent_filename), path):
+                logging.warning("Content has changed since the previous run's torrent was made. "
+                                "It will be re-hashed, reusing pieces of unchanged files.")
+                has_torrent = False
 
             prev_ss_dir = os.path.join(prev_run, "screenshots")
-            prev_screenshot_count = 0
+            valid_prev_screenshots = []
             if os.path.isdir(prev_ss_dir):
-                for f in os.listdir(prev_ss_dir):
-                    if f.startswith('screenshot_') and f.endswith('.png'):
-                        fpath = os.path.join(prev_ss_dir, f)
-                        if is_screenshot_valid(fpath):
-                            prev_screenshot_count += 1
-                        else:
-                            logging.warning(f"Skipping invalid/blank screenshot from previous run: {f}")
+                for f in (f"screenshot_{i:02d}.png" for i in range(screenshot_count)):
+                    fpath = os.path.join(prev_ss_dir, f)
+                    if not os.path.exists(fpath):
+                        continue
+                    if is_screenshot_valid(fpath):
+                        valid_prev_screenshots.append(f)
+                    else:
+                        logging.warning(f"Skipping invalid/blank screenshot from previous run: {f}")
+            prev_screenshot_count = len(valid_prev_screenshots)
             has_screenshots = prev_screenshot_count > 0
 
             prev_desc_path = os.path.join(prev_run, "showDesc.txt")
             if os.path.exists(prev_desc_path):
                 has_links = bool(extract_screenshot_bbcodes(prev_desc_path))
 
-            ss_label = (f"{prev_screenshot_count}/8 screenshots (incomplete)"
-                        if has_screenshots and prev_screenshot_count < 8
+            ss_label = (f"{prev_screenshot_count}/{screenshot_count} screenshots (incomplete)"
+                        if has_screenshots and prev_screenshot_count < screenshot_count
                         else "screenshots")
             available = [n for n, v in [("torrent file", has_torrent),
                                          (ss_label, has_screenshots),
@@ -774,12 +917,18 @@ def main():
                     logging.info("Reusing assets from previous run.")
 
     # --- Create Run Directory ---
-    if not os.path.isdir("runs"): os.makedirs("runs/001")
-    run_dirs = [d for d in os.listdir("runs") if d.isdigit()]
-    next_run_num = max([int(d) for d in run_dirs]) + 1 if run_dirs else 1
-    runDir = os.path.join("runs", str(next_run_num).zfill(3))
-    os.makedirs(runDir)
-    logging.info(f"Created folder for output in {os.path.relpath(runDir)}")
+    if resume_dir:
+        runDir = resume_dir
+        logging.info(f"Resuming in {os.path.relpath(runDir)}")
+    else:
+        if not os.path.isdir("runs"): os.makedirs("runs/001")
+        run_dirs = [d for d in os.listdir("runs") if d.isdigit()]
+        next_run_num = max([int(d) for d in run_dirs]) + 1 if run_dirs else 1
+        runDir = os.path.join("runs", str(next_run_num).zfill(3))
+        os.makedirs(runDir)
+        logging.info(f"Created folder for output in {os.path.relpath(runDir)}")
+        if job is not None:
+            job.set_run_dir(runDir)
 
     # Write source path so future runs can detect and reuse this run
     with open(os.path.join(runDir, "source_path.txt"), 'w', encoding='utf-8') as _spf:
@@ -787,14 +936,17 @@ def main():
 
     # --- Find the primary video file ---
     videoFile = None
+    video_files = []
     if isFolder == 1:
         videoFile = path
+        video_files = [path]
     elif isFolder == 2:
         largest_file = ""
         largest_size = 0
-        for file in os.listdir(path):
+        for file in sorted(os.listdir(path)):
             if file.lower().endswith(('.mp4', '.avi', '.mkv')):
                 file_path = os.path.join(path, file)
+                video_files.append(file_path)
                 size = os.path.getsize(file_path)
                 if size > largest_size:
                     largest_size = size
@@ -977,107 +1129,127 @@ def main():
     torrentFileName = f"{base_name}.torrent"
     logging.info("Final name: " + display_torrent_name)
 
-    # --- Create mediainfo dumps ---
+    # --- Run the independent steps concurrently ---
+    # Hashing only reads the content, so it overlaps with mediainfo, screenshots, uploads
+    # and the slow.pics comparison; the HUNO upload below waits for all of them.
     _prev_mi = os.path.join(prev_run, "mediainfo.txt") if prev_run else None
-    source_mediainfo_path = None
-
-    # Extract source mediainfo first (if provided)
-    if source_file_path:
-        getInfoDump(source_file_path, runDir, filename="source_mediainfo.txt")
-        source_mediainfo_path = os.path.join(runDir, "source_mediainfo.txt")
-        logging.info(f"Source mediainfo extracted: {source_mediainfo_path}")
-
-    # Create main mediainfo dump
-    if reusing and _prev_mi and os.path.exists(_prev_mi):
-        shutil.copy2(_prev_mi, os.path.join(runDir, "mediainfo.txt"))
-        logging.info("Reusing mediainfo from previous run.")
-    else:
-        getInfoDump(videoFile, runDir)
+    source_mediainfo_path = os.path.join(runDir, "source_mediainfo.txt") if source_file_path else None
+    postName = os.path.splitext(torrentFileName)[0]
 
-    # --- Screenshot and Upload Logic ---
-    screenshot_success = False
-    encode_timestamps = []
-    bbcodes = []
-    encode_bbcodes = None
-    source_bbcodes = None
-    comparison_url = None
-    comparison_bbcodes = None
-
-    if reusing and has_screenshots:
-        prev_ss_src = os.path.join(prev_run, "screenshots")
-        screenshots_dir = os.path.join(runDir, "screenshots")
-        os.makedirs(screenshots_dir, exist_ok=True)
-        # Copy only valid screenshot_*.png files — skip leftover temp files and blank/corrupt captures
-        for f in os.listdir(prev_ss_src):
-            if f.startswith('screenshot_') and f.endswith('.png'):
-                src_path = os.path.join(prev_ss_src, f)
-                if is_screenshot_valid(src_path):
-                    shutil.copy2(src_path, os.path.join(screenshots_dir, f))
-                # Invalid files are simply not copied; they will be regenerated as missing indices
-
-        if prev_screenshot_count < 8:
-            existing_indices = {
-                int(f[len('screenshot_'):len('screenshot_') + 2])
-                for f in os.listdir(screenshots_dir)
-                if f.startswith('screenshot_') and f.endswith('.png')
-            }
-            missing = sorted(i for i in range(8) if i not in existing_indices)
-            logging.info(
-                f"Previous run had {prev_screenshot_count}/8 screenshots. "
-                f"Generating {len(missing)} missing screenshot(s) "
-                f"(indices: {', '.join(str(i) for i in missing)})."
-            )
-            screenshot_success, encode_timestamps = create_optimized_screenshots(videoFile, runDir, skip_indices=existing_indices)
+    def mediainfo_stage():
+        # Extract source mediainfo first (if provided)
+        if source_file_path:
+            getInfoDump(source_file_path, runDir, filename="source_mediainfo.txt")
+            logging.info(f"Source mediainfo extracted: {source_mediainfo_path}")
+
+        # Create main mediainfo dump
+        if reusing and _prev_mi and os.path.exists(_prev_mi):
+            shutil.copy2(_prev_mi, os.path.join(runDir, "mediainfo.txt"))
+            logging.info("Reusing mediainfo from previous run.")
+        else:
+            getInfoDump(videoFile, runDir)
+
+    # A season pack is sampled across its episodes; a comparison needs every shot from the one encode
+    screenshot_files = video_files if is_season_pack and not source_file_path else [videoFile]
+    # Set by the stage scheduler when a stage fails, so the others stop hashing, capturing and uploading
+    cancel = threading.Event()
+    screenshot_options = dict(engine=arg.screenshot_engine, source_path=source_file_path, png=screenshot_png,
+                              count=screenshot_count, strategy=arg.screenshot_strategy, files=screenshot_files,
+                              cancel=cancel)
+
+    def screenshots_stage():
+        encode_timestamps = []
+        # Source comparison frames are captured together with the encode's when possible
+        source_success = None
+        if reusing and has_screenshots:
+            prev_ss_src = os.path.join(prev_run, "screenshots")
+            screenshots_dir = os.path.join(runDir, "screenshots")
+            os.makedirs(screenshots_dir, exist_ok=True)
+            # Copy only the screenshots validated above; invalid ones are regenerated as missing indices
+            for f in valid_prev_screenshots:
+                shutil.copy2(os.path.join(prev_ss_src, f), os.path.join(screenshots_dir, f))
+            prev_timestamps = load_capture_timestamps(prev_ss_src)
+
+            if prev_screenshot_count < screenshot_count:
+                existing_indices = {int(f[len('screenshot_'):len('screenshot_') + 2]) for f in valid_prev_screenshots}
+                missing = sorted(i for i in range(screenshot_count) if i not in existing_indices)
+                logging.info(
+                    f"Previous run had {prev_screenshot_count}/{screenshot_count} screenshots. "
+                    f"Generating {len(missing)} missing screenshot(s) "
+                    f"(indices: {', '.join(str(i) for i in missing)})."
+                )
+                screenshot_success, encode_timestamps, source_success = create_optimized_screenshots(
+                    videoFile, runDir, skip_indices=existing_indices, known_timestamps=prev_timestamps,
+                    **screenshot_options)
+                if not screenshot_success:
+                    logging.error("Failed to generate missing screenshots. Aborting.")
+                    sys.exit(1)
+            else:
+                logging.info(f"Reusing all {screenshot_count} screenshots from {os.path.relpath(prev_run)}.")
+                save_capture_timestamps(screenshots_dir, prev_timestamps[:screenshot_count])
+                # Source comparison frames are taken where the reused frames actually were
+                if source_file_path:
+                    encode_timestamps = prev_timestamps[:screenshot_count]
+                    if len(encode_timestamps) < screenshot_count or None in encode_timestamps:
+                        logging.warning("The reused screenshots have no recorded timestamps; "
+                                        "source frames are taken at the planned timestamps instead.")
+                        shots = plan_screenshots([videoFile], screenshot_count, arg.screenshot_strategy,
+                                                 arg.screenshot_engine)
+                        encode_timestamps = [shot.timestamp for shot in shots or []]
+        else:
+            logging.info("Making screenshots...")
+            screenshot_success, encode_timestamps, source_success = create_optimized_screenshots(
+                videoFile, runDir, **screenshot_options)
             if not screenshot_success:
-                logging.error("Failed to generate missing screenshots. Aborting.")
+                logging.error("Failed to create screenshots. Aborting.")
                 sys.exit(1)
-        else:
-            logging.info(f"Reusing all 8 screenshots from {os.path.relpath(prev_run)}.")
-            screenshot_success = True
-            # Recompute timestamps from video file for source screenshot capture if needed
-            if source_file_path:
-                _v = cv2.VideoCapture(videoFile)
-                if _v.isOpened():
-                    _dur = int(_v.get(cv2.CAP_PROP_FRAME_COUNT)) / int(_v.get(cv2.CAP_PROP_FPS))
-                    encode_timestamps = [i * _dur / 10 for i in range(1, 9)]
-                _v.release()
-    else:
-        logging.info("Making screenshots...")
-        screenshot_success, encode_timestamps = create_optimized_screenshots(videoFile, runDir)
-        if not screenshot_success:
-            logging.error("Failed to create screenshots. Aborting.")
-            sys.exit(1)
-
-    if reusing and has_links:
-        bbcodes = extract_screenshot_bbcodes(os.path.join(prev_run, "showDesc.txt"))
-        if bbcodes:
-            with open(os.path.join(runDir, "showDesc.txt"), 'w', encoding='utf-8') as _df:
-                for bbcode in bbcodes:
-                    _df.write(f"[center]{bbcode}[/center]\n")
-            logging.info(f"Reused {len(bbcodes)} image link(s) from {os.path.relpath(prev_run)}.")
-    elif arg.upload and screenshot_success:
-        bbcodes = upload_screenshots_concurrently(
-            screenshot_dir=os.path.join(runDir, "screenshots"),
-            hawkepics_api=hawkepics_api,
-            imgbb_api=imgbb_api,
-            ptpimg_api=ptpimg_api,
-            catbox_hash=catbox_hash,
-            onlyimage_api=onlyimage_api
-        )
-        if bbcodes is None:
-            return
-        if bbcodes:
-            with open(os.path.join(runDir, "showDesc.txt"), "w", encoding='utf-8') as desc_file:
-                for bbcode in bbcodes:
-                    desc_file.write(f"[center]{bbcode}[/center]\n")
-            logging.info(f"Success: BBCode written to showDesc.txt ({len(bbcodes)} images)")
+        return encode_timestamps, source_success
+
+    def upload_stage():
+        bbcodes = []
+        if reusing and has_links:
+            bbcodes = extract_screenshot_bbcodes(os.path.join(prev_run, "showDesc.txt"))
+            if bbcodes:
+                with open(os.path.join(runDir, "showDesc.txt"), 'w', encoding='utf-8') as _df:
+                    for bbcode in bbcodes:
+                        _df.write(f"[center]{bbcode}[/center]\n")
+                logging.info(f"Reused {len(bbcodes)} image link(s) from {os.path.relpath(prev_run)}.")
+        elif arg.upload:
+            bbcodes = upload_screenshots_concurrently(
+                screenshot_dir=os.path.join(runDir, "screenshots"),
+                hawkepics_api=hawkepics_api,
+                imgbb_api=imgbb_api,
+                ptpimg_api=ptpimg_api,
+                catbox_hash=catbox_hash,
+                onlyimage_api=onlyimage_api,
+                cache=upload_cache,
+                hedge_after=arg.hedge_after,
+                stats=host_stats,
+                limiter=upload_limiter,
+                cancel=cancel
+            )
+            if bbcodes is None:
+                raise StageFailed("Screenshot upload failed")
+            uploaded = [bbcode for bbcode in bbcodes if bbcode]
+            if uploaded:
+                with open(os.path.join(runDir, "showDesc.txt"), "w", encoding='utf-8') as desc_file:
+                    for bbcode in uploaded:
+                        desc_file.write(f"[center]{bbcode}[/center]\n")
+                logging.info(f"Success: BBCode written to showDesc.txt ({len(uploaded)} images)")
+        return bbcodes
 
     # --- Comparison Screenshots (source_file_path only) ---
-    if bbcodes:
-        encode_bbcodes = bbcodes
-
-    if source_file_path and screenshot_success and encode_timestamps:
-        source_ok = capture_source_screenshots(source_file_path, encode_timestamps, runDir)
+    def comparison_stage():
+        encode_timestamps, source_ok = stages.stages["screenshots"].result
+        encode_bbcodes = stages.stages["upload"].result or None
+        comparison_url = None
+        comparison_bbcodes = None
+        if not (source_file_path and encode_timestamps):
+            return comparison_url, comparison_bbcodes
+
+        if source_ok is None:
+            source_ok = capture_source_screenshots(source_file_path, encode_timestamps, runDir,
+                                                   engine=arg.screenshot_engine, png=screenshot_png, cancel=cancel)
         if source_ok and arg.upload:
             source_bbcodes = upload_screenshots_concurrently(
                 screenshot_dir=os.path.join(runDir, "screenshots"),
@@ -1086,23 +1258,36 @@ def main():
                 ptpimg_api=ptpimg_api,
                 catbox_hash=catbox_hash,
                 onlyimage_api=onlyimage_api,
-                file_pattern="source_"
+                file_pattern="source_",
+                cache=upload_cache,
+                hedge_after=arg.hedge_after,
+                stats=host_stats,
+                limiter=upload_limiter,
+                cancel=cancel
             )
-            if source_bbcodes and encode_bbcodes:
-                # Interleave: src_00, enc_00, src_01, enc_01...
-                comparison_bbcodes = [val for pair in zip(source_bbcodes, encode_bbcodes) for val in pair]
+            if source_bbcodes and encode_bbcodes and len(source_bbcodes) != len(encode_bbcodes):
+                # Links reused from an earlier run no longer say which frame they are of
+                logging.warning(f"{len(source_bbcodes)} source and {len(encode_bbcodes)} encode screenshot links "
+                                f"cannot be paired by frame; skipping the comparison.")
+            elif source_bbcodes and encode_bbcodes:
+                # Interleave by frame: src_00, enc_00, src_01, enc_01... leaving out frames missing a side
+                pairs = [(src, enc) for src, enc in zip(source_bbcodes, encode_bbcodes) if src and enc]
+                if len(pairs) < len(encode_bbcodes):
+                    logging.warning(f"Leaving {len(encode_bbcodes) - len(pairs)} frame(s) out of the comparison "
+                                    f"because one side could not be uploaded.")
+                comparison_bbcodes = [val for pair in pairs for val in pair] or None
 
                 # Build image_pairs for slow.pics: [(source_path, encode_path), ...]
                 ss_dir = os.path.join(runDir, "screenshots")
                 image_pairs = [
                     (os.path.join(ss_dir, f"source_{i:02d}.png"),
                      os.path.join(ss_dir, f"screenshot_{i:02d}.png"))
-                    for i in range(8)
+                    for i in range(len(encode_timestamps))
                 ]
                 colour_space = media_file.get_colour_space()  # "SDR", "HDR", etc.
                 slowpics_result = upload_to_slowpics(
                     image_pairs,
-                    collection_name=os.path.splitext(torrentFileName)[0],
+                    collection_name=postName,
                     labels=["Source", "Encode"],
                     hdr_type=colour_space,
                     remember_me=slowpics_remember_me,
@@ -1127,23 +1312,29 @@ def main():
             logging.info("Source screenshots captured but --upload not set; skipping comparison upload.")
         else:
             logging.warning("Source screenshot capture failed — skipping comparison section.")
+        return comparison_url, comparison_bbcodes
+
+    def description_stage():
+        comparison_url, comparison_bbcodes = stages.stages["comparison"].result
+        generate_bbcode(media_file.tmdb_id, media_file.metadata.get('overview', ''), runDir, tmdb_api, arg.movie, arg.notes,
+                        comparison_url=comparison_url, comparison_bbcodes=comparison_bbcodes)
 
     # --- Create Torrent File ---
-    postName = os.path.splitext(torrentFileName)[0]
-    if reusing and has_torrent:
-        shutil.copy2(os.path.join(prev_run, prev_torrent_filename), os.path.join(runDir, torrentFileName))
-        logging.info(f"Reusing torrent file from {os.path.relpath(prev_run)}.")
-        if (arg.huno and arg.inject) or arg.hardlink:
-            if seeding_dir and os.path.dirname(path) != seeding_dir:
-                destination = os.path.join(seeding_dir, postName)
-                copy_folder_structure(path, destination)
-                logging.info(f"Hardlinks ensured at {destination}")
-    else:
+    def torrent_stage():
+        if reusing and has_torrent:
+            shutil.copy2(os.path.join(prev_run, prev_torrent_filename), os.path.join(runDir, torrentFileName))
+            logging.info(f"Reusing torrent file from {os.path.relpath(prev_run)}.")
+            if (arg.huno and arg.inject) or arg.hardlink:
+                if seeding_dir and os.path.dirname(path) != seeding_dir:
+                    destination = os.path.join(seeding_dir, postName)
+                    copy_folder_structure(path, destination)
+                    logging.info(f"Hardlinks ensured at {destination}")
+            return
+
         logging.info("Creating torrent file")
         torrent = torf.Torrent()
         torrent.private = True
         torrent.source = "HUNO"
-        torrent.piece_size_max = 4 * 1024 * 1024  # 4MB max — prevents Windows [Errno 22] on large reads
         torrent.path = path
         torrent.trackers.append(huno_announce_url)
 
@@ -1155,14 +1346,66 @@ def main():
                 logging.info(f"Hardlinks created at {destination}")
                 torrent.path = destination
 
-        logging.info("Generating torrent file hash. This will take a long while...")
-        torrent.generate(callback=make_torrent_progress_callback(), interval=0.25)
+        hash_workers = (os.cpu_count() or 1) if arg.hash_workers == 0 else arg.hash_workers
+        apply_piece_size(torrent, settings, workers=hash_workers or 1)
+
+        if arg.hash:
+            if not is_valid_torf_hash(arg.hash) or len(arg.hash) // 40 != torrent.pieces:
+                logging.error(
+                    f"--hash must be the concatenated SHA-1 hashes of all {torrent.pieces} pieces "
+                    f"({torrent.pieces * 40} hex characters). Got {len(arg.hash)} characters."
+                )
+                sys.exit(1)
+            torrent.metainfo['info']['pieces'] = convert_sha1_hash(arg.hash)
+            logging.info("Using pre-made piece hashes from --hash. Skipping hashing.")
+        else:
+            logging.info("Generating torrent file hash. This will take a long while...")
+            generated = generate_torrent(torrent, workers=hash_workers, callback=make_torrent_progress_callback(cancel=cancel),
+                                         interval=0.25, cache=PieceCache(), previous_torrents=previous_run_torrents())
+            if not generated:
+                raise StageFailed("Torrent hashing was cancelled")
         torrent.write(os.path.join(runDir, torrentFileName))
         logging.info(f"Torrent file wrote to {torrentFileName}")
-    
+
+    # --- Verify the torrent against the content it will be seeded from ---
+    def verify_stage():
+        content_path = path
+        if ((arg.huno and arg.inject) or arg.hardlink) and seeding_dir and os.path.dirname(path) != seeding_dir:
+            content_path = os.path.join(seeding_dir, postName)
+        hash_workers = (os.cpu_count() or 1) if arg.hash_workers == 0 else arg.hash_workers
+        verify_result = verify_torrent(torf.Torrent.read(os.path.join(runDir, torrentFileName)), content_path,
+                                       workers=hash_workers or 1, samples=arg.verify_samples,
+                                       callback=make_torrent_progress_callback(cancel=cancel), interval=0.25)
+        if not verify_result.ok:
+            logging.error(f"Torrent verification failed: {verify_result.describe()}. Aborting.")
+            sys.exit(1)
+        logging.info(f"Torrent verification passed: {verify_result.describe()}.")
+
+    stages = StageScheduler(limits=job.limits if job is not None else None, store=job, cancel=cancel)
+    stages.add("torrent", torrent_stage, pool="hash")
+    stages.add("mediainfo", mediainfo_stage)
+    stages.add("screenshots", screenshots_stage, pool="screenshots")
+    stages.add("upload", upload_stage, deps=["screenshots"], pool="upload")
+    stages.add("comparison", comparison_stage, deps=["screenshots", "upload"], pool="upload")
+    if arg.verify:
+        stages.add("verify", verify_stage, deps=["torrent"], pool="hash")
+    if arg.huno:
+        stages.add("description", description_stage, deps=["comparison"])
+    try:
+        with job.without_prompts() if job is not None else contextlib.nullcontext():
+            stages.run()
+    except StageFailed as e:
+        logging.error(f"{e}. Aborting.")
+        if job is not None:
+            raise
+        return
+
     # --- HUNO Upload Logic ---
     upload_succeeded = False
-    if arg.huno:
+    if arg.huno and job is not None and "huno" in job.completed():
+        logging.info("Already uploaded to HUNO in an earlier attempt. Skipping upload.")
+        upload_succeeded = True
+    elif arg.huno:
         logging.info("Preparing HUNO upload...")
 
         try:
@@ -1227,10 +1470,8 @@ def main():
         TVDB_ID = 0
         if not arg.movie:
             try:
-                ext_url = f'https://api.themoviedb.org/3/tv/{media_file.tmdb_id}/external_ids'
-                ext_resp = requests.get(ext_url, params={'api_key': tmdb_api}, timeout=15)
-                ext_resp.raise_for_status()
-                external_ids = ext_resp.json()
+                # Fetched along with the show details, so normally already at hand
+                external_ids = tmdb_client(tmdb_api).external_ids('tv', media_file.tmdb_id)
                 IMDB_ID = external_ids.get("imdb_id", "0")
                 TVDB_ID = external_ids.get("tvdb_id", 0)
             except requests.RequestException as e:
@@ -1253,9 +1494,6 @@ def main():
             else:
                 logging.debug("Not detected as anime — skipping MAL lookup.")
 
-        generate_bbcode(media_file.tmdb_id, media_file.metadata.get('overview', ''), runDir, tmdb_api, arg.movie, arg.notes,
-                        comparison_url=comparison_url, comparison_bbcodes=comparison_bbcodes)
-
         is_season_pack = 1 if (not arg.movie and not arg.episode and isFolder == 2) else 0
 
         data = {
@@ -1452,6 +1690,9 @@ def main():
             except requests.exceptions.RequestException as e:
                 logging.error(f"HUNO upload request failed: {e}")
 
+    if upload_succeeded and job is not None:
+        job.mark_done("huno")
+
     # --- qBitTorrent Injection ---
     if arg.inject and (not arg.huno or upload_succeeded):
         logging.info("Qbittorrent injection enabled")
@@ -1519,9 +1760,11 @@ def generate_bbcode(tmdb_id, mediaDesc, runDir, api_key, isMovie, notes=None, co
 def get_prominent_color(tmdb_id, api_key, directory, isMovie):
     logging.info(f"Fetching poster for TMDB ID: {tmdb_id}")
     api_path = 'movie' if isMovie else 'tv'
-    response = requests.get(f'https://api.themoviedb.org/3/{api_path}/{tmdb_id}', params={'api_key': api_key})
-    data = response.json()
-    poster_path = data.get('poster_path')
+    try:
+        poster_path = tmdb_client(api_key).details(api_path, tmdb_id).get('poster_path')
+    except requests.RequestException as e:
+        logging.warning(f"Could not fetch TMDB details for the poster: {e}")
+        poster_path = None
     if not poster_path:
         logging.warning("No poster found on TMDB.")
         return (255, 255, 255) # Default to white
@@ -1552,196 +1795,157 @@ def _ensure_readable_on_dark(rgb):
     r2, g2, b2 = colorsys.hls_to_rgb(h, l, s)
     return (round(r2 * 255), round(g2 * 255), round(b2 * 255))
 
-def is_screenshot_valid(path, white_threshold=0.90):
+def is_screenshot_valid(path):
     """Return True if the image looks like a real frame rather than a blank/corrupt capture.
 
-    Rejects images where more than *white_threshold* fraction of pixels are
-    near-white (>= 245 in all channels), which catches partially-written files
-    that render as a white canvas with only a sliver of real content.
-    Also rejects files that cv2 cannot decode at all.
+    Rejects files that cv2 cannot decode, partially-written files that render as a white
+    canvas, and black, heavily letterboxed or featureless frames (see score_frame).
     """
-    try:
-        img = cv2.imread(path)
-        if img is None:
-            return False
-        near_white = np.all(img >= 245, axis=2)
-        if near_white.mean() >= white_threshold:
-            return False
-        return True
-    except Exception:
+    quality = score_image_file(path)
+    if quality is None:
         return False
-
-
-def create_optimized_screenshots(videoFile, runDir, skip_indices=None):
-    logging.info("Making optimized screenshots...")
+    if not quality.ok:
+        logging.debug(f"{os.path.basename(path)} rejected: {quality.reason}")
+    return quality.ok
+
+
+def create_optimized_screenshots(videoFile, runDir, skip_indices=None, engine="cv2", source_path=None,
+                                 png=PngOptions(), count=DEFAULT_SCREENSHOT_COUNT, strategy="uniform", files=None,
+                                 cancel=None, known_timestamps=None):
+    """Takes *count* screenshots of *videoFile* (or spread over *files*) into runDir/screenshots,
+    at timestamps chosen by *strategy*.
+
+    Frames are captured in parallel, each by a worker process with its own decoder. If
+    *source_path* is given, the matching source_XX.png comparison frames are captured
+    alongside, at the timestamps the encode frames were actually taken at. For the
+    *skip_indices* already on disk those come from *known_timestamps* (as saved by an
+    earlier run), falling back to the planned timestamp. The actual timestamps are saved
+    next to the screenshots.
+
+    Returns (success, timestamps, source_success); source_success is None without a
+    *source_path*.
+    """
+    logging.info(f"Making optimized screenshots ({engine} engine, {strategy} timestamps)...")
     screenshots_dir = os.path.join(runDir, "screenshots")
     if not os.path.isdir(screenshots_dir):
         os.mkdir(screenshots_dir)
 
-    # Suppress ffmpeg/libav stderr (e.g. "Unsupported encoding type") that leaks through OpenCV
-    devnull = os.open(os.devnull, os.O_WRONLY)
-    saved_stderr = os.dup(2)
-    os.dup2(devnull, 2)
-    os.close(devnull)
-    video = cv2.VideoCapture(videoFile)
-    os.dup2(saved_stderr, 2)
-    os.close(saved_stderr)
-    if not video.isOpened():
-        logging.error(f"Could not open video file: {videoFile}")
-        return False, []
-
-    total_duration = int(video.get(cv2.CAP_PROP_FRAME_COUNT)) / int(video.get(cv2.CAP_PROP_FPS))
-    timestamps = [i * total_duration / 10 for i in range(1, 9)] # 8 screenshots
-    successful_screenshots = 0
-    active_temp = None
-
-    try:
-        for i, timestamp in enumerate(timestamps):
-            if skip_indices and i in skip_indices:
-                successful_screenshots += 1
-                continue
-            video.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
-            success, image = video.read()
-            if success:
-                temp_png = os.path.join(screenshots_dir, f"temp_{i:02d}.png")
-                active_temp = temp_png
-                cv2.imwrite(temp_png, image)
-                final_path = os.path.join(screenshots_dir, f"screenshot_{i:02d}.png")
-                optimize_screenshot(temp_png, final_path)
-                os.remove(temp_png)
-                active_temp = None
-                successful_screenshots += 1
-                logging.info(f"Screenshot {i+1}/{len(timestamps)} created.")
-            else:
-                logging.warning(f"Failed to create screenshot at timestamp {timestamp:.2f}s")
-    except KeyboardInterrupt:
-        logging.warning("Screenshot generation interrupted. Cleaning up temporary files.")
-        raise
-    finally:
-        if active_temp and os.path.exists(active_temp):
-            os.remove(active_temp)
-        video.release()
-
-    expected = len(timestamps)
-    if successful_screenshots < expected:
-        logging.error(
-            f"Only {successful_screenshots} of {expected} screenshots were created successfully. "
-            f"All {expected} are required."
-        )
-        return False, []
+    shots = plan_screenshots(files or [videoFile], count, strategy, engine)
+    if not shots:
+        return False, [], None
+    paths = [shot.path for shot in shots]
+    if len(set(paths)) > 1:
+        logging.info(f"Spreading {len(shots)} screenshots over {len(set(paths))} files.")
+
+    skip_indices = set(skip_indices or ())
+    known_timestamps = known_timestamps or []
+    planned = [shot.timestamp for shot in shots]
+    known = {i: known_timestamps[i] for i in skip_indices
+             if i < len(known_timestamps) and known_timestamps[i] is not None}
+    if source_path and len(known) < len(skip_indices & set(range(len(shots)))):
+        logging.warning("Some existing screenshots have no recorded timestamp; "
+                        "their source frames are taken at the planned timestamp.")
+    companion = (source_path, "source_") if source_path else None
+    successful_screenshots, timestamps, source_screenshots = capture_screenshots(
+        videoFile, [known.get(i, t) for i, t in enumerate(planned)], screenshots_dir, "screenshot_", engine=engine,
+        skip_indices=skip_indices, companion=companion, options=png, paths=paths, cancel=cancel)
+    save_capture_timestamps(screenshots_dir, [None if i in skip_indices and i not in known else t
+                                              for i, t in enumerate(timestamps)])
+
+    source_success = None
+    if source_path:
+        source_success = _check_screenshot_count(source_screenshots, len(timestamps), "source screenshots")
+    if not _check_screenshot_count(successful_screenshots, len(timestamps), "screenshots"):
+        return False, [], source_success
     logging.info(f"Created {successful_screenshots} optimized screenshots")
-    return True, timestamps
+    return True, timestamps, source_success
 
-def capture_source_screenshots(source_path: str, timestamps: list[float], run_dir: str) -> bool:
-    logging.info("Capturing source screenshots for comparison...")
+def capture_source_screenshots(source_path: str, timestamps: list[float], run_dir: str, engine: str = "cv2",
+                               png: PngOptions = PngOptions(), cancel=None) -> bool:
+    logging.info(f"Capturing source screenshots for comparison ({engine} engine)...")
     screenshots_dir = os.path.join(run_dir, "screenshots")
     if not os.path.isdir(screenshots_dir):
         os.mkdir(screenshots_dir)
 
-    # Suppress ffmpeg/libav stderr
-    devnull = os.open(os.devnull, os.O_WRONLY)
-    saved_stderr = os.dup(2)
-    os.dup2(devnull, 2)
-    os.close(devnull)
-    video = cv2.VideoCapture(source_path)
-    os.dup2(saved_stderr, 2)
-    os.close(saved_stderr)
-    if not video.isOpened():
-        logging.error(f"Could not open source file: {source_path}")
+    # Source frames must match the encode's, so never snap to the source's own keyframes
+    successful_screenshots, _, _ = capture_screenshots(
+        source_path, timestamps, screenshots_dir, "source_", engine=engine, snap_to_keyframe=False,
+        options=png, candidates=1, cancel=cancel)
+    if not _check_screenshot_count(successful_screenshots, len(timestamps), "source screenshots"):
         return False
+    logging.info(f"Created {successful_screenshots} source screenshots for comparison")
+    return True
 
-    successful_screenshots = 0
-    active_temp = None
-
-    try:
-        for i, timestamp in enumerate(timestamps):
-            video.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
-            success, image = video.read()
-            if success:
-                temp_png = os.path.join(screenshots_dir, f"source_temp_{i:02d}.png")
-                active_temp = temp_png
-                cv2.imwrite(temp_png, image)
-                final_path = os.path.join(screenshots_dir, f"source_{i:02d}.png")
-                optimize_screenshot(temp_png, final_path)
-                os.remove(temp_png)
-                active_temp = None
-                successful_screenshots += 1
-                logging.info(f"Source screenshot {i+1}/{len(timestamps)} created.")
-            else:
-                logging.warning(f"Failed to create source screenshot at timestamp {timestamp:.2f}s")
-    except KeyboardInterrupt:
-        logging.warning("Source screenshot generation interrupted. Cleaning up temporary files.")
-        raise
-    finally:
-        if active_temp and os.path.exists(active_temp):
-            os.remove(active_temp)
-        video.release()
-
-    expected = len(timestamps)
-    if successful_screenshots < expected:
+def _check_screenshot_count(successful, expected, label):
+    if successful < expected:
         logging.error(
-            f"Only {successful_screenshots} of {expected} source screenshots were created successfully. "
+            f"Only {successful} of {expected} {label} were created successfully. "
             f"All {expected} are required."
         )
         return False
-    logging.info(f"Created {successful_screenshots} source screenshots for comparison")
     return True
 
-def optimize_screenshot(input_path, output_path, max_width=1920, quality=85):
-    try:
-        with Image.open(input_path) as img:
-            if img.mode in ('RGBA', 'LA', 'P'): img = img.convert('RGB')
-            if img.width > max_width:
-                ratio = max_width / img.width
-                new_height = int(img.height * ratio)
-                img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
-            img.save(output_path, 'PNG', quality=quality, optimize=True)
-    except Exception as e:
-        logging.error(f"Failed to optimize screenshot {input_path}: {e}")
-        shutil.copy(input_path, output_path)
-
-def upload_single_screenshot(image_path, hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api=None):
-    image_name = os.path.basename(image_path)
-    logging.info(f"Uploading {image_name}...")
-
-    # --- Attempt 1: hawke.pics (if API key is provided) ---
+def _image_hosts(hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api=None):
+    """Returns (cache key, display name, upload function) for each usable host, in order of preference."""
+    hosts = []
     if hawkepics_api:
-        image_url = upload_to_hawkepics(image_path, hawkepics_api)
-        if image_url:
-            logging.info(f"Success: Successfully uploaded {image_name} to hawke.pics.")
-            return f"[url={image_url}][img]{image_url}[/img][/url]"
-
-    # --- Attempt 2: PTPImg (if API key is provided) ---
+        hosts.append(("hawkepics", "hawke.pics", lambda path: upload_to_hawkepics(path, hawkepics_api)))
     if ptpimg_api:
-        image_url = uploadToPTPIMG(image_path, ptpimg_api)
-        if image_url:
-            logging.info(f"Success: Successfully uploaded {image_name} to PTPImg.")
-            return f"[url={image_url}][img]{image_url}[/img][/url]"
-
-    # --- Attempt 3: OnlyImage (if API key is provided) ---
+        hosts.append(("ptpimg", "PTPImg", lambda path: uploadToPTPIMG(path, ptpimg_api)))
     if onlyimage_api:
-        image_url = upload_to_onlyimage(image_path, onlyimage_api)
-        if image_url:
-            logging.info(f"Success: Successfully uploaded {image_name} to OnlyImage.")
-            return f"[url={image_url}][img]{image_url}[/img][/url]"
-
-    # --- Attempt 4: ImgBB (if API key is provided) ---
+        hosts.append(("onlyimage", "OnlyImage", lambda path: upload_to_onlyimage(path, onlyimage_api)))
     if imgbb_api:
-        image_url, _ = upload_to_imgbb(image_path, imgbb_api) # We only need the direct URL
-        if image_url:
-            logging.info(f"Success: Successfully uploaded {image_name} to ImgBB.")
-            return f"[url={image_url}][img]{image_url}[/img][/url]"
-
-    # --- Attempt 5: Catbox (fallback) ---
-    image_url = upload_to_catbox(image_path, catbox_hash)
-    if image_url:
-        logging.info(f"Success: Successfully uploaded {image_name} to Catbox.")
+        # We only need the direct URL
+        hosts.append(("imgbb", "ImgBB", lambda path: upload_to_imgbb(path, imgbb_api)[0]))
+    # Catbox is the fallback and works without an account
+    hosts.append(("catbox", "Catbox", lambda path: upload_to_catbox(path, catbox_hash)))
+    return hosts
+
+def upload_single_screenshot(image_path, hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api=None,
+                             cache=None, hedge_after=None, stats=None, limiter=None, rotate=0):
+    """Uploads to the first host that accepts the image: hawke.pics, PTPImg, OnlyImage, ImgBB, then Catbox.
+
+    With an UploadCache, an image already uploaded to one of the hosts is not uploaded again.
+    With *hedge_after*, the next host is started whenever the current ones have not answered
+    within that many seconds. HostStats *stats* move slow or failing hosts to the back, an
+    AdaptiveLimiter bounds uploads per host, and *rotate* starts further down the list (for retries).
+    """
+    image_name = os.path.basename(image_path)
+    hosts = _image_hosts(hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api)
+    if stats:
+        hosts = stats.order(hosts)
+    rotate %= len(hosts)
+    hosts = hosts[rotate:] + hosts[:rotate]
+
+    digest = file_digest(image_path) if cache else None
+    if cache:
+        for key, name, _ in hosts:
+            image_url = cache.lookup(digest, key)
+            if image_url:
+                logging.info(f"Success: {image_name} was already uploaded to {name}.")
+                return f"[url={image_url}][img]{image_url}[/img][/url]"
+
+    logging.info(f"Uploading {image_name}...")
+    uploaded = hedged_upload(image_path, hosts, hedge_after=hedge_after, stats=stats, limiter=limiter)
+    if uploaded:
+        key, name, image_url = uploaded
+        logging.info(f"Success: Successfully uploaded {image_name} to {name}.")
+        if cache:
+            cache.store(digest, key, image_url)
         return f"[url={image_url}][img]{image_url}[/img][/url]"
 
     logging.error(f"Failure: All upload methods failed for {image_name}.")
     return None
 
-def upload_screenshots_concurrently(screenshot_dir, hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api=None, max_workers=5, file_pattern="screenshot_"):
+def upload_screenshots_concurrently(screenshot_dir, hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api=None, max_workers=MAX_HOST_CONCURRENCY, file_pattern="screenshot_", cache=None, hedge_after=None, stats=None, limiter=None, cancel=None):
+    """Uploads every {file_pattern}*.png and returns their BBCode in file order.
+
+    Concurrency per host is governed by *limiter* (a fresh AdaptiveLimiter by default).
+    Images that fail are retried on their own, starting from a different host, up to
+    UPLOAD_RETRY_ROUNDS times; images that still fail are None in the result, so every
+    entry stays at the index of its file. Returns None if none could be uploaded, or once
+    the *cancel* event is set.
+    """
     images = sorted([f for f in os.listdir(screenshot_dir)
                      if f.startswith(file_pattern) and f.lower().endswith('.png')])
     if not images:
@@ -1750,25 +1954,47 @@ def upload_screenshots_concurrently(screenshot_dir, hawkepics_api, imgbb_api, pt
 
     image_paths = [os.path.join(screenshot_dir, img) for img in images]
     bbcodes = [None] * len(images)
+    limiter = limiter or AdaptiveLimiter(maximum=max_workers)
+    ensure_pool_size(max_workers)
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_index = {executor.submit(upload_single_screenshot, path, hawkepics_api, imgbb_api, ptpimg_api, catbox_hash, onlyimage_api): i for i, path in enumerate(image_paths)}
-        for future in as_completed(future_to_index):
-            index = future_to_index[future]
-            try:
-                result = future.result(timeout=120)
-                if result:
-                    bbcodes[index] = result
-            except Exception as e:
-                logging.error(f"Upload task failed for {image_paths[index]}: {e}")
-    
-    successful_uploads = [b for b in bbcodes if b]
-    if len(successful_uploads) < len(images):
-        failed = len(images) - len(successful_uploads)
-        logging.error(f"Failure: {failed} out of {len(images)} screenshots failed to upload. Aborting.")
+    pending = list(range(len(images)))
+    for attempt in range(UPLOAD_RETRY_ROUNDS + 1):
+        if cancel is not None and cancel.is_set():
+            break
+        if attempt:
+            logging.warning(f"Retrying {len(pending)} failed screenshot upload(s) on other hosts "
+                            f"(attempt {attempt + 1} of {UPLOAD_RETRY_ROUNDS + 1})...")
+            time.sleep(UPLOAD_RETRY_DELAY * attempt)
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            future_to_index = {executor.submit(upload_single_screenshot, image_paths[i], hawkepics_api, imgbb_api,
+                                               ptpimg_api, catbox_hash, onlyimage_api, cache, hedge_after, stats,
+                                               limiter, attempt): i for i in pending}
+            for future in as_completed(future_to_index):
+                index = future_to_index[future]
+                try:
+                    bbcodes[index] = future.result()
+                except Exception as e:
+                    logging.error(f"Upload task failed for {image_paths[index]}: {e}")
+                if cancel is not None and cancel.is_set():
+                    for queued in future_to_index:
+                        queued.cancel()
+                    break
+        pending = [i for i in pending if not bbcodes[i]]
+        if not pending:
+            break
+
+    if cancel is not None and cancel.is_set():
+        logging.info("Screenshot upload cancelled.")
         return None
-    logging.info(f"Success: Successfully uploaded {len(successful_uploads)} out of {len(images)} screenshots")
-    return successful_uploads
+    uploaded = len(images) - len(pending)
+    if not uploaded:
+        logging.error(f"Failure: none of the {len(images)} screenshots could be uploaded.")
+        return None
+    if pending:
+        logging.warning(f"{len(pending)} out of {len(images)} screenshots could not be uploaded and are left out: "
+                        f"{', '.join(images[i] for i in pending)}")
+    logging.info(f"Success: Successfully uploaded {uploaded} out of {len(images)} screenshots")
+    return bbcodes
 
 if __name__ == "__main__":
     main()